@@ -15,11 +15,13 @@ bl_info = {
 }
 
 import bpy
+import os
 from bpy_extras.io_utils import ImportHelper, ExportHelper
-from bpy.props import StringProperty, IntProperty, PointerProperty, BoolProperty
-from bpy.types import Operator, PropertyGroup
-from io_mesh_srt.import_srt_json import read_srt_json
+from bpy.props import StringProperty, IntProperty, PointerProperty, BoolProperty, CollectionProperty
+from bpy.types import Operator, PropertyGroup, OperatorFileListElement
+from io_mesh_srt.import_srt_json import read_srt_json, read_srt_json_batch, get_srt_folder_files
 from io_mesh_srt.export_srt_json import write_srt_json 
+from io_mesh_srt.srt_cache import CACHE_SIZE
 from io_mesh_srt.ui.main_panel import CLASSES_Main_Panel, PROPS_Main_Panel
 from io_mesh_srt.ui.general_panel import CLASSES_General_Panel, PROPS_General_Panel
 from io_mesh_srt.ui.vertex_panel import CLASSES_Vertex_Panel, PROPS_Vertex_Panel
@@ -41,11 +43,53 @@ class ImportSrtJson(Operator, ImportHelper):
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
     
+    files: CollectionProperty(
+        type=OperatorFileListElement,
+        options={'HIDDEN', 'SKIP_SAVE'}
+    )
+    
+    directory: StringProperty(
+        subtype='DIR_PATH',
+        options={'HIDDEN', 'SKIP_SAVE'}
+    )
+    
+    import_folder: BoolProperty(
+        name="Import Whole Folder",
+        description="Import every .srt and .json file of the folder instead of the selected ones. Several files are decoded in parallel",
+        default=False
+    )
+    
     facing_leaves_normals: BoolProperty(
         name="Fix Facing Leaves Normals",
         description="Modify the mesh internal data so that Blender doesn't break the facing leaves normals on import. Doesn't affect the end result once exported, except from conserving the original normals",
         default=False
     )
+    
+    metadata_only: BoolProperty(
+        name="Metadata Only",
+        description="Only read the LOD profile, wind, collisions, billboards and materials. LODs are kept as placeholders with a bounding box holding their materials, and are exported unchanged",
+        default=False
+    )
+    
+    max_lods: IntProperty(
+        name="LODs to Build",
+        description="Number of LODs built as meshes on import, the others are kept as placeholders until materialized from the SpeedTree panel and are exported unchanged. 0 builds them all",
+        default=0,
+        min=0
+    )
+    
+    use_cache: BoolProperty(
+        name="Use Cache",
+        description="Keep the decoded file in a disk cache, so that importing it again skips the decoding as long as the file doesn't change",
+        default=False
+    )
+    
+    cache_size: IntProperty(
+        name="Cache Size (MB)",
+        description="Least recently imported files are removed from the cache above this size",
+        default=CACHE_SIZE,
+        min=16
+    )
 
     # List of operator properties, the attributes will be assigned
     # to the class instance from the operator settings before calling.
@@ -58,7 +102,22 @@ class ImportSrtJson(Operator, ImportHelper):
         bpy.context.scene.cursor.location = (0.0, 0.0, 0.0)
         bpy.context.scene.cursor.rotation_euler = (0.0, 0.0, 0.0)
         
-        read_srt_json(context, self.filepath, self.facing_leaves_normals)
+        if self.import_folder:
+            filepaths = get_srt_folder_files(self.directory)
+        else:
+            filepaths = [os.path.join(self.directory, f.name) for f in self.files if f.name] or [self.filepath]
+        
+        if len(filepaths) == 1:
+            read_srt_json(context, filepaths[0], self.facing_leaves_normals, self.use_cache, self.cache_size, max_lods = self.max_lods, metadata_only = self.metadata_only)
+        elif filepaths:
+            timings = read_srt_json_batch(context, filepaths, self.facing_leaves_normals, self.use_cache, self.cache_size, self.max_lods, self.metadata_only)
+            for filepath, decode_time, build_time, error in timings:
+                if error:
+                    self.report({'WARNING'}, "Failed to import " + os.path.basename(filepath) + ": " + str(error))
+                else:
+                    self.report({'INFO'}, "{}: {:.2f} s decoding, {:.2f} s building".format(os.path.basename(filepath), decode_time, build_time))
+            self.report({'INFO'}, "Imported {} of {} file(s), {:.2f} s decoding, {:.2f} s building".format(
+                sum(not error for *_, error in timings), len(timings), sum(t[1] for t in timings), sum(t[2] for t in timings)))
         
         return {'FINISHED'}
     
@@ -75,19 +134,47 @@ class ExportSrtJson(Operator, ExportHelper):
         options={'HIDDEN'},
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
+    
+    optimize_vertex_cache: BoolProperty(
+        name="Optimize Vertex Cache",
+        description="Reorder the triangles of each draw call for the GPU post-transform vertex cache. Slower to export, faster to render",
+        default=False
+    )
+    
+    optimize_vertex_fetch: BoolProperty(
+        name="Optimize Vertex Fetch",
+        description="Sort the vertices of each draw call in the order the triangles first use them, for more linear memory fetches",
+        default=False
+    )
+    
+    optimize_overdraw: BoolProperty(
+        name="Optimize Leaves Overdraw",
+        description="Draw the outer leaf cards first so that the depth test culls the inner ones. Keeps the vertex cache optimization of the leaves",
+        default=False
+    )
+    
+    split_draw_calls: BoolProperty(
+        name="16 Bit Indices Only",
+        description="Split the draw calls above 65535 vertices into smaller ones sharing their material, instead of writing 32 bit indices",
+        default=True
+    )
 
     # List of operator properties, the attributes will be assigned
     # to the class instance from the operator settings before calling.
 
     def execute(self, context):
         
-        # Should work from all modes
-        if bpy.context.mode != 'OBJECT':
-            bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.context.scene.cursor.location = (0.0, 0.0, 0.0)
-        bpy.context.scene.cursor.rotation_euler = (0.0, 0.0, 0.0)
+        # Should work from all modes, without leaving them
+        for obj in context.objects_in_mode:
+            obj.update_from_editmode()
         
-        write_srt_json(context, self.filepath)
+        stats = write_srt_json(context, self.filepath, self.optimize_vertex_cache, self.optimize_vertex_fetch, self.optimize_overdraw, self.split_draw_calls) or {}
+        if "acmr_before" in stats:
+            self.report({'INFO'}, "ACMR {acmr_before:.3f} -> {acmr_after:.3f}, ATVR {atvr_before:.3f} -> {atvr_after:.3f}".format(**stats))
+        if "overdraw_before" in stats:
+            self.report({'INFO'}, "Leaves overdraw {overdraw_before:.2f} -> {overdraw_after:.2f}".format(**stats))
+        if "draw_calls" in stats:
+            self.report({'INFO'}, "{draw_calls} draw call(s), {draw_calls_32bit} with 32 bit indices, {draw_calls_split} added by splitting".format(**stats))
         
         return {'FINISHED'}
     
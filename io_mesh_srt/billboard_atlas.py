@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+# billboard_atlas.py
+
+import numpy as np
+
+SHADOWS_FACTOR = 0.85
+ALPHA_THRESHOLD = 0.15
+LUMINANCE = np.array([0.2126, 0.7152, 0.0722], dtype = np.float32)
+PADDING_ROWS = 256 # Rows of the images padded at once
+
+def linear_to_srgb(colors):
+    # Encode linear colors for 8 bit images, as the Standard view transform does
+    colors = np.clip(colors, 0, 1)
+    return np.where(colors <= 0.0031308, colors * 12.92, 1.055 * np.power(colors, 1 / 2.4) - 0.055).astype(np.float32)
+
+def contains_rect(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[0] + inner[2] <= outer[0] + outer[2] and inner[1] + inner[3] <= outer[1] + outer[3]
+
+def pack_rects(sizes, width, height, rotatable):
+    # MaxRects with the best short side fit (Jylanki 2010), largest rectangles first
+    # Returns (x, y, rotated) per rectangle, or None if they don't all fit
+    free = [(0, 0, width, height)]
+    placements = [None] * len(sizes)
+    order = sorted(range(len(sizes)), key = lambda i: (-sizes[i][0] * sizes[i][1], -max(sizes[i]), i))
+    for i in order:
+        w, h = sizes[i]
+        best = None
+        for fx, fy, fw, fh in free:
+            for rotated, rw, rh in ((False, w, h), (True, h, w)):
+                if rotated and (not rotatable[i] or w == h):
+                    continue
+                if rw <= fw and rh <= fh:
+                    score = (min(fw - rw, fh - rh), max(fw - rw, fh - rh), fy, fx)
+                    if best is None or score < best[0]:
+                        best = (score, fx, fy, rw, rh, rotated)
+        if best is None:
+            return None
+        _, x, y, rw, rh, rotated = best
+        placements[i] = (x, y, rotated)
+        
+        # Split the free rectangles overlapping the placed one, then drop those contained in another
+        split = []
+        for fx, fy, fw, fh in free:
+            if x >= fx + fw or x + rw <= fx or y >= fy + fh or y + rh <= fy:
+                split.append((fx, fy, fw, fh))
+                continue
+            if x > fx:
+                split.append((fx, fy, x - fx, fh))
+            if x + rw < fx + fw:
+                split.append((x + rw, fy, fx + fw - x - rw, fh))
+            if y > fy:
+                split.append((fx, fy, fw, y - fy))
+            if y + rh < fy + fh:
+                split.append((fx, y + rh, fw, fy + fh - y - rh))
+        free = [r for j, r in enumerate(split) if not any(k != j and contains_rect(o, r) and (o != r or k < j) for k, o in enumerate(split))]
+    return placements
+
+def pack_billboard_rects(dimensions, resolution, margin = 0, alignment = 4, rotatable = None):
+    # Pixel rectangles (x, y, width, height, rotated) of billboards of the given dimensions, rows bottom to top
+    # The texel density is the largest one letting them all fit, found by bisection. Each view keeps margin texels
+    # around it and starts a cell aligned on alignment texels, so that no compression block mixes two views
+    dimensions = np.asarray(dimensions, dtype = float).reshape(-1, 2)
+    if rotatable is None:
+        rotatable = [True] * len(dimensions)
+    bin_size = (resolution - margin) // alignment * alignment
+    
+    def pack(scale):
+        sizes = np.maximum(np.round(dimensions * scale).astype(int), 1)
+        cells = -(-(sizes + margin) // alignment) * alignment
+        return sizes, pack_rects(cells.tolist(), bin_size, bin_size, rotatable)
+    
+    low = 0
+    high = bin_size / np.sqrt(np.sum(dimensions[:,0] * dimensions[:,1]))
+    sizes, placements = pack(low)
+    if placements is None:
+        raise ValueError("The billboards don't fit in a " + str(resolution) + " pixels texture with a margin of " + str(margin))
+    for _ in range(32):
+        scale = (low + high) * 0.5
+        scale_sizes, scale_placements = pack(scale)
+        if scale_placements is None:
+            high = scale
+        else:
+            low = scale
+            sizes, placements = scale_sizes, scale_placements
+    
+    rects = []
+    for (w, h), (x, y, rotated) in zip(sizes.tolist(), placements):
+        if rotated:
+            w, h = h, w
+        rects.append((x + margin, y + margin, w, h, rotated))
+    return rects
+
+def get_view_origin(uv_rect, atlas_size, view_size):
+    # Bottom left pixel of a view centered on its UV rectangle (u max, u min, v max, v min)
+    x = int(round((uv_rect[0] + uv_rect[1]) * 0.5 * atlas_size[1] - view_size[1] * 0.5))
+    y = int(round((uv_rect[2] + uv_rect[3]) * 0.5 * atlas_size[0] - view_size[0] * 0.5))
+    return x, y
+
+def place_billboard_view(atlas, view, uv_rect, rotated = False):
+    # Paste a view over its UV rectangle, a quarter turn counterclockwise when its UVs were rotated
+    # Rows go bottom to top as in Blender images, the parts outside of the atlas are cropped
+    if rotated:
+        view = np.rot90(view, -1)
+    height, width = view.shape[:2]
+    x, y = get_view_origin(uv_rect, atlas.shape[:2], (height, width))
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, atlas.shape[1]), min(y + height, atlas.shape[0])
+    if x0 < x1 and y0 < y1:
+        atlas[y0:y1, x0:x1] = view[y0-y:y1-y, x0-x:x1-x]
+    return atlas
+
+def get_lowest_parabolas(heights):
+    # Column u of the lowest parabola (x - u)^2 + heights[u] at every column x, along every row at once, written over heights
+    # Lower envelopes as in Meijster et al. 2000, each row keeps a stack of the columns of its envelope and of where their parabolas start
+    width, height = heights.shape
+    stack_u = np.zeros(heights.shape, dtype = heights.dtype)
+    stack_start = np.zeros(heights.shape, dtype = heights.dtype)
+    top = np.zeros(height, dtype = np.intp)
+    top_u = np.zeros(height, dtype = np.int64)
+    top_start = np.zeros(height, dtype = np.int64)
+    top_height = heights[0].astype(np.int64)
+    for u in range(1, width):
+        height_u = heights[u].astype(np.int64)
+        while True:
+            # Parabolas already above the one of u where they start
+            hidden = np.flatnonzero(np.square(top_start - top_u) + top_height > np.square(top_start - u) + height_u)
+            if not hidden.size:
+                break
+            top[hidden] -= 1
+            emptied = top[hidden] < 0
+            kept = hidden[~emptied]
+            top_u[kept] = stack_u[top[kept], kept]
+            top_start[kept] = stack_start[top[kept], kept]
+            top_height[kept] = heights[top_u[kept], kept]
+            # Rows left without parabola start again from the one of u
+            emptied = hidden[emptied]
+            top[emptied] = 0
+            stack_u[0, emptied] = u
+            stack_start[0, emptied] = 0
+            top_u[emptied] = u
+            top_start[emptied] = 0
+            top_height[emptied] = height_u[emptied]
+        
+        # Where the parabola of u passes below the top one
+        with np.errstate(divide = 'ignore'):
+            start = 1 + (u * u - np.square(top_u) + height_u - top_height) // (2 * (u - top_u))
+        pushed = np.flatnonzero((start < width) & (top_u != u))
+        top[pushed] += 1
+        stack_u[top[pushed], pushed] = u
+        stack_start[top[pushed], pushed] = start[pushed]
+        top_u[pushed] = u
+        top_start[pushed] = start[pushed]
+        top_height[pushed] = height_u[pushed]
+    
+    # Walk the envelopes back from the last column
+    for u in range(width - 1, -1, -1):
+        heights[u] = top_u
+        passed = np.flatnonzero(top_start == u)
+        passed = passed[top[passed] > 0]
+        top[passed] -= 1
+        top_u[passed] = stack_u[top[passed], passed]
+        top_start[passed] = stack_start[top[passed], passed]
+    return heights
+
+def get_nearest_seeds(mask, max_distance = None):
+    # Nearest texel of the mask for every texel, by an exact distance transform along the columns then the rows
+    # Returns its coordinates, negative where none is within max_distance, and its squared distance
+    height, width = mask.shape
+    size = max(height, width)
+    dtype = np.int32 if size <= 8192 else np.int64
+    rows = np.arange(height, dtype = dtype)[:,None]
+    cols = np.arange(width, dtype = dtype)[None,:]
+    if not mask.any():
+        no_seed = np.full(mask.shape, -1, dtype = dtype)
+        return no_seed, no_seed.copy(), np.full(mask.shape, np.iinfo(dtype).max, dtype = dtype)
+    
+    # Nearest seed above or below in the column, far enough outside of the image to lose against any other seed when there is none
+    seed_row = np.where(mask, rows, -3 * size).astype(dtype, copy = False)
+    np.maximum.accumulate(seed_row, axis = 0, out = seed_row)
+    below = np.where(mask, rows, 4 * size).astype(dtype, copy = False)[::-1]
+    np.minimum.accumulate(below, axis = 0, out = below)
+    below = below[::-1]
+    np.copyto(seed_row, below, where = below - rows < rows - seed_row)
+    del below
+    
+    # Then the nearest of those along the row, columns first in memory while the rows are swept
+    seed_x = np.square(seed_row - rows).T.copy()
+    seed_x = np.ascontiguousarray(get_lowest_parabolas(seed_x).T)
+    seed_y = np.take_along_axis(seed_row, seed_x, axis = 1)
+    distance = np.square(seed_y - rows)
+    distance += np.square(seed_x - cols)
+    
+    if max_distance is not None:
+        too_far = distance > max_distance ** 2
+        seed_y[too_far] = -1
+        seed_x[too_far] = -1
+    return seed_y, seed_x, distance
+
+def pad_billboard_images(images, mask, max_distance = None):
+    # Fill the texels outside of the mask with the color of their nearest texel inside, up to max_distance or everywhere
+    seed_y, seed_x, _ = get_nearest_seeds(mask, max_distance)
+    padded = [image.copy() for image in images]
+    # A band of rows at a time, to keep the gathered texels small next to 8K images
+    for start in range(0, mask.shape[0], PADDING_ROWS):
+        band = slice(start, start + PADDING_ROWS)
+        found = (seed_y[band] >= 0) & ~mask[band]
+        band_y = seed_y[band][found]
+        band_x = seed_x[band][found]
+        for image in padded:
+            image[band][found] = image[band_y, band_x]
+    return padded
+
+def composite_billboard_atlas(resolution, uv_rects, rotations, diffuse_views, normal_views, shadow_views, ambient_views, padding = None, shadows_factor = SHADOWS_FACTOR, alpha_threshold = ALPHA_THRESHOLD):
+    # Diffuse and normal RGBA textures of the billboards from linear RGBA views, rows bottom to top
+    # Diffuse views carry the render alpha, ambient views are reduced to their luminance
+    # Colors are padded outside of the rendered texels by padding pixels, or over the whole atlas if None
+    diffuse = np.zeros((resolution, resolution, 3), dtype = np.float32)
+    alpha = np.zeros((resolution, resolution), dtype = np.float32)
+    normal = np.zeros((resolution, resolution, 3), dtype = np.float32)
+    ambient = np.zeros((resolution, resolution), dtype = np.float32)
+    for i, uv_rect in enumerate(uv_rects):
+        rotated = bool(rotations[i])
+        views = [diffuse_views[i], normal_views[i], shadow_views[i], ambient_views[i]]
+        if len(set(view.shape[:2] for view in views)) > 1:
+            raise ValueError("Passes of billboard view {} differ in size: {}".format(i, [view.shape[:2] for view in views]))
+        
+        # Multiply the shadows in
+        shadows = shadow_views[i][...,:3]
+        place_billboard_view(diffuse, diffuse_views[i][...,:3] * (1 - shadows_factor + shadows_factor * shadows), uv_rect, rotated)
+        place_billboard_view(alpha, diffuse_views[i][...,3], uv_rect, rotated)
+        place_billboard_view(normal, normal_views[i][...,:3], uv_rect, rotated)
+        place_billboard_view(ambient, ambient_views[i][...,:3] @ LUMINANCE, uv_rect, rotated)
+    
+    if padding is None or padding > 0:
+        diffuse, normal, ambient = pad_billboard_images([diffuse, normal, ambient], alpha > 0, padding)
+    
+    diffuse = np.dstack([linear_to_srgb(diffuse), alpha >= alpha_threshold]).astype(np.float32)
+    normal = np.dstack([linear_to_srgb(normal), np.clip(ambient, 0, 1)]).astype(np.float32)
+    return diffuse, normal
+
+def sample_billboard_alpha(alpha, corner_uvs, shape, samples = 1):
+    # Alpha of a view on a grid of the billboard space, rows bottom to top, from the UVs of its bottom left,
+    # bottom right and top left corners. Each cell keeps the highest of its samples x samples texels
+    rows, cols = shape
+    offsets = (np.arange(samples) + 0.5) / samples
+    s = (np.arange(cols)[:,None] + offsets).ravel() / cols
+    t = (np.arange(rows)[:,None] + offsets).ravel() / rows
+    origin, right, up = np.asarray(corner_uvs, dtype = float)
+    u = origin[0] + s[None,:] * (right[0] - origin[0]) + t[:,None] * (up[0] - origin[0])
+    v = origin[1] + s[None,:] * (right[1] - origin[1]) + t[:,None] * (up[1] - origin[1])
+    height, width = alpha.shape
+    x = np.clip((u * width).astype(int), 0, width - 1)
+    y = np.clip((v * height).astype(int), 0, height - 1)
+    return alpha[y, x].reshape(rows, samples, cols, samples).max(axis = (1, 3))
+
+def trace_mask_outlines(mask):
+    # Closed outlines along the texel edges of the mask, counterclockwise around filled texels and clockwise around holes
+    # Texels touching by a corner only are kept apart by turning left first
+    filled = np.pad(mask, 1)
+    edges = {}
+    for (dy, dx), (start, end) in [((-1, 0), ((0, 0), (1, 0))), ((0, 1), ((1, 0), (1, 1))), ((1, 0), ((1, 1), (0, 1))), ((0, -1), ((0, 1), (0, 0)))]:
+        ys, xs = np.nonzero(filled[1:-1,1:-1] & ~filled[1+dy:filled.shape[0]-1+dy,1+dx:filled.shape[1]-1+dx])
+        for y, x in zip(ys.tolist(), xs.tolist()):
+            edges.setdefault((x + start[0], y + start[1]), []).append((x + end[0], y + end[1]))
+    
+    outlines = []
+    while edges:
+        first = next(iter(edges))
+        outline = [first]
+        point = first
+        direction = None
+        while True:
+            ends = edges[point]
+            if len(ends) > 1 and direction:
+                # Left turn first, the cross product of the directions is positive
+                ends.sort(key = lambda e: -(direction[0] * (e[1] - point[1]) - direction[1] * (e[0] - point[0])))
+            end = ends.pop(0)
+            if not ends:
+                del edges[point]
+            direction = (end[0] - point[0], end[1] - point[1])
+            point = end
+            if point == first:
+                break
+            outline.append(point)
+        outlines.append(np.array(outline, dtype = float))
+    return outlines
+
+def get_polygon_area(points):
+    # Signed area, positive when counterclockwise
+    x, y = points[:,0], points[:,1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+def simplify_polyline(points, epsilon):
+    # Douglas-Peucker, keeps both ends
+    keep = np.zeros(len(points), dtype = bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        offsets = points[first+1:last] - points[first]
+        length = np.hypot(*segment)
+        if length:
+            distances = np.abs(segment[0] * offsets[:,1] - segment[1] * offsets[:,0]) / length
+        else:
+            distances = np.hypot(offsets[:,0], offsets[:,1])
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            index += first + 1
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return points[keep]
+
+def simplify_polygon(points, epsilon):
+    # Douglas-Peucker on a closed outline, split at its first point and the point farthest from it
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    if far == 0:
+        return points[:1]
+    head = simplify_polyline(points[:far+1], epsilon)
+    tail = simplify_polyline(np.vstack([points[far:], points[:1]]), epsilon)
+    return np.vstack([head, tail[1:-1]])
+
+def clip_polygon(points, low, high):
+    # Sutherland-Hodgman against the box from low to high, without repeated or aligned corners
+    for axis in (0, 1):
+        for bound, sign in ((low[axis], 1), (high[axis], -1)):
+            if not len(points):
+                return points
+            clipped = []
+            for a, b in zip(points, np.roll(points, -1, axis = 0)):
+                a_in = (a[axis] - bound) * sign >= 0
+                b_in = (b[axis] - bound) * sign >= 0
+                if a_in:
+                    clipped.append(a)
+                if a_in != b_in:
+                    clipped.append(a + (b - a) * (bound - a[axis]) / (b[axis] - a[axis]))
+            points = np.array(clipped, dtype = float).reshape(-1, 2)
+    
+    # Repeated corners against the last one kept, then around the end
+    corners = []
+    for point in points:
+        if not corners or not np.allclose(point, corners[-1]):
+            corners.append(point)
+    while len(corners) > 1 and np.allclose(corners[0], corners[-1]):
+        corners.pop()
+    
+    # Aligned corners, until none is left
+    aligned = True
+    while aligned and len(corners) > 2:
+        aligned = False
+        for i, point in enumerate(corners):
+            previous = corners[i-1]
+            following = corners[(i + 1) % len(corners)]
+            if abs((point[0] - previous[0]) * (following[1] - previous[1]) - (point[1] - previous[1]) * (following[0] - previous[0])) < 1e-9:
+                corners.pop(i)
+                aligned = True
+                break
+    return np.array(corners, dtype = float).reshape(-1, 2)
+
+def get_convex_hull(points):
+    # Monotone chain, counterclockwise
+    points = sorted(set(map(tuple, points.tolist())))
+    if len(points) < 3:
+        return np.array(points, dtype = float)
+    
+    def half(points):
+        chain = []
+        for p in points:
+            while len(chain) > 1 and (chain[-1][0] - chain[-2][0]) * (p[1] - chain[-2][1]) - (chain[-1][1] - chain[-2][1]) * (p[0] - chain[-2][0]) <= 0:
+                chain.pop()
+            chain.append(p)
+        return chain
+    
+    return np.array(half(points)[:-1] + half(points[::-1])[:-1], dtype = float)
+
+def triangulate_polygon(points):
+    # Ear clipping of a counterclockwise simple polygon, None when no ear is left, as with clockwise polygons
+    indices = list(range(len(points)))
+    triangles = []
+    while len(indices) > 3:
+        for k in range(len(indices)):
+            a, b, c = indices[k-1], indices[k], indices[(k+1) % len(indices)]
+            pa, pb, pc = points[a], points[b], points[c]
+            if (pb[0] - pa[0]) * (pc[1] - pa[1]) - (pb[1] - pa[1]) * (pc[0] - pa[0]) <= 0:
+                continue
+            
+            # No other corner in the ear
+            others = points[[i for i in indices if i not in (a, b, c)]]
+            d1 = (pb[0] - pa[0]) * (others[:,1] - pa[1]) - (pb[1] - pa[1]) * (others[:,0] - pa[0])
+            d2 = (pc[0] - pb[0]) * (others[:,1] - pb[1]) - (pc[1] - pb[1]) * (others[:,0] - pb[0])
+            d3 = (pa[0] - pc[0]) * (others[:,1] - pc[1]) - (pa[1] - pc[1]) * (others[:,0] - pc[0])
+            if np.any((d1 >= 0) & (d2 >= 0) & (d3 >= 0)):
+                continue
+            triangles.append((a, b, c))
+            indices.pop(k)
+            break
+        else:
+            return None
+    triangles.append(tuple(indices))
+    return triangles
+
+def get_cutout_polygons(mask, epsilon):
+    # Simplified outlines of the mask grown by epsilon plus one texel, so that they still cover all of it, clipped to the mask
+    border = int(np.ceil(epsilon)) + 2
+    seed_y, _, _ = get_nearest_seeds(np.pad(mask, border), epsilon + 1)
+    outlines = [outline - border for outline in trace_mask_outlines(seed_y >= 0) if get_polygon_area(outline) > 0]
+    
+    # Islands inside the holes of another one are already covered once the holes are ignored
+    polygons = []
+    for i, outline in enumerate(outlines):
+        # Center of the texel left of the first edge
+        direction = outline[1] - outline[0]
+        x, y = (outline[0] + outline[1]) * 0.5 + 0.5 * np.array([-direction[1], direction[0]])
+        inside = False
+        for j, other in enumerate(outlines):
+            if j == i:
+                continue
+            x0, y0 = other[:,0], other[:,1]
+            x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+            crossing = (y0 > y) != (y1 > y)
+            if np.count_nonzero(crossing & (x < x0 + (y - y0) * (x1 - x0) / np.where(y1 == y0, 1, y1 - y0))) % 2:
+                inside = True
+                break
+        if not inside:
+            polygons.append(clip_polygon(simplify_polygon(outline, epsilon), (0, 0), mask.shape[::-1]))
+    return [polygon for polygon in polygons if len(polygon) > 2]
+
+def get_billboard_cutout(mask, max_vertices = 16):
+    # Triangulated polygons covering the mask with at most max_vertices corners, in the [0, 1] billboard space
+    # Returns the vertices, the triangles and the part of the billboard they cover
+    rows, cols = mask.shape
+    quad = (np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype = float), np.array([[0, 1, 2], [2, 3, 0]]), 1.0)
+    if not mask.any() or max_vertices < 4:
+        return quad
+    
+    # Smallest tolerance meeting the vertex budget
+    best = None
+    low, high = 0.0, float(max(rows, cols))
+    for _ in range(16):
+        epsilon = (low + high) * 0.5
+        polygons = get_cutout_polygons(mask, epsilon)
+        if sum(len(polygon) for polygon in polygons) <= max_vertices:
+            best = polygons
+            high = epsilon
+        else:
+            low = epsilon
+    if not best:
+        return quad
+    
+    vertices = []
+    triangles = []
+    for polygon in best:
+        polygon_triangles = triangulate_polygon(polygon)
+        if polygon_triangles is None:
+            polygon = get_convex_hull(polygon)
+            polygon_triangles = [(0, i, i + 1) for i in range(1, len(polygon) - 1)]
+        triangles.extend(np.array(polygon_triangles) + sum(len(v) for v in vertices))
+        vertices.append(polygon)
+    vertices = np.clip(np.vstack(vertices) / [cols, rows], 0, 1)
+    triangles = np.array(triangles, dtype = int).reshape(-1, 3)
+    corners = vertices[triangles]
+    u = corners[:,1] - corners[:,0]
+    v = corners[:,2] - corners[:,0]
+    area = 0.5 * np.abs(u[:,0] * v[:,1] - u[:,1] * v[:,0]).sum()
+    return vertices, triangles, float(area)
@@ -6,11 +6,14 @@ import json
 import os
 import re
 import numpy as np
-import subprocess
 from copy import deepcopy
-from io_mesh_srt.utils import GetLoopDataPerVertex, GetCollection, JoinThem, getAttributesComponents, selectOnly, setAttribute, getSphere, TriangulateActiveMesh, SplitMesh, getMaterial, checkWeightPaint, updateVertexProperties
+from io_mesh_srt.srt_binary import write_srt_binary
+from io_mesh_srt.import_srt_json import GetRenderStateKey, get_srt_lod_source, get_srt_materials
+from io_mesh_srt.optimize_srt import TipsifyIndices, GetCacheStatistics, ReorderVertexFetch, OrderOverdraw, EstimateOverdraw, SplitDrawCall, MAX_16BIT_VERTICES
+from io_mesh_srt.tools.material_tools import COLLECTION_SETTINGS
+from io_mesh_srt.utils import GetCollection, JoinMeshArrays, getMaterialMeshArrays, getAttributesComponents, setAttribute, getSphere, getMaterial, updateVertexProperties
 
-def write_srt_json(context, filepath):
+def write_srt_json(context, filepath, optimize_vertex_cache = False, optimize_vertex_fetch = False, optimize_overdraw = False, split_draw_calls = True):
     wm = bpy.context.window_manager.speedtree
     collision_coll = None
     bb_coll = None
@@ -19,9 +22,7 @@ def write_srt_json(context, filepath):
     main_coll = GetCollection()
             
     if main_coll:
-        main_coll["EShaderGenerationMode"] = 'UNIFIED_SHADERS'
-        if wm.previewLod:
-            wm.previewLod = False
+        preview_lod = wm.previewLod
         for col in main_coll.children:
             if re.search("Collision Objects", col.name):
                 collision_coll = col
@@ -54,24 +55,14 @@ def write_srt_json(context, filepath):
                     srtCollision["m_vCenter1"] = dict(zip(['x','y','z'], pos))
                     srtCollision["m_vCenter2"] = srtCollision["m_vCenter1"]
                     srtCollision["m_fRadius"] = float(radius)
-                    
+                
                 else:
-                    selectOnly(collisionObject)
-                    bpy.ops.mesh.separate(type='MATERIAL')
-                    coll_meshes = []
-                    for subcollisionObject in collisionObjects:
-                        if re.sub(r'\.[0-9]*$', '', collisionObject.name) in subcollisionObject.name:
-                            coll_meshes.append(subcollisionObject)
-                            if "Material_Sphere1" in subcollisionObject.data.materials:
-                                pos, radius = getSphere(subcollisionObject)
-                                srtCollision["m_vCenter1"] = dict(zip(['x','y','z'], pos))
-                                srtCollision["m_fRadius"] = float(radius)
-                            if "Material_Sphere2" in subcollisionObject.data.materials:
-                                pos, radius = getSphere(subcollisionObject, False)
-                                srtCollision["m_vCenter2"] = dict(zip(['x','y','z'], pos))
- 
-                    JoinThem(coll_meshes)
-                    
+                    pos, radius = getSphere(collisionObject, material_name = "Material_Sphere1")
+                    srtCollision["m_vCenter1"] = dict(zip(['x','y','z'], pos))
+                    srtCollision["m_fRadius"] = float(radius)
+                    pos, radius = getSphere(collisionObject, False, "Material_Sphere2")
+                    srtCollision["m_vCenter2"] = dict(zip(['x','y','z'], pos))
+                
                 srtMain["CollisionObjects"].append(srtCollision)
             
         # Get and Write Vertical Billboards #VerticalBillboards
@@ -108,9 +99,6 @@ def write_srt_json(context, filepath):
                 if cutout_check:
                     cutout = re.findall(r"Mesh_cutout\.?\d*", str([x.name for x in bb_coll.objects]))        
                     cut_obj = bb_coll.objects[cutout[0]]
-                    selectOnly(cut_obj)
-                    #Triangulate mesh as user might make a custom cutout with quads
-                    TriangulateActiveMesh()
                     cut = cut_obj.data
                     billboard_cutout_nverts = len(cut.vertices)
                     cutout_vert_array = np.zeros(billboard_cutout_nverts * 3)
@@ -118,9 +106,11 @@ def write_srt_json(context, filepath):
                     cutout_vert_array[::3] = (cutout_vert_array[::3] - -bb_width * 0.5) / bb_width
                     cutout_vert_array[2::3] = (cutout_vert_array[2::3] - bb_bottom) / (bb_top - bb_bottom)
                     billboard_cutout_verts = [dict(zip(["x", "y"], x)) for x in cutout_vert_array.reshape(-1,3)[:,[0,2]]]
-                    n_indices = len(cut.polygons) * 3
+                    #Triangulate in memory as user might make a custom cutout with quads
+                    cut.calc_loop_triangles()
+                    n_indices = len(cut.loop_triangles) * 3
                     billboard_cutout_indices = np.zeros(n_indices, dtype = int)
-                    cut.attributes[".corner_vert"].data.foreach_get("value", billboard_cutout_indices)
+                    cut.loop_triangles.foreach_get("vertices", billboard_cutout_indices)
                        
             srtMain["VerticalBillboards"]["FWidth"] = bb_width
             srtMain["VerticalBillboards"]["FTopPos"] = bb_top
@@ -191,39 +181,74 @@ def write_srt_json(context, filepath):
         lodsNum = 0
         mesh_index = 0
         textures_names = []
+        cache_stats = []
+        overdraw_stats = []
+        index_stats = []
         if lod_colls:
+            srt_materials = get_srt_materials(main_coll)
             for col in lod_colls:
                 objects = col.objects
-                if objects:
+                if "SpeedTreeLodSource" in col:
+                    # Placeholder LOD, written back from the data it was imported from
+                    lodsNum += 1
+                    srt = get_srt_lod_source(col)
+                    srtLod = {"PDrawCalls":[]}
+                    for mesh_call in srt["Geometry"]["PLods"][col["SpeedTreeLodIndex"]]["PDrawCalls"]:
+                        srtRender = deepcopy(srt["Geometry"]["P3dRenderStateMain"][mesh_call["RenderStateIdx"]])
+                        state = GetRenderStateKey(srtRender)
+                        if state in srt_materials:
+                            # Edits made to the material in Blender
+                            textures_names.extend(getMaterial(main_coll, dict(srt_materials[state].items()), srtRender))
+                        else:
+                            for k in COLLECTION_SETTINGS:
+                                if k in main_coll:
+                                    srtRender[k] = bool(main_coll[k]) if k == 'BUsedAsGrass' else main_coll[k]
+                            textures_names.extend([x for x in srtRender["ApTextures"] if x])
+                        srtRender["EShaderGenerationMode"] = 'UNIFIED_SHADERS'
+                        srtRender["BFadeToBillboard"] = bool(col == lod_colls[-1] and bb_coll)
+                        srtDraw = dict(mesh_call)
+                        srtDraw["RenderStateIdx"] = mesh_index
+                        mesh_index += 1
+                        
+                        # Index width, splitting oversized draw calls if allowed, as for the built LODs
+                        draw_calls = SplitDrawCall(srtDraw) if split_draw_calls else [srtDraw]
+                        for draw_call in draw_calls:
+                            draw_call["is32BitIndex"] = draw_call["VertexData"]["count"] > MAX_16BIT_VERTICES
+                            index_stats.append(draw_call["is32BitIndex"])
+                        srtLod["PDrawCalls"].extend(draw_calls)
+                        
+                        # Write P3dRenderStateMain and P3dRenderStateShadow
+                        srtMain["Geometry"]["P3dRenderStateMain"].append(srtRender)
+                        srtMain["Geometry"]["P3dRenderStateShadow"].append(deepcopy(srtRender))
+                        for i,_ in enumerate(srtMain["Geometry"]["P3dRenderStateShadow"][-1]["ApTextures"]):
+                            if i:
+                                srtMain["Geometry"]["P3dRenderStateShadow"][-1]["ApTextures"][i] = ""
+                        srtMain["Geometry"]["P3dRenderStateShadow"][-1]["ERenderPass"] = "SHADOW_CAST"
+                        srtMain["Geometry"]["P3dRenderStateShadow"][-1]["BFadeToBillboard"] = False
+                    srtMain["Geometry"]["PLods"].append(srtLod)
+                    
+                    # Write Extent, kept from the file as the LOD isn't built
+                    if col == lod_colls[0]:
+                        srtMain["Extents"] = deepcopy(srt["Extents"])
+                
+                elif objects:
                     srtLod = {"PDrawCalls":[]}
                     # Get lodsNum
                     lodsNum += 1
-                    # Join meshes
-                    if len(objects) > 1:
-                        JoinThem(objects)
-                    # Prepare Mesh
-                    obj = objects[0]
-                    selectOnly(obj)
-                    #Edge Split where split normals or uv seam (necessary as these face corner data are stored per vertex in srt)
-                    #SplitMesh(mesh.data)
-                    TriangulateActiveMesh()
-                    bpy.ops.object.mode_set(mode='EDIT')
-                    bpy.ops.mesh.select_all(action="SELECT")
-                    bpy.ops.mesh.separate(type='MATERIAL') #Separate in Edit Mode to avoid messing up normals
-                    bpy.ops.mesh.select_all(action="DESELECT")
-                    bpy.ops.object.mode_set(mode='OBJECT')
-                        
-                    meshes = []
-                    for mesh in objects:
-                        meshes.append(mesh)
-                        mesh_data = mesh.data
-                        mat = mesh_data.materials[0]
+                    # Gather the LOD in memory, as if its objects were joined and triangulated
+                    lod_arrays = JoinMeshArrays(objects, preview_lod)
+                    
+                    # Split it per material
+                    for mat_index, material in enumerate(lod_arrays["materials"]):
+                        if material is None or not np.any(lod_arrays["tri_materials"] == mat_index):
+                            continue
+                        mat = dict(material.items())
                         if not mat["BRigidMeshesPresent"] or (mat["BFacingLeavesPresent"] and mat["BRigidMeshesPresent"]): #Dont export pure rigid meshes because not supported by RedEngine
                             srtRender = deepcopy(srtRenderTemplate)
                             srtDraw = deepcopy(srtDrawTemplate)
                             srtDraw["RenderStateIdx"] = mesh_index
                             mesh_index += 1
-
+                            
                             # Deal with Grass
                             if main_coll["BUsedAsGrass"]:
                                 mat["BBranchesPresent"] = False
@@ -231,111 +256,66 @@ def write_srt_json(context, filepath):
                                 mat["BLeavesPresent"] = True
                                 mat["BFacingLeavesPresent"] = True
                                 mat["BRigidMeshesPresent"] = True
-
-                            # Faces
-                            n_indices = len(mesh_data.polygons) * 3
-                            faces = np.zeros(n_indices, dtype = int)
-                            mesh_data.attributes[".corner_vert"].data.foreach_get("value", faces)
-                            faces = faces.tolist()
                             
                             # Get data per vertex
-                            # Verts' position
-                            mesh_vertices = mesh_data.vertices
-                            n_verts = len(mesh_vertices)
-                            n_verts_3 = n_verts * 3
-                            verts = np.zeros(n_verts_3)
-                            mesh_data.attributes["position"].data.foreach_get("vector", verts)
-                            verts = verts.reshape(-1,3).tolist()
-                            
-                            # Verts' lod position
-                            verts_lod = np.zeros(n_verts_3)
-                            mesh_data.attributes["vertexLodPosition"].data.foreach_get("vector", verts_lod)
-                            verts_lod = verts_lod.reshape(-1,3).tolist()
-                            
-                            # Leaf Card Corner
-                            leaf_card_corners = np.zeros(n_verts_3)
-                            mesh_data.attributes["leafCardCorner"].data.foreach_get("vector", leaf_card_corners)
-                            leaf_card_corners = leaf_card_corners.reshape(-1,3)[:,[1,2,0]].tolist()
-                            
-                            # Leaf Card LOD Scalar
-                            leaf_card_lod_scalars = np.zeros(n_verts)
-                            mesh_data.attributes["leafCardLodScalar"].data.foreach_get("value", leaf_card_lod_scalars)
-                            leaf_card_lod_scalars = leaf_card_lod_scalars.tolist()
-                            
-                            # Leaf Anchor Point
-                            leaf_anchor_points = np.zeros(n_verts_3)
-                            mesh_data.attributes["leafAnchorPoint"].data.foreach_get("vector", leaf_anchor_points)
-                            leaf_anchor_points = leaf_anchor_points.reshape(-1,3).tolist()
-                            
-                            # Diffuse UV
-                            uvs_diff = GetLoopDataPerVertex(mesh_data, "UV", "DiffuseUV")
-                            
-                            # Detail UV
-                            uvs_det = GetLoopDataPerVertex(mesh_data, "UV", "DetailUV")
-                            
-                            # Branch Seam Diffuse UV
-                            branches_seam_diff = GetLoopDataPerVertex(mesh_data, "UV", "SeamDiffuseUV")
-                            
-                            # Branch Seam Detail UV
-                            branches_seam_det = GetLoopDataPerVertex(mesh_data, "UV", "SeamDetailUV")
-                            
-                            # Normals
-                            normals = np.round((np.array(GetLoopDataPerVertex(mesh_data, "NORMAL")) / 2 + 0.5) * 255).tolist()
-                            
-                            # Tangents
-                            mesh_data.uv_layers.active = mesh_data.uv_layers["DiffuseUV"]
-                            mesh_data.calc_tangents()
-                            tangents = np.round((np.array(GetLoopDataPerVertex(mesh_data, "TANGENT")) / 2 + 0.5) * 255).tolist()
+                            mesh_arrays = getMaterialMeshArrays(lod_arrays, mat_index)
+                            faces = mesh_arrays["faces"]
+                            n_verts = mesh_arrays["count"]
+                            if optimize_overdraw and (mat["BLeavesPresent"] or mat["BFacingLeavesPresent"]):
+                                cache_stats.append([len(faces) // 3, n_verts, *GetCacheStatistics(faces, n_verts)])
+                                overdraw_stats.append([EstimateOverdraw(mesh_arrays["pos"], faces)])
+                                mesh_arrays["faces"] = OrderOverdraw(faces, n_verts, mesh_arrays["pos"])
+                                overdraw_stats[-1].append(EstimateOverdraw(mesh_arrays["pos"], mesh_arrays["faces"]))
+                                cache_stats[-1].extend(GetCacheStatistics(mesh_arrays["faces"], n_verts))
+                            elif optimize_vertex_cache:
+                                cache_stats.append([len(faces) // 3, n_verts, *GetCacheStatistics(faces, n_verts)])
+                                tipsified = TipsifyIndices(faces, n_verts)
+                                tipsified_stats = GetCacheStatistics(tipsified, n_verts)
+                                # Keep the input order when it already suits the cache better, as ring ordered branches do
+                                if tipsified_stats[0] < cache_stats[-1][2]:
+                                    mesh_arrays["faces"] = tipsified
+                                    cache_stats[-1].extend(tipsified_stats)
+                                else:
+                                    cache_stats[-1].extend(cache_stats[-1][2:4])
+                            if optimize_vertex_fetch:
+                                mesh_arrays = ReorderVertexFetch(mesh_arrays)
+                            faces = mesh_arrays["faces"]
+                            n_verts = mesh_arrays["count"]
+                            verts = mesh_arrays["pos"]
+                            verts_lod = mesh_arrays["lod_pos"]
+                            leaf_card_corners = mesh_arrays["leaf_card_corner"][:,[1,2,0]]
+                            leaf_card_lod_scalars = mesh_arrays["leaf_card_lod_scalar"]
+                            leaf_anchor_points = mesh_arrays["leaf_anchor_point"]
+                            uvs_diff = mesh_arrays["DiffuseUV"]
+                            uvs_det = mesh_arrays["DetailUV"]
+                            branches_seam_diff = mesh_arrays["SeamDiffuseUV"]
+                            branches_seam_det = mesh_arrays["SeamDetailUV"]
+                            normals = np.round((mesh_arrays["normals"] / 2 + 0.5) * 255)
+                            tangents = np.round((mesh_arrays["tangents"] / 2 + 0.5) * 255)
                             
-                            #Add values if missing just to make the exporter more robust
-                            checkWeightPaint(mesh, mesh_vertices[0].groups[mesh.vertex_groups["GeomType"].index].weight, mesh_vertices[0].groups[mesh.vertex_groups["WindFlag"].index].weight)
+                            # Get the vertex layer data  # Wind data, Geom Type, AO and Seam Blending
+                            geom_types = mesh_arrays["GeomType"]
+                            geom_types[geom_types == 0] = (1 + np.argmax([mat["BBranchesPresent"], mat["BFrondsPresent"], mat["BLeavesPresent"], mat["BFacingLeavesPresent"], mat["BRigidMeshesPresent"]])) * 0.2
+                            geom_types = np.round(geom_types*5-1)
+                            wind_weight1 = mesh_arrays["WindWeight1"]
+                            wind_weight2 = mesh_arrays["WindWeight2"]
+                            wind_normal1 = mesh_arrays["WindNormal1"]*16
+                            wind_normal2 = mesh_arrays["WindNormal2"]*16
+                            wind_extra1 = mesh_arrays["WindExtra1"]*16
+                            wind_extra2 = mesh_arrays["WindExtra2"]
+                            wind_extra3 = mesh_arrays["WindExtra3"]*2
+                            wind_flags = mesh_arrays["WindFlag"]
+                            ambients = np.round((1 - mesh_arrays["AmbientOcclusion"]) * 255)
+                            seam_blending = 1 - mesh_arrays["SeamBlending"]
                             
-                            # Get the vertex group data  # Wind data, Geom Type, AO and Seam Blending
-                            geom_types = []
-                            wind_weight1 = []
-                            wind_weight2 = []
-                            wind_normal1 = []
-                            wind_normal2 = []
-                            wind_extra1 = []
-                            wind_extra2 = []
-                            wind_extra3 = []
-                            wind_flags = []
-                            seam_blending = []
-                            ambients = []
-                            for k, vert in enumerate(mesh_vertices):
-                                for g in vert.groups:
-                                    match mesh.vertex_groups[g.group].name:
-                                        case "GeomType":
-                                            geom_types.append(int(g.weight*5-1))
-                                        case "WindWeight1":
-                                            wind_weight1.append(g.weight)
-                                        case "WindWeight2":
-                                            wind_weight2.append(g.weight)
-                                        case "WindNormal1":
-                                            wind_normal1.append(g.weight*16)
-                                        case "WindNormal2":
-                                            wind_normal2.append(g.weight*16)
-                                        case "WindExtra1":
-                                            wind_extra1.append(g.weight*16)
-                                        case "WindExtra2":
-                                            wind_extra2.append(g.weight)
-                                        case "WindExtra3":
-                                            wind_extra3.append(g.weight*2)
-                                        case "WindFlag":
-                                            wind_flags.append(g.weight)
-                                        case "AmbientOcclusion":
-                                            ambients.append(round((1 - g.weight) * 255))
-                                        case "SeamBlending":
-                                            seam_blending.append(1 - g.weight)
-                                            
                             # Assemble different data types
-                            branches_seam_diff = np.c_[branches_seam_diff, seam_blending].tolist()
-                            wind_branch = np.c_[wind_weight1, wind_normal1, wind_weight2, wind_normal2].tolist()
-                            wind_extra = np.c_[wind_extra1, wind_extra2, wind_extra3].tolist()
+                            branches_seam_diff = np.c_[branches_seam_diff, seam_blending]
+                            wind_branch = np.c_[wind_weight1, wind_normal1, wind_weight2, wind_normal2]
+                            wind_extra = np.c_[wind_extra1, wind_extra2, wind_extra3]
                                         
                             # Geom Types for GRASS
                             if main_coll["BUsedAsGrass"]:
-                                geom_types = np.ones(n_verts).tolist()
+                                geom_types = np.ones(n_verts)
                                 
                             # Write Mesh Data
                             srtDraw["IndexData"] = faces
@@ -619,6 +599,7 @@ def write_srt_json(context, filepath):
                             # Write mesh material
                             srtRender["SVertexDecl"]["size"] = offset
                             textures_names.extend(getMaterial(main_coll, mat, srtRender))
+                            srtRender["EShaderGenerationMode"] = 'UNIFIED_SHADERS'
                             if col == lod_colls[-1] and bb_coll: #or horiz_coll:
                                 srtRender["BFadeToBillboard"] = True 
                             if mat["BFacingLeavesPresent"]: #Ensure that Facing leaves have no culling method
@@ -670,7 +651,12 @@ def write_srt_json(context, filepath):
                             # Attrib 18
                             setAttribute(srtAttributes, 18, "AMBIENT_OCCLUSION", "BYTE", properties, components, offsets, attributes_components, attributes)
                                 
-                            srtLod["PDrawCalls"].append(srtDraw)
+                            # Index width, splitting oversized draw calls if allowed
+                            draw_calls = SplitDrawCall(srtDraw) if split_draw_calls else [srtDraw]
+                            for draw_call in draw_calls:
+                                draw_call["is32BitIndex"] = draw_call["VertexData"]["count"] > MAX_16BIT_VERTICES
+                                index_stats.append(draw_call["is32BitIndex"])
+                            srtLod["PDrawCalls"].extend(draw_calls)
                             
                             # Write P3dRenderStateMain 
                             srtMain["Geometry"]["P3dRenderStateMain"].append(srtRender)
@@ -683,17 +669,13 @@ def write_srt_json(context, filepath):
                             srtMain["Geometry"]["P3dRenderStateShadow"][-1]["ERenderPass"] = "SHADOW_CAST"
                             srtMain["Geometry"]["P3dRenderStateShadow"][-1]["BFadeToBillboard"] = False
                             
-                    #Join meshes back again  
-                    JoinThem(meshes)
-                    
                     # Write Lod Data
                     srtMain["Geometry"]["PLods"].append(srtLod)     
                     
                     # Write Extent
                     if col == lod_colls[0]:
-                        Extent = np.array(objects[0].bound_box)
-                        srtMain["Extents"]["m_cMin"] = list(Extent[0])
-                        srtMain["Extents"]["m_cMax"] = list(Extent[6]) 
+                        srtMain["Extents"]["m_cMin"] = lod_arrays["pos"].min(axis = 0).tolist()
+                        srtMain["Extents"]["m_cMax"] = lod_arrays["pos"].max(axis = 0).tolist()
                     
         # Write LodProfile
         for k in srtMain["LodProfile"]:
@@ -726,10 +708,22 @@ def write_srt_json(context, filepath):
         while len(srtMain["PUserStrings"]) < 5:
             srtMain["PUserStrings"].append("")
         
-        # Write the template with generated values
-        short_filepath = filepath[:-4]
-        with open(short_filepath, 'w', encoding = 'utf-8') as f:
-            json.dump(srtMain, f, indent=2)
-        command = [os.path.dirname(__file__) +"/converter/srt_json_converter.exe", "-e", short_filepath, "-o", os.path.dirname(filepath)]
-        subprocess.run(command)
-        os.remove(short_filepath)
\ No newline at end of file
+        # Write the srt file
+        write_srt_binary(filepath, srtMain)
+        
+        # Vertex cache statistics over all draw calls, weighted by triangles and vertices
+        stats = {}
+        if cache_stats:
+            cache_stats = np.array(cache_stats)
+            n_tris = max(cache_stats[:,0].sum(), 1)
+            n_verts = max(cache_stats[:,1].sum(), 1)
+            stats["acmr_before"] = (cache_stats[:,2] * cache_stats[:,0]).sum() / n_tris
+            stats["atvr_before"] = (cache_stats[:,3] * cache_stats[:,1]).sum() / n_verts
+            stats["acmr_after"] = (cache_stats[:,4] * cache_stats[:,0]).sum() / n_tris
+            stats["atvr_after"] = (cache_stats[:,5] * cache_stats[:,1]).sum() / n_verts
+        if overdraw_stats:
+            stats["overdraw_before"], stats["overdraw_after"] = np.mean(overdraw_stats, axis = 0)
+        stats["draw_calls"] = len(index_stats)
+        stats["draw_calls_32bit"] = sum(index_stats)
+        stats["draw_calls_split"] = len(index_stats) - mesh_index
+        return stats
\ No newline at end of file
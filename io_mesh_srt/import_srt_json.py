@@ -2,31 +2,339 @@
 # import_srt_json.py
 
 import bpy
+import hashlib
+import importlib
 import json
 import os.path
 import re
+import sys
+import time
 import numpy as np
-import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from copy import deepcopy
 from bpy_extras.object_utils import object_data_add
+from io_mesh_srt.srt_binary import decode_srt_file, read_vertex_data
+from io_mesh_srt.srt_cache import load_srt_cache, store_srt_cache, CACHE_SIZE
 from io_mesh_srt.tools.collision_tools import add_srt_sphere, add_srt_connection
 from io_mesh_srt.tools.billboard_tools import generate_srt_billboards, generate_srt_horizontal_billboard
-from io_mesh_srt.tools.setup_tools import srt_mesh_setup
-from io_mesh_srt.utils import JoinThem, getTextureAttributeName
+from io_mesh_srt.tools.setup_tools import srt_mesh_setup, srt_material_setup
+from io_mesh_srt.tools.material_tools import get_srt_material_settings, set_srt_material, MATERIAL_IGNORED_PARAMS, COLLECTION_SETTINGS
+from io_mesh_srt.utils import GetCollection, preloadSRTTextures
 
-def read_srt_json(context, filepath, facing_leaves_normals = False):
-    if os.path.splitext(os.path.basename(filepath))[1] == ".srt":
-        import subprocess
-        command = [os.path.dirname(__file__) +"/converter/srt_json_converter.exe", "-d", filepath, "-o", os.path.dirname(filepath)]
-        subprocess.run(command)
-        filepath += ".json"
+# Decoded files of the LODs left as placeholders, by path and size:modification time
+LAZY_LOD_SOURCES = {}
+
+def GetRenderStateKey(srtMat):
+    # Render states only differing by what the material ignores share one material
+    return hashlib.sha1(json.dumps({k: v for k, v in srtMat.items() if k not in MATERIAL_IGNORED_PARAMS}, sort_keys = True, default = str).encode('utf-8')).hexdigest()
+
+def JoinVertexData(vert_datas):
+    # Concatenate the vertex data of several draw calls, with neutral values where one lacks a key
+    joined = {}
+    for key in set().union(*vert_datas):
+        if key == "count":
+            continue
+        width = next(vert_data[key] for vert_data in vert_datas if key in vert_data).shape[1:]
+        values = []
+        for vert_data in vert_datas:
+            if key in vert_data:
+                values.append(vert_data[key].astype(np.float32))
+            elif key == "lod_pos":
+                values.append(vert_data["pos"].astype(np.float32))
+            else:
+                value = np.zeros((int(vert_data["count"]), *width), dtype = np.float32)
+                if key == "ambient_occlusion":
+                    value[:] = 1
+                elif key == "branch_seam_diffuse":
+                    value[:,2] = 1
+                values.append(value)
+        joined[key] = np.concatenate(values)
+    joined["count"] = sum(int(vert_data["count"]) for vert_data in vert_datas)
+    return joined
+
+def get_srt_lod_materials(srt, draw_calls, main_coll, filepath, shared_materials):
+    # One material per unique render state, set up on first use and shared afterwards, and the material index of each draw call
+    grass = srt["Geometry"]["P3dRenderStateMain"][draw_calls[0]["RenderStateIdx"]]['BUsedAsGrass']
+    states = []
+    materials = []
+    call_materials = []
+    for mesh_call in draw_calls:
+        srtMat = srt["Geometry"]["P3dRenderStateMain"][mesh_call["RenderStateIdx"]]
+        state = GetRenderStateKey(srtMat)
+        if state not in states:
+            states.append(state)
+            if state not in shared_materials:
+                mat = srt_material_setup(srtMat)
+                mat["SpeedTreeRenderState"] = state
+                
+                # Set the Material and its Textures
+                settings = get_srt_material_settings(srtMat, os.path.dirname(filepath))
+                
+                # Determine if Caps
+                if srtMat['BFrondsPresent'] and not grass and srtMat['EDetailLayer'] in ['ON', "OFF__X__ON"]:
+                    settings['BCaps'] = True
+                set_srt_material(mat, settings)
+                for j in COLLECTION_SETTINGS:
+                    main_coll[j] = srtMat[j]
+                shared_materials[state] = mat
+            materials.append(shared_materials[state])
+        call_materials.append(states.index(state))
+    return materials, call_materials
+
+def get_srt_materials(main_coll):
+    # Materials of a SRT asset by render state
+    materials = {}
+    for obj in main_coll.all_objects:
+        for mat in getattr(obj.data, "materials", []):
+            if mat and "SpeedTreeRenderState" in mat:
+                materials[mat["SpeedTreeRenderState"]] = mat
+    return materials
+
+def read_srt_lod(context, srt, lod_index, main_coll, filepath, facing_leaves_normals = False, shared_materials = None):
+    # Build one LOD as a mesh in the active collection, reusing the materials of shared_materials
+    if shared_materials is None:
+        shared_materials = {}
+    draw_calls = srt["Geometry"]["PLods"][lod_index]["PDrawCalls"]
+    
+    # Ensure that grasses get imported with only one material
+    grass = srt["Geometry"]["P3dRenderStateMain"][draw_calls[0]["RenderStateIdx"]]['BUsedAsGrass']
+    if grass:
+        draw_calls = draw_calls[:1]
+    materials, call_materials = get_srt_lod_materials(srt, draw_calls, main_coll, filepath, shared_materials)
+    
+    # For each material
+    vert_datas = []
+    faces = []
+    face_materials = []
+    facing_verts = []
+    n_verts = 0
+    for mesh_call, mat_index in zip(draw_calls, call_materials):
+        srtMat = srt["Geometry"]["P3dRenderStateMain"][mesh_call["RenderStateIdx"]]
+        
+        # Get Vertex Data, as typed arrays without null values
+        vert_data = read_vertex_data(mesh_call["VertexData"], srtMat["SVertexDecl"])
+        
+        # Deal with int to byte to float conversion if needed
+        for attr in srtMat["SVertexDecl"]["AsAttributes"]:
+            if isinstance(attr, dict) and attr["format"] == "BYTE":
+                if "NORMAL" in attr["properties"]:
+                    vert_data["normals"] = vert_data["normals"] * np.float32(2 / 255) - 1
+                #if "TANGENT" in attr["properties"]:
+                #    vert_data["tangents"] = (np.array(vert_data["tangents"]) / 255 - 0.5) * 2)
+                #Tangents are read-only in Blender, we can't import them
+                if "AMBIENT_OCCLUSION" in attr["properties"]:
+                    vert_data["ambient_occlusion"] = vert_data["ambient_occlusion"] * np.float32(1 / 255)
+        
+        # Convert Leaf Card Corner
+        if "leaf_card_corner" in vert_data:
+            vert_data["leaf_card_corner"] = vert_data["leaf_card_corner"][:,[2,0,1]]
+            
+        # Geometry Type of the draw call, for vertices without their own
+        if "geometry_type_hint" not in vert_data:
+            vert_data["geometry_type_hint"] = np.full(vert_data["count"], np.argmax([srtMat["BBranchesPresent"], srtMat["BFrondsPresent"], srtMat["BLeavesPresent"], srtMat["BFacingLeavesPresent"], srtMat["BRigidMeshesPresent"]]))
+        vert_datas.append(vert_data)
+        
+        # Face indices, offset into the LOD vertices
+        mesh_faces = np.array(mesh_call["IndexData"]).reshape(-1,3)
+        faces.append(mesh_faces + n_verts)
+        face_materials.append(np.full(len(mesh_faces), mat_index))
+        facing_verts.append(np.full(vert_data["count"], facing_leaves_normals and srtMat['BFacingLeavesPresent'] and not grass))
+        n_verts += int(vert_data["count"])
+        
+    # Gather the draw calls of the LOD
+    vert_data = JoinVertexData(vert_datas)
+    faces = np.concatenate(faces)
+    face_materials = np.concatenate(face_materials)
+    facing_verts = np.concatenate(facing_verts)
+    n_faces = len(faces)
+             
+    # Add the mesh to the scene
+    mesh = bpy.data.meshes.new(name="Mesh_lod"+str(lod_index))
+    mesh.vertices.add(n_verts)
+    mesh.vertices.foreach_set("co", vert_data["pos"].flatten())
+    mesh.loops.add(n_faces * 3)
+    mesh.loops.foreach_set("vertex_index", faces.flatten())
+    mesh.polygons.add(n_faces)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, n_faces * 3, 3))
+    mesh.polygons.foreach_set("material_index", face_materials)
+    mesh.update()
+    obj = object_data_add(context, mesh)
+    mesh.shade_smooth()
+    
+    # Set Up the SRT Asset, once per LOD, with one material per unique render state
+    srtMat = srt["Geometry"]["P3dRenderStateMain"][draw_calls[0]["RenderStateIdx"]]
+    geom_type = ['0.2', '0.4', '0.6', '0.8', '1.0'][np.argmax([srtMat["BBranchesPresent"], srtMat["BFrondsPresent"], srtMat["BLeavesPresent"], srtMat["BFacingLeavesPresent"], srtMat["BRigidMeshesPresent"]])]
+    srt_mesh_setup(bpy.context, obj, geom_type, vert_data, materials[0])
+    for mat in materials[1:]:
+        mesh.materials.append(mat)
+    
+    # Alternative normal import if requested
+    if facing_verts.any():
+        if "custom_normal" not in mesh.attributes:
+            mesh.attributes.new("custom_normal", "FLOAT_VECTOR", "POINT")
+        mesh.attributes["custom_normal"].data.foreach_set("vector", (vert_data["normals"] * facing_verts[:,None]).flatten())
+    
+    # Normals
+    #bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+    #bpy.ops.mesh.normals_make_consistent(inside=False)
+    #bpy.ops.object.mode_set(mode='OBJECT')
+    mesh.normals_split_custom_set_from_vertices(vert_data["normals"])
+    #Tangents are read-only in Blender, we can't import them
+
+def add_srt_lod_proxy(context, srt, lod_index, main_coll, filepath, shared_materials):
+    # Bounding box of the asset in the active collection, holding the materials of a LOD that wasn't built
+    draw_calls = srt["Geometry"]["PLods"][lod_index]["PDrawCalls"]
+    if srt["Geometry"]["P3dRenderStateMain"][draw_calls[0]["RenderStateIdx"]]['BUsedAsGrass']:
+        draw_calls = draw_calls[:1]
+    materials = get_srt_lod_materials(srt, draw_calls, main_coll, filepath, shared_materials)[0]
+    low = srt["Extents"]["m_cMin"]
+    high = srt["Extents"]["m_cMax"]
+    verts = [[(low, high)[(k >> j) & 1][j] for j in range(3)] for k in range(8)]
+    faces = [[0,2,3,1], [4,5,7,6], [0,1,5,4], [2,6,7,3], [0,4,6,2], [1,3,7,5]]
+    mesh = bpy.data.meshes.new(name="Proxy_lod"+str(lod_index))
+    mesh.from_pydata(verts, [], faces)
+    for mat in materials:
+        mesh.materials.append(mat)
+    obj = object_data_add(context, mesh)
+    obj.display_type = 'BOUNDS'
+    obj["SpeedTreeProxy"] = True
+    return obj
+
+def get_srt_lod_source(lod_coll):
+    # Decoded file of a placeholder LOD, decoded again if it isn't loaded anymore
+    filepath = lod_coll["SpeedTreeLodSource"]
+    stat = os.stat(filepath)
+    if str(stat.st_size) + ":" + str(stat.st_mtime_ns) != lod_coll["SpeedTreeLodStamp"]:
+        raise ValueError(lod_coll.name + " can't be read anymore, its file changed since the import: " + filepath)
+    key = (filepath, lod_coll["SpeedTreeLodStamp"])
+    if key not in LAZY_LOD_SOURCES:
+        srt = load_srt_cache(filepath)
+        LAZY_LOD_SOURCES[key] = srt if srt is not None else decode_srt_file(filepath)[0]
+    return LAZY_LOD_SOURCES[key]
+
+def materialize_srt_lods(context, main_coll):
+    # Build the placeholder LODs of a SRT asset, sharing the materials already imported, return how many were built
+    shared_materials = get_srt_materials(main_coll)
+    
+    parent_coll = bpy.context.view_layer.active_layer_collection
+    GetCollection()
+    main_coll_layer = bpy.context.view_layer.active_layer_collection
+    n_lods = 0
+    for lod_coll in main_coll.children:
+        if "SpeedTreeLodSource" not in lod_coll:
+            continue
+        srt = get_srt_lod_source(lod_coll)
+        bpy.context.view_layer.active_layer_collection = main_coll_layer.children[lod_coll.name]
+        read_srt_lod(context, srt, lod_coll["SpeedTreeLodIndex"], main_coll, lod_coll["SpeedTreeLodSource"], lod_coll["SpeedTreeLodFacingNormals"], shared_materials)
+        for obj in [obj for obj in lod_coll.objects if "SpeedTreeProxy" in obj]:
+            mesh = obj.data
+            bpy.data.objects.remove(obj)
+            bpy.data.meshes.remove(mesh)
+        for k in ["SpeedTreeLodSource", "SpeedTreeLodStamp", "SpeedTreeLodIndex", "SpeedTreeLodFacingNormals"]:
+            del lod_coll[k]
+        n_lods += 1
+    bpy.context.view_layer.active_layer_collection = parent_coll
+    return n_lods
+
+def decode_srt_files(filepaths, use_cache = False, cache_size = CACHE_SIZE, read_geometry = True):
+    # Yield each file decoded, or the error it raised, with the decoding time, as soon as it is ready
+    pending = []
+    for filepath in filepaths:
+        start = time.perf_counter()
+        srt = load_srt_cache(filepath) if use_cache else None
+        if srt is None:
+            pending.append(filepath)
+        else:
+            yield filepath, srt, time.perf_counter() - start
+    if not pending:
+        return
     
+    # Header sections alone are decoded faster than worker processes start
+    if not read_geometry:
+        for filepath in pending:
+            try:
+                srt, seconds = decode_srt_file(filepath, False)
+            except Exception as error:
+                yield filepath, error, 0.0
+                continue
+            yield filepath, srt, seconds
+        return
+    
+    # Worker processes can't import the addon package as it needs bpy, only the decoder module on its own
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    if addon_dir not in sys.path:
+        sys.path.append(addon_dir)
+    srt_decoder = importlib.import_module("srt_binary")
+    with ProcessPoolExecutor(min(len(pending), os.cpu_count() or 1)) as pool:
+        futures = {pool.submit(srt_decoder.decode_srt_file, filepath, read_geometry): filepath for filepath in pending}
+        for future in as_completed(futures):
+            filepath = futures[future]
+            try:
+                try:
+                    srt, seconds = future.result()
+                except BrokenProcessPool:
+                    srt, seconds = decode_srt_file(filepath, read_geometry)
+                if use_cache:
+                    store_srt_cache(filepath, srt, cache_size)
+            except Exception as error:
+                yield filepath, error, 0.0
+                continue
+            yield filepath, srt, seconds
+
+def get_srt_folder_files(directory):
+    # .srt and .json files of a folder, a converter .srt.json next to its .srt being the same tree
+    names = sorted(os.listdir(directory))
+    filepaths = []
+    for name in names:
+        root, ext = os.path.splitext(name)
+        if ext.lower() == ".srt" or (ext.lower() == ".json" and root not in names):
+            filepaths.append(os.path.join(directory, name))
+    return filepaths
+
+def read_srt_json_batch(context, filepaths, facing_leaves_normals = False, use_cache = False, cache_size = CACHE_SIZE, max_lods = 0, metadata_only = False):
+    # Decode the files in parallel, only build their Blender data on the main thread, return the time spent per file
+    timings = []
+    wm = bpy.context.window_manager
+    parent_coll = bpy.context.view_layer.active_layer_collection
+    wm.progress_begin(0, len(filepaths))
+    try:
+        for filepath, srt, decode_time in decode_srt_files(filepaths, use_cache and not metadata_only, cache_size, not metadata_only):
+            if isinstance(srt, Exception):
+                timings.append((filepath, decode_time, 0.0, srt))
+            else:
+                start = time.perf_counter()
+                bpy.context.view_layer.active_layer_collection = parent_coll
+                try:
+                    read_srt_json(context, filepath, facing_leaves_normals, srt = srt, max_lods = max_lods, metadata_only = metadata_only)
+                    timings.append((filepath, decode_time, time.perf_counter() - start, None))
+                except Exception as error:
+                    timings.append((filepath, decode_time, time.perf_counter() - start, error))
+            wm.progress_update(len(timings))
+    finally:
+        wm.progress_end()
+        bpy.context.view_layer.active_layer_collection = parent_coll
+    return timings
+
+def read_srt_json(context, filepath, facing_leaves_normals = False, use_cache = False, cache_size = CACHE_SIZE, srt = None, max_lods = 0, metadata_only = False):
     file_name = os.path.splitext(os.path.basename(filepath))[0]
     if file_name.endswith(".srt"):
         file_name = file_name[:-4]
     
-    with open(filepath, 'r', encoding='utf-8') as file:
-        srt = json.load(file)
+    # Without geometry, the file is read up to its geometry data only and not cached
+    if metadata_only:
+        use_cache = False
+        srt = srt or decode_srt_file(filepath, False)[0]
+    if srt is None and use_cache:
+        srt = load_srt_cache(filepath)
+    if srt is None:
+        srt = decode_srt_file(filepath)[0]
+        if use_cache:
+            store_srt_cache(filepath, srt, cache_size)
+        
+    # Load every texture once, reading the files in parallel
+    states = [*srt["Geometry"]["P3dRenderStateMain"], srt["Geometry"].get("ABillboardRenderStateMain", {})]
+    preloadSRTTextures([os.path.dirname(filepath) + "\\" + tex for state in states for tex in state.get("ApTextures", []) if tex])
         
     wm = bpy.context.window_manager.speedtree  
         
@@ -111,21 +419,11 @@ def read_srt_json(context, filepath, facing_leaves_normals = False):
             main_coll["FBottomPos"] = bb_bottom
             main_coll["BCutout"] = ncutout > 0
             
-            # Set the Textures
+            # Set the Material and its Textures
             bbMat = srt["Geometry"]["ABillboardRenderStateMain"]
-            for k, tex in enumerate(bbMat["ApTextures"]):
-                if tex:
-                    setattr(wm, getTextureAttributeName(k), os.path.dirname(filepath) + "\\" + tex)
-            
-            # Set the Material
-            for param in ["ApTextures", "BFadeToBillboard", "BVertBillboard", "BHorzBillboard", "ERenderPass", "SVertexDecl", "PDescription", "PUserData"]:
-                    bbMat.pop(param)
-            for k in ["VAmbientColor", "VDiffuseColor", "VSpecularColor", "VTransmissionColor"]:
-                bbMat[k] = (*list(bbMat[k].values()), 1)
-            bbMat["FShininess"] /= 128
-                
-            for k in bbMat:
-                setattr(wm, k, bbMat[k])
+            set_srt_material(bpy.context.active_object.active_material, get_srt_material_settings(bbMat, os.path.dirname(filepath)))
+            for k in COLLECTION_SETTINGS:
+                main_coll[k] = bbMat[k]
                 
             # Cutout 
             if ncutout and nbb:
@@ -152,98 +450,35 @@ def read_srt_json(context, filepath, facing_leaves_normals = False):
             
            
     # Geometry Data #
+    shared_materials = {}
     # For each LOD
     for i, lod in enumerate(srt["Geometry"]["PLods"]):
-        meshes = []
+        draw_calls = lod["PDrawCalls"]
+        if not draw_calls:
+            continue
         
         # Collections creation
         lod_coll = bpy.data.collections.new("LOD"+str(i))
         main_coll.children.link(lod_coll)
-        bpy.context.view_layer.active_layer_collection = parent_coll.children[main_coll_name].children[lod_coll.name]
-
-        # For each material
-        for mesh_call in lod["PDrawCalls"]:
-            srtMat = deepcopy(srt["Geometry"]["P3dRenderStateMain"][mesh_call["RenderStateIdx"]])
-            
-            # Get Vertex Data
-            vert_data = mesh_call["VertexData"]
-            
-            # Deal with Null Values
-            for key in vert_data.keys():
-                vert_data[key] = np.array(vert_data[key])
-                vert_data[key][vert_data[key] == None] = 0
-            
-            # Deal with int to byte to float conversion if needed
-            for attr in srtMat["SVertexDecl"]["AsAttributes"]:
-                if isinstance(attr, dict) and attr["format"] == "BYTE":
-                    if "NORMAL" in attr["properties"]:
-                        vert_data["normals"] = (vert_data["normals"] / 255 - 0.5) * 2
-                    #if "TANGENT" in attr["properties"]:
-                    #    vert_data["tangents"] = (np.array(vert_data["tangents"]) / 255 - 0.5) * 2)
-                    #Tangents are read-only in Blender, we can't import them
-                    if "AMBIENT_OCCLUSION" in attr["properties"]:
-                        vert_data["ambient_occlusion"] = vert_data["ambient_occlusion"] / 255
-            
-            # Convert Leaf Card Corner
-            if "leaf_card_corner" in vert_data:
-                vert_data["leaf_card_corner"] = vert_data["leaf_card_corner"][:,[2,0,1]]
-
-            # Face indices
-            faces = np.array(mesh_call["IndexData"]).reshape(-1,3)
-                 
-            # Add the mesh to the scene
-            mesh = bpy.data.meshes.new(name="Mesh_lod"+str(i))
-            mesh.from_pydata(vert_data["pos"], [], faces)
-            obj = object_data_add(context, mesh)
-            mesh.shade_smooth()
-            meshes.append(obj)
-            
-            # Set Up the SRT Asset
-            geom_type = ['0.2', '0.4', '0.6', '0.8', '1.0'][np.argmax([srtMat["BBranchesPresent"], srtMat["BFrondsPresent"], srtMat["BLeavesPresent"], srtMat["BFacingLeavesPresent"], srtMat["BRigidMeshesPresent"]])]
-            srt_mesh_setup(bpy.context, obj, geom_type, vert_data)
-            
-            # Alternative normal import if requested
-            grass = srtMat['BUsedAsGrass']
-            facing = srtMat['BFacingLeavesPresent']
-            if facing_leaves_normals and facing and not grass:
-                if "custom_normal" not in mesh.attributes:
-                    mesh.attributes.new("custom_normal", "FLOAT_VECTOR", "POINT")
-                mesh.attributes["custom_normal"].data.foreach_set("vector", vert_data["normals"].flatten())
         
-            # Normals
-            #bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-            #bpy.ops.mesh.normals_make_consistent(inside=False)
-            #bpy.ops.object.mode_set(mode='OBJECT')
-            mesh.normals_split_custom_set_from_vertices(vert_data["normals"])
-            #Tangents are read-only in Blender, we can't import them
-            
-            # Set the Textures
-            for k, tex in enumerate(srtMat["ApTextures"]):
-                if tex:
-                    setattr(wm, getTextureAttributeName(k), os.path.dirname(filepath) + "\\" + tex)
-            
-            # Set the Material
-            for param in ["ApTextures", "BFadeToBillboard", "BVertBillboard", "BHorzBillboard", "ERenderPass", "SVertexDecl", "PDescription", "PUserData"]:
-                srtMat.pop(param)
-            for k in ["VAmbientColor", "VDiffuseColor", "VSpecularColor", "VTransmissionColor"]:
-                srtMat[k] = (*list(srtMat[k].values()), 1)
-            srtMat["FShininess"] /= 128
-                
-            for k in srtMat:
-                setattr(wm, k, srtMat[k])
-                
-            # Determine if Caps
-            if srtMat['BFrondsPresent'] and not grass and srtMat['EDetailLayer'] in ['ON', "OFF__X__ON"]:
-                setattr(wm, 'BCaps', True)
-            
-            # Ensure that grasses get imported with only one material    
-            if grass:
-                break
-            
+        # Later LODs only keep a reference to their data until they are materialized
+        if metadata_only or (max_lods and i >= max_lods):
+            stat = os.stat(filepath)
+            lod_coll["SpeedTreeLodSource"] = os.path.abspath(filepath)
+            lod_coll["SpeedTreeLodStamp"] = str(stat.st_size) + ":" + str(stat.st_mtime_ns)
+            lod_coll["SpeedTreeLodIndex"] = i
+            lod_coll["SpeedTreeLodFacingNormals"] = facing_leaves_normals
+            if metadata_only:
+                bpy.context.view_layer.active_layer_collection = parent_coll.children[main_coll_name].children[lod_coll.name]
+                add_srt_lod_proxy(context, srt, i, main_coll, filepath, shared_materials)
+            else:
+                LAZY_LOD_SOURCES[(lod_coll["SpeedTreeLodSource"], lod_coll["SpeedTreeLodStamp"])] = srt
+        else:
+            bpy.context.view_layer.active_layer_collection = parent_coll.children[main_coll_name].children[lod_coll.name]
+            read_srt_lod(context, srt, i, main_coll, filepath, facing_leaves_normals, shared_materials)
+        
         # Ensure that grasses get imported with only one lod
-        if grass:
+        if srt["Geometry"]["P3dRenderStateMain"][draw_calls[0]["RenderStateIdx"]]['BUsedAsGrass']:
             break
-        # Join submeshes under the same LOD
-        JoinThem(meshes)
         
     bpy.context.view_layer.active_layer_collection = parent_coll.children[main_coll_name]
\ No newline at end of file
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# optimize_srt.py
+
+import numpy as np
+from collections import deque
+
+VERTEX_CACHE_SIZE = 16
+MAX_16BIT_VERTICES = 65535
+OVERDRAW_RESOLUTION = 128
+# Directions towards the camera, around the tree and from above
+OVERDRAW_VIEWS = np.array([[np.cos(a), np.sin(a), 0] for a in np.arange(8) * np.pi / 4] + [[0, 0, 1]])
+
+def GetVertexTriangles(faces, n_verts):
+    # Triangles using each vertex, as offsets into a flat array
+    tris = np.argsort(faces, kind = "stable") // 3
+    offsets = np.zeros(n_verts + 1, dtype = int)
+    np.cumsum(np.bincount(faces, minlength = n_verts), out = offsets[1:])
+    return tris, offsets
+
+def GetCacheStatistics(faces, n_verts, cache_size = VERTEX_CACHE_SIZE):
+    # Simulate a FIFO post-transform cache, return ACMR and ATVR
+    n_tris = len(faces) // 3
+    if not n_tris:
+        return 0.0, 0.0
+    cache = deque()
+    cached = np.zeros(n_verts, dtype = bool)
+    misses = 0
+    for vert in faces.tolist():
+        if not cached[vert]:
+            misses += 1
+            cached[vert] = True
+            cache.append(vert)
+            if len(cache) > cache_size:
+                cached[cache.popleft()] = False
+    return misses / n_tris, misses / max(n_verts, 1)
+
+def TipsifyIndices(faces, n_verts, cache_size = VERTEX_CACHE_SIZE, return_clusters = False):
+    # Reorder the triangles for the post-transform vertex cache (Sander, Nehab and Barczak 2007)
+    faces = np.asarray(faces, dtype = int).ravel()
+    n_tris = len(faces) // 3
+    if n_tris < 2:
+        if return_clusters:
+            return faces, np.zeros(1, dtype = int)
+        return faces
+    tris, offsets = GetVertexTriangles(faces, n_verts)
+    tris = tris.tolist()
+    offsets = offsets.tolist()
+    tri_verts = faces.reshape(-1,3).tolist()
+    live = np.bincount(faces, minlength = n_verts).tolist()
+    timestamps = [0] * n_verts
+    emitted = [False] * n_tris
+    dead_end = []
+    output = []
+    clusters = [0]
+    stamp = cache_size + 1
+    cursor = 0
+    fan = int(faces[0])
+    
+    while fan >= 0:
+        candidates = []
+        for tri in tris[offsets[fan]:offsets[fan+1]]:
+            if emitted[tri]:
+                continue
+            emitted[tri] = True
+            output.append(tri)
+            for vert in tri_verts[tri]:
+                dead_end.append(vert)
+                candidates.append(vert)
+                live[vert] -= 1
+                if stamp - timestamps[vert] > cache_size:
+                    timestamps[vert] = stamp
+                    stamp += 1
+        
+        # Next fanning vertex, the one staying in cache the longest
+        fan = -1
+        best = -1
+        for vert in candidates:
+            if live[vert] > 0:
+                priority = 0
+                if stamp - timestamps[vert] + 2 * live[vert] <= cache_size:
+                    priority = stamp - timestamps[vert]
+                if priority > best:
+                    best = priority
+                    fan = vert
+        
+        # Dead end, fall back on recent vertices then on input order
+        if fan < 0 and len(output) < n_tris:
+            clusters.append(len(output))
+        if fan < 0:
+            while dead_end:
+                vert = dead_end.pop()
+                if live[vert] > 0:
+                    fan = vert
+                    break
+        if fan < 0:
+            while cursor < n_verts:
+                if live[cursor] > 0:
+                    fan = cursor
+                    break
+                cursor += 1
+    
+    if return_clusters:
+        return faces.reshape(-1,3)[output].ravel(), np.array(clusters)
+    return faces.reshape(-1,3)[output].ravel()
+
+def GetVertexFetchOrder(faces, n_verts):
+    # Vertices in the order the index buffer first references them, unused ones last
+    verts, first = np.unique(faces, return_index = True)
+    order = verts[np.argsort(first, kind = "stable")]
+    if len(order) < n_verts:
+        order = np.concatenate([order, np.setdiff1d(np.arange(n_verts), order)])
+    remap = np.empty(n_verts, dtype = int)
+    remap[order] = np.arange(n_verts)
+    return order, remap
+
+def ReorderVertexFetch(mesh_arrays):
+    # Gather every per vertex array in first use order and rewrite the indices to match
+    n_verts = mesh_arrays["count"]
+    order, remap = GetVertexFetchOrder(mesh_arrays["faces"], n_verts)
+    reordered = {"faces": remap[mesh_arrays["faces"]], "count": n_verts}
+    for key, value in mesh_arrays.items():
+        if key not in reordered:
+            reordered[key] = value[order]
+    return reordered
+
+def GetOverdrawOrder(positions, faces, cluster_starts, views = OVERDRAW_VIEWS):
+    # Draw the clusters facing most of the views first, the outer crown before the inner one
+    tri_centers = positions[faces.reshape(-1,3)].mean(axis = 1)
+    cluster_ids = np.repeat(np.arange(len(cluster_starts)), np.diff(np.append(cluster_starts, len(tri_centers))))
+    counts = np.bincount(cluster_ids)
+    centers = np.column_stack([np.bincount(cluster_ids, weights = x) for x in tri_centers.T]) / counts[:,None]
+    scores = np.maximum((centers - tri_centers.mean(axis = 0)) @ views.T, 0).sum(axis = 1)
+    order = np.argsort(-scores, kind = "stable")
+    return faces.reshape(-1,3)[np.argsort(np.argsort(order)[cluster_ids], kind = "stable")].ravel()
+
+def OrderOverdraw(faces, n_verts, positions, cache_size = VERTEX_CACHE_SIZE):
+    # Tipsify clusters keep their vertex cache locality, only their order changes
+    faces, cluster_starts = TipsifyIndices(faces, n_verts, cache_size, True)
+    return GetOverdrawOrder(positions, faces, cluster_starts)
+
+def GetViewBasis(view):
+    up = np.array([0, 1, 0]) if abs(view[2]) > 0.9 else np.array([0, 0, 1])
+    right = np.cross(up, view)
+    right /= np.linalg.norm(right)
+    return right, np.cross(view, right)
+
+def EstimateOverdraw(positions, faces, views = OVERDRAW_VIEWS, resolution = OVERDRAW_RESOLUTION):
+    # Rasterize with an orthographic camera per view, count the fragments passing an early depth test per covered pixel
+    tris = faces.reshape(-1,3)
+    if not len(tris):
+        return 0.0
+    ratios = []
+    for view in views:
+        right, up = GetViewBasis(view)
+        screen = positions @ np.column_stack([right, up])
+        screen = (screen - screen.min(axis = 0)) / max(np.ptp(screen, axis = 0).max(), 1e-12) * (resolution - 1e-6)
+        depth = -(positions @ view)
+        depth = (depth - depth.min()) / max(np.ptp(depth), 1e-12)
+        
+        # Candidate pixel centers in each triangle bounding box
+        corners = screen[tris]
+        low = np.ceil(corners.min(axis = 1) - 0.5).astype(int)
+        high = np.floor(corners.max(axis = 1) - 0.5).astype(int)
+        sizes = np.maximum(high - low + 1, 0)
+        counts = sizes[:,0] * sizes[:,1]
+        frag_tris = np.repeat(np.arange(len(tris)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        px = low[frag_tris,0] + local % np.maximum(sizes[frag_tris,0], 1)
+        py = low[frag_tris,1] + local // np.maximum(sizes[frag_tris,0], 1)
+        
+        # Barycentric coverage test, both faces are drawn
+        a, b, c = corners[frag_tris,0], corners[frag_tris,1], corners[frag_tris,2]
+        cx = px + 0.5
+        cy = py + 0.5
+        w0 = (b[:,0] - cx) * (c[:,1] - cy) - (c[:,0] - cx) * (b[:,1] - cy)
+        w1 = (c[:,0] - cx) * (a[:,1] - cy) - (a[:,0] - cx) * (c[:,1] - cy)
+        w2 = (a[:,0] - cx) * (b[:,1] - cy) - (b[:,0] - cx) * (a[:,1] - cy)
+        area = w0 + w1 + w2
+        inside = (area != 0) & (((w0 >= 0) & (w1 >= 0) & (w2 >= 0)) | ((w0 <= 0) & (w1 <= 0) & (w2 <= 0)))
+        if not inside.any():
+            continue
+        frag_tris = frag_tris[inside]
+        frag_depth = (w0[inside] * depth[tris[frag_tris,0]] + w1[inside] * depth[tris[frag_tris,1]] + w2[inside] * depth[tris[frag_tris,2]]) / area[inside]
+        pixels = px[inside] * resolution + py[inside]
+        
+        # Fragments are shaded when nearer than everything drawn before them in their pixel
+        sort = np.argsort(pixels, kind = "stable")
+        pixels = pixels[sort]
+        values = frag_depth[sort] - pixels * 4.0
+        previous = np.append(np.inf, np.minimum.accumulate(values)[:-1])
+        shaded = np.count_nonzero(values < previous)
+        ratios.append(shaded / len(np.unique(pixels)))
+    if not ratios:
+        return 0.0
+    return float(np.mean(ratios))
+
+def PartitionTriangles(positions, faces, max_verts = MAX_16BIT_VERTICES):
+    # Bisect the triangles along the longest axis of their centers until each part fits, in draw order
+    tris = faces.reshape(-1,3)
+    centers = positions[tris].mean(axis = 1)
+    parts = []
+    stack = [np.arange(len(tris))]
+    while stack:
+        part = stack.pop()
+        if len(part) < 2 or len(np.unique(tris[part])) <= max_verts:
+            parts.append(part)
+            continue
+        axis = np.argmax(np.ptp(centers[part], axis = 0))
+        half = np.argpartition(centers[part,axis], len(part) // 2)
+        stack.append(np.sort(part[half[len(part) // 2:]]))
+        stack.append(np.sort(part[half[:len(part) // 2]]))
+    return parts
+
+def SplitDrawCall(srtDraw, max_verts = MAX_16BIT_VERTICES):
+    # Spatially coherent draw calls sharing the render state, each small enough for 16 bit indices
+    vert_data = srtDraw["VertexData"]
+    faces = np.asarray(srtDraw["IndexData"]).ravel()
+    if vert_data["count"] <= max_verts:
+        return [srtDraw]
+    draw_calls = []
+    for part in PartitionTriangles(vert_data["pos"], faces, max_verts):
+        verts, part_faces = np.unique(faces.reshape(-1,3)[part], return_inverse = True)
+        draw_call = {key: value for key, value in srtDraw.items() if key not in ["VertexData", "IndexData"]}
+        draw_call["VertexData"] = {key: (value if key == "count" else value[verts]) for key, value in vert_data.items()}
+        draw_call["VertexData"]["count"] = len(verts)
+        draw_call["IndexData"] = part_faces.ravel()
+        draw_calls.append(draw_call)
+    return draw_calls
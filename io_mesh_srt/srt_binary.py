@@ -0,0 +1,618 @@
+# -*- coding: utf-8 -*-
+# srt_binary.py
+
+import json
+import mmap
+import os.path
+import time
+import numpy as np
+
+SRT_HEADER = b"SRT 07.0.0"
+SHADER_PATH = "../../../../../bin/shaders/speedtree"
+
+# Enums #
+LIGHTING_MODELS = ["PER_VERTEX", "PER_PIXEL", "PER_VERTEX__X__PER_PIXEL", "DEFERRED"]
+LIGHTING_EFFECTS = ["OFF", "ON", "OFF__X__ON"]
+LOD_METHODS = ["POP", "SMOOTH"]
+SHADER_GENERATION_MODES = ["STANDARD", "ACROSS_GEOMETRIES", "AGGRESSIVE_ROUND_UP", "AGGRESSIVE_ROUND_DOWN", "SPEEDTREE5X_STYLE", "UNIFIED_SHADERS", "UNREAL4"]
+CULL_TYPES = ["NONE", "BACK", "FRONT"]
+FOG_CURVES = ["NONE", "LINEAR", "EXP", "EXP2", "USER"]
+FOG_COLOR_TYPES = ["CONSTANT", "DYNAMIC"]
+WIND_LODS = ["NONE", "GLOBAL", "BRANCH", "FULL", "CROSSFADE_NONE_TO_GLOBAL", "CROSSFADE_NONE_TO_BRANCH", "CROSSFADE_NONE_TO_FULL", "CROSSFADE_GLOBAL_TO_BRANCH", "CROSSFADE_GLOBAL_TO_FULL", "CROSSFADE_BRANCH_TO_FULL"]
+RENDER_PASSES = ["MAIN", "DEPTH_PRE_PASS", "SHADOW_CAST"]
+VERTEX_FORMATS = ["FULL_FLOAT", "HALF_FLOAT", "BYTE"]
+VERTEX_COMPONENTS = ["X", "Y", "Z", "W"]
+VERTEX_PROPERTIES = ["POSITION", "DIFFUSE_TEXTURE_COORDINATES", "NORMAL", "LOD_POSITION", "GEOMETRY_TYPE_HINT", "LEAF_CARD_CORNER", "LEAF_CARD_LOD_SCALAR", "LEAF_CARD_SELF_SHADOW_OFFSET", "WIND_BRANCH_DATA", "WIND_EXTRA_DATA", "WIND_FLAGS", "LEAF_ANCHOR_POINT", "BONE_ID", "BRANCH_SEAM_DIFFUSE", "BRANCH_SEAM_DETAIL", "DETAIL_TEXTURE_COORDINATES", "TANGENT", "LIGHT_MAP_TEXTURE_COORDINATES", "AMBIENT_OCCLUSION", "MISC_SEMANTIC"]
+VERTEX_DATA_KEYS = ["pos", "diffuse", "normals", "lod_pos", "geometry_type_hint", "leaf_card_corner", "leaf_card_lod_scalar", "leaf_card_self_shadow_offset", "wind_branch", "wind_extra", "wind_flags", "leaf_anchor_point", "bone_id", "branch_seam_diffuse", "branch_seam_detail", "branch_detail_texture", "tangents", "lightmap_texture", "ambient_occlusion"]
+VERTEX_FORMAT_DTYPES = ["<f4", "<f2", "u1"]
+UNASSIGNED = 0xff
+
+RENDER_STATE_ENUMS = {
+    "ELightingModel": LIGHTING_MODELS,
+    "EAmbientContrast": LIGHTING_EFFECTS,
+    "EDetailLayer": LIGHTING_EFFECTS,
+    "ESpecular": LIGHTING_EFFECTS,
+    "ETransmission": LIGHTING_EFFECTS,
+    "EBranchSeamSmoothing": LIGHTING_EFFECTS,
+    "ELodMethod": LOD_METHODS,
+    "EShaderGenerationMode": SHADER_GENERATION_MODES,
+    "EFaceCulling": CULL_TYPES,
+    "EAmbientImageLighting": LIGHTING_EFFECTS,
+    "EHueVariation": LIGHTING_EFFECTS,
+    "EFogCurve": FOG_CURVES,
+    "EFogColorStyle": FOG_COLOR_TYPES,
+    "EWindLod": WIND_LODS,
+    "ERenderPass": RENDER_PASSES
+}
+
+# Binary Layouts #
+VERTEX_ATTRIBUTE_DTYPE = np.dtype([("stream", "u1"), ("format", "u1"), ("properties", "u1", 4), ("components", "u1", 4), ("offsets", "u1", 4)])
+VERTEX_PROPERTY_DTYPE = np.dtype([("format", "u1"), ("attributes", "u1", 4), ("components", "u1", 4), ("offsets", "u1", 4)])
+
+RENDER_STATE_DTYPE = np.dtype({
+    "names": ["ApTextures", "ELightingModel", "VAmbientColor", "EAmbientContrast", "FAmbientContrastFactor", "BAmbientOcclusion", "VDiffuseColor", "FDiffuseScalar", "BDiffuseAlphaMaskIsOpaque", "EDetailLayer", "ESpecular", "FShininess", "VSpecularColor", "ETransmission", "VTransmissionColor", "FTransmissionShadowBrightness", "FTransmissionViewDependency", "EBranchSeamSmoothing", "FBranchSeamWeight", "ELodMethod", "BFadeToBillboard", "BVertBillboard", "BHorzBillboard", "EShaderGenerationMode", "BUsedAsGrass", "EFaceCulling", "BBlending", "EAmbientImageLighting", "EHueVariation", "EFogCurve", "EFogColorStyle", "BCastsShadows", "BReceivesShadows", "BShadowSmoothing", "FAlphaScalar", "EWindLod", "ERenderPass", "BBranchesPresent", "BFrondsPresent", "BLeavesPresent", "BFacingLeavesPresent", "BRigidMeshesPresent", "AsAttributes", "AsProperties", "size", "PDescription", "PUserData"],
+    "formats": [("<u8", 8), "<u4", ("<f4", 3), "<u4", "<f4", "u1", ("<f4", 3), "<f4", "u1", "<u4", "<u4", "<f4", ("<f4", 3), "<u4", ("<f4", 3), "<f4", "<f4", "<u4", "<f4", "<u4", "u1", "u1", "u1", "<u4", "u1", "<u4", "u1", "<u4", "<u4", "<u4", "<u4", "u1", "u1", "u1", "<f4", "<u4", "<u4", "u1", "u1", "u1", "u1", "u1", (VERTEX_ATTRIBUTE_DTYPE, 16), (VERTEX_PROPERTY_DTYPE, 19), "u1", "<u8", "<u8"],
+    "offsets": [0x00, 0x40, 0x44, 0x50, 0x54, 0x58, 0x5c, 0x68, 0x6c, 0x70, 0x74, 0x78, 0x7c, 0x88, 0x8c, 0x98, 0x9c, 0xa0, 0xa4, 0xa8, 0xac, 0xad, 0xae, 0xb0, 0xb4, 0xb8, 0xbc, 0xc0, 0xc4, 0xc8, 0xcc, 0xd0, 0xd1, 0xd2, 0xd4, 0xd8, 0xdc, 0xe0, 0xe1, 0xe2, 0xe3, 0xe4, 0xe5, 0x1c5, 0x2bc, 0x2c0, 0x2c8],
+    "itemsize": 0x2d0
+})
+
+LOD_PROFILE_DTYPE = np.dtype({
+    "names": ["m_bLodIsPresent", "m_fHighDetail3dDistance", "m_fLowDetail3dDistance", "m_fBillboardStartDistance", "m_fBillboardFinalDistance"],
+    "formats": ["u1", "<f4", "<f4", "<f4", "<f4"],
+    "offsets": [0, 4, 8, 12, 16],
+    "itemsize": 20
+})
+
+WIND_PARAMS_COUNT = 333
+WIND_OPTIONS_COUNT = 28
+WIND_SIZE = 0x560
+
+COLLISION_OBJECT_DTYPE = np.dtype([("m_pUserString", "<u8"), ("m_vCenter1", "<f4", 3), ("m_vCenter2", "<f4", 3), ("m_fRadius", "<f4")])
+HORIZONTAL_BILLBOARD_DTYPE = np.dtype({
+    "names": ["BPresent", "AfTexCoords", "AvPositions"],
+    "formats": ["u1", ("<f4", (4,2)), ("<f4", (4,3))],
+    "offsets": [0, 4, 36],
+    "itemsize": 84
+})
+LOD_HEADER_DTYPE = np.dtype({
+    "names": ["numDrawCalls", "pDrawCalls", "numBones", "pBones"],
+    "formats": ["<u4", "<u8", "<u4", "<u8"],
+    "offsets": [0, 4, 12, 16],
+    "itemsize": 24
+})
+DRAW_CALL_DTYPE = np.dtype({
+    "names": ["pRenderState", "RenderStateIdx", "numVertices", "pVertexData", "numIndices", "is32BitIndex", "pIndexData"],
+    "formats": ["<u8", "<u4", "<u4", "<u8", "<u4", "u1", "<u8"],
+    "offsets": [0, 8, 12, 16, 24, 28, 32],
+    "itemsize": 40
+})
+BONE_DTYPE = np.dtype({
+    "names": ["id", "parentId", "start", "end", "radius", "mass", "massWithChildren", "isBreakable"],
+    "formats": ["<u4", "<u4", ("<f4", 3), ("<f4", 3), "<f4", "<f4", "<f4", "u1"],
+    "offsets": [0, 4, 8, 20, 32, 36, 40, 44],
+    "itemsize": 48
+})
+
+def align4(n):
+    return (n + 3) & ~3
+
+def vec_to_dict(vec, keys = "xyz"):
+    return {k: float(v) for k, v in zip(keys, vec)}
+
+def enum_name(names, value):
+    if value < len(names):
+        return names[value]
+    return "UNASSIGNED"
+
+def get_wind_template():
+    with open(os.path.dirname(__file__) + "/templates/mainTemplate.json", 'r', encoding='utf-8') as f:
+        return json.load(f)["Wind"]
+
+def unflatten_wind_params(template, values):
+    if isinstance(template, dict):
+        return {k: unflatten_wind_params(template[k], values) for k in template}
+    if isinstance(template, list):
+        return [unflatten_wind_params(x, values) for x in template]
+    return float(next(values))
+
+def read_string_table(buffer, offset):
+    count = int(np.frombuffer(buffer, "<u4", 1, offset)[0])
+    lengths = np.frombuffer(buffer, "<u4", count * 2, offset + 4).reshape(-1, 2)[:,1]
+    offset += 4 + 8 * count
+    strings = []
+    for length in lengths:
+        raw = buffer[offset:offset + length]
+        strings.append(raw.split(b"\0", 1)[0].decode("utf-8"))
+        offset += int(length)
+    return strings, offset
+
+def decode_vertex_decl(decl):
+    attributes = []
+    for attr in decl["AsAttributes"]:
+        if attr["format"] == UNASSIGNED:
+            attributes.append("UNASSIGNED")
+        else:
+            attributes.append({
+                'format': enum_name(VERTEX_FORMATS, attr["format"]),
+                'properties': [enum_name(VERTEX_PROPERTIES, x) for x in attr["properties"]],
+                'components': [enum_name(VERTEX_COMPONENTS, x) for x in attr["components"]],
+                'offsets': attr["offsets"].tolist()
+            })
+    properties = []
+    for prop in decl["AsProperties"]:
+        if prop["format"] == UNASSIGNED:
+            properties.append("UNASSIGNED")
+        else:
+            properties.append({
+                'format': enum_name(VERTEX_FORMATS, prop["format"]),
+                'attributes': ["ATTRIBUE" + str(x) if x != UNASSIGNED else "UNASSIGNED" for x in prop["attributes"]],
+                'components': [enum_name(VERTEX_COMPONENTS, x) for x in prop["components"]],
+                'offsets': prop["offsets"].tolist()
+            })
+    return {"size": int(decl["size"]), "AsAttributes": attributes, "AsProperties": properties}
+
+def decode_render_state(record, strings):
+    state = {}
+    for name in RENDER_STATE_DTYPE.names:
+        if name in ["AsAttributes", "AsProperties", "size"]:
+            continue
+        value = record[name]
+        if name == "ApTextures":
+            state[name] = [strings[x] for x in value]
+        elif name in ["PDescription", "PUserData"]:
+            state[name] = strings[value]
+        elif name in RENDER_STATE_ENUMS:
+            state[name] = enum_name(RENDER_STATE_ENUMS[name], value)
+        elif name.startswith("V"):
+            state[name] = vec_to_dict(value)
+        elif name.startswith("B"):
+            state[name] = bool(value)
+        else:
+            state[name] = float(value)
+        if name == "BRigidMeshesPresent":
+            state["SVertexDecl"] = decode_vertex_decl(record)
+    return state
+
+def decode_vertex_data(buffer, offset, count, record):
+    vertex_size = int(record["size"])
+    raw = np.frombuffer(buffer, np.uint8, count * vertex_size, offset).reshape(count, vertex_size)
+    vert_data = {"count": count}
+    for i, prop in enumerate(record["AsProperties"]):
+        if prop["format"] == UNASSIGNED:
+            continue
+        dtype = np.dtype(VERTEX_FORMAT_DTYPES[prop["format"]])
+        offsets = [int(o) for a, o in zip(prop["attributes"], prop["offsets"]) if a != UNASSIGNED]
+        columns = [raw[:, o:o + dtype.itemsize].copy().view(dtype)[:,0] for o in offsets]
+        data = np.stack(columns, axis = 1)
+        if dtype != np.uint8:
+            data = data.astype(np.float32)
+            np.nan_to_num(data, copy = False, nan = 0, posinf = 0, neginf = 0)
+        vert_data[VERTEX_DATA_KEYS[i]] = data[:,0] if data.shape[1] == 1 else data
+    return vert_data
+
+def read_vertex_data(vert_data, decl):
+    # Typed arrays from JSON vertex data, uint8 for byte streams and float32 otherwise, nulls read as 0
+    count = int(vert_data["count"])
+    formats = {VERTEX_DATA_KEYS[i]: prop for i, prop in enumerate(decl["AsProperties"]) if isinstance(prop, dict)}
+    typed = {"count": count}
+    for key, values in vert_data.items():
+        if key == "count":
+            continue
+        if isinstance(values, np.ndarray):
+            data = values.reshape(count, -1 if count else values.size)
+        else:
+            # Declared width, so that streams holding only nulls keep it
+            row = next((v for v in values if isinstance(v, list)), None)
+            if key in formats:
+                width = sum(a != "UNASSIGNED" for a in formats[key]["attributes"])
+            else:
+                width = len(row) if row else 1
+            if all(v is None for v in values):
+                data = np.zeros((count, width), dtype = np.float32)
+            else:
+                data = np.array([[None] * len(row) if v is None and row else v for v in values], dtype = np.float32).reshape(count, width)
+        if key in formats and formats[key]["format"] == "BYTE":
+            if data.dtype != np.uint8:
+                data = np.clip(np.round(np.nan_to_num(data)), 0, 255).astype(np.uint8)
+        else:
+            data = np.nan_to_num(data.astype(np.float32, copy = False), nan = 0, posinf = 0, neginf = 0)
+        typed[key] = np.ascontiguousarray(data[:,0] if data.shape[1] == 1 else data)
+    return typed
+
+def read_srt_binary(filepath, read_geometry = True):
+    # Without geometry, the file is memory mapped so that only its header sections are read
+    with open(filepath, 'rb') as file:
+        if read_geometry:
+            buffer = file.read()
+        else:
+            buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    try:
+        if buffer[:len(SRT_HEADER)] != SRT_HEADER:
+            raise ValueError("Not a SpeedTree 7 .srt file: " + filepath)
+        return read_srt_buffer(buffer, read_geometry)
+    finally:
+        if not read_geometry:
+            try:
+                buffer.close()
+            except BufferError:
+                # Arrays of a failed decoding still use the map, it is released along with them
+                pass
+
+def read_srt_buffer(buffer, read_geometry = True):
+    # Decoded SRT from the file content, the metadata holds no reference to the buffer
+    srt = {}
+
+    # Extents
+    extents = np.frombuffer(buffer, "<f4", 6, 0x14)
+    srt["Extents"] = {"m_cMin": extents[:3].tolist(), "m_cMax": extents[3:].tolist()}
+
+    # Lod Profile
+    lodProfile = np.frombuffer(buffer, LOD_PROFILE_DTYPE, 1, 0x2c)[0]
+    srt["LodProfile"] = {k: bool(lodProfile[k]) if k.startswith("m_b") else float(lodProfile[k]) for k in LOD_PROFILE_DTYPE.names}
+
+    # Wind
+    offset = 0x40
+    params = np.frombuffer(buffer, "<f4", WIND_PARAMS_COUNT, offset)
+    options = np.frombuffer(buffer, "u1", WIND_OPTIONS_COUNT, offset + WIND_PARAMS_COUNT * 4)
+    anchor = np.frombuffer(buffer, "<f4", 4, offset + WIND_PARAMS_COUNT * 4 + WIND_OPTIONS_COUNT)
+    srt["Wind"] = {
+        "Params": unflatten_wind_params(get_wind_template()["Params"], iter(params)),
+        "m_abOptions": options.astype(bool).tolist(),
+        "m_afBranchWindAnchor": anchor[:3].tolist(),
+        "m_fMaxBranchLevel1Length": float(anchor[3])
+    }
+    offset += WIND_SIZE
+
+    # String Table
+    strings, offset = read_string_table(buffer, offset)
+    srt["StringTable"] = strings
+
+    # Collision Objects
+    count = int(np.frombuffer(buffer, "<u4", 1, offset)[0])
+    collisions = np.frombuffer(buffer, COLLISION_OBJECT_DTYPE, count, offset + 4)
+    srt["CollisionObjects"] = [{"m_vCenter1": vec_to_dict(x["m_vCenter1"]), "m_vCenter2": vec_to_dict(x["m_vCenter2"]), "m_fRadius": float(x["m_fRadius"])} for x in collisions]
+    offset += 4 + count * COLLISION_OBJECT_DTYPE.itemsize
+
+    # Vertical Billboards
+    width, top, bottom = np.frombuffer(buffer, "<f4", 3, offset).tolist()
+    nbb = int(np.frombuffer(buffer, "<u4", 1, offset + 12)[0])
+    offset += 16
+    texCoords = np.frombuffer(buffer, "<f4", nbb * 4, offset).reshape(-1, 4)
+    offset += nbb * 16
+    rotated = np.frombuffer(buffer, "u1", nbb, offset)
+    offset = align4(offset + nbb)
+    ncutout, ncutout_indices = np.frombuffer(buffer, "<u4", 2, offset).tolist()
+    offset += 8
+    cutout = np.frombuffer(buffer, "<f4", ncutout * 2, offset).reshape(-1, 2)
+    offset += ncutout * 8
+    cutout_indices = np.frombuffer(buffer, "<u2", ncutout_indices, offset)
+    offset = align4(offset + ncutout_indices * 2)
+    srt["VerticalBillboards"] = {
+        "FWidth": width,
+        "FTopPos": top,
+        "FBottomPos": bottom,
+        "NNumBillboards": nbb,
+        "PTexCoords": [vec_to_dict(x, "xyzw") for x in texCoords],
+        "PRotated": rotated.astype(bool).tolist(),
+        "NNumCutoutVertices": ncutout,
+        "PCutoutVertices": [vec_to_dict(x, "xy") for x in cutout],
+        "NNumCutoutIndices": ncutout_indices,
+        "PCutoutIndices": cutout_indices.tolist()
+    }
+
+    # Horizontal Billboard, only listed when present
+    horizontal = np.frombuffer(buffer, HORIZONTAL_BILLBOARD_DTYPE, 1, offset)[0]
+    if horizontal["BPresent"]:
+        srt["HorizontalBillboard"] = {
+            "BPresent": True,
+            "AvPositions": [vec_to_dict(x) for x in horizontal["AvPositions"]],
+            "AfTexCoords": [vec_to_dict(x, "xy") for x in horizontal["AfTexCoords"]]
+        }
+    offset += HORIZONTAL_BILLBOARD_DTYPE.itemsize
+
+    # User Strings
+    srt["PUserStrings"] = [strings[x] for x in np.frombuffer(buffer, "<u4", 5, offset)]
+    offset += 20
+
+    # Render States
+    nstates, depth, shadow, shader_path = np.frombuffer(buffer, "<u4", 4, offset).tolist()
+    offset += 16
+    passes = [("Main", True), ("Depth", depth), ("Shadow", shadow)]
+    records = {}
+    for name, present in passes:
+        if present:
+            records[name] = np.frombuffer(buffer, RENDER_STATE_DTYPE, nstates, offset)
+            offset += nstates * RENDER_STATE_DTYPE.itemsize
+    bb_records = {}
+    for name, present in passes:
+        if present:
+            bb_records[name] = np.frombuffer(buffer, RENDER_STATE_DTYPE, 1, offset)[0]
+            offset += RENDER_STATE_DTYPE.itemsize
+
+    # Passes that aren't present are left out, as the converter does
+    geometry = {"StrShaderPath": strings[shader_path]}
+    for name in records:
+        geometry["P3dRenderState" + name] = [decode_render_state(x, strings) for x in records[name]]
+    for name in bb_records:
+        geometry["ABillboardRenderState" + name] = decode_render_state(bb_records[name], strings)
+
+    # Geometry Info
+    nlods = int(np.frombuffer(buffer, "<u4", 1, offset)[0])
+    offset += 4
+    lod_headers = np.frombuffer(buffer, LOD_HEADER_DTYPE, nlods, offset)
+    offset += nlods * LOD_HEADER_DTYPE.itemsize
+    lods_info = []
+    for lod_header in lod_headers:
+        draw_calls = np.frombuffer(buffer, DRAW_CALL_DTYPE, lod_header["numDrawCalls"], offset)
+        offset += draw_calls.nbytes
+        bones = np.frombuffer(buffer, BONE_DTYPE, lod_header["numBones"], offset)
+        offset += bones.nbytes
+        lods_info.append((draw_calls, bones))
+    
+    # Draw call headers only
+    if not read_geometry:
+        geometry["PLods"] = [{"PDrawCalls": [{k: int(draw_call[k]) if k != "is32BitIndex" else bool(draw_call[k]) for k in ["RenderStateIdx", "numVertices", "numIndices", "is32BitIndex"]} for draw_call in draw_calls]} for draw_calls, _ in lods_info]
+        srt["Geometry"] = geometry
+        return srt
+
+    # Geometry Data
+    geometry["PLods"] = []
+    for draw_calls, bones in lods_info:
+        lod = {"PDrawCalls": []}
+        for draw_call in draw_calls:
+            record = records["Main"][draw_call["RenderStateIdx"]]
+            nverts = int(draw_call["numVertices"])
+            nindices = int(draw_call["numIndices"])
+            is32 = bool(draw_call["is32BitIndex"])
+            start = offset
+            vert_data = decode_vertex_data(buffer, offset, nverts, record)
+            offset += nverts * int(record["size"])
+            indices = np.frombuffer(buffer, "<u4" if is32 else "<u2", nindices, offset)
+            offset += indices.nbytes
+            offset = start + align4(offset - start)
+            lod["PDrawCalls"].append({"RenderStateIdx": int(draw_call["RenderStateIdx"]), "VertexData": vert_data, "is32BitIndex": is32, "IndexData": indices.astype(np.int64)})
+        if len(bones):
+            lod["Bones"] = []
+        for bone in bones:
+            lod["Bones"].append({
+                "id": int(bone["id"]),
+                "parentId": int(bone["parentId"]),
+                "start": vec_to_dict(bone["start"]),
+                "end": vec_to_dict(bone["end"]),
+                "radius": float(bone["radius"]),
+                "mass": float(bone["mass"]),
+                "massWithChildren": float(bone["massWithChildren"]),
+                "isBreakable": bool(bone["isBreakable"])
+            })
+        geometry["PLods"].append(lod)
+    srt["Geometry"] = geometry
+
+    return srt
+
+def pack_srt_arrays(srt):
+    # Typed vertex and index arrays, in place
+    states = srt["Geometry"]["P3dRenderStateMain"]
+    for lod in srt["Geometry"]["PLods"]:
+        for mesh_call in lod["PDrawCalls"]:
+            mesh_call["VertexData"] = read_vertex_data(mesh_call["VertexData"], states[mesh_call["RenderStateIdx"]]["SVertexDecl"])
+            mesh_call["IndexData"] = np.asarray(mesh_call["IndexData"]).ravel().astype(np.uint32)
+    return srt
+
+def decode_srt_file(filepath, read_geometry = True):
+    # Decoded .srt or .json file and the time it took, doesn't need bpy so that worker processes can run it
+    start = time.perf_counter()
+    if os.path.splitext(os.path.basename(filepath))[1] == ".srt":
+        srt = read_srt_binary(filepath, read_geometry)
+    else:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            srt = json.load(file)
+        if not read_geometry:
+            for lod in srt["Geometry"]["PLods"]:
+                for mesh_call in lod["PDrawCalls"]:
+                    del mesh_call["VertexData"], mesh_call["IndexData"]
+    if read_geometry:
+        pack_srt_arrays(srt)
+    return srt, time.perf_counter() - start
+
+def pad4(data):
+    return data + b"\0" * (align4(len(data)) - len(data))
+
+def vec_values(vec):
+    if isinstance(vec, dict):
+        return list(vec.values())
+    return list(vec)
+
+def flatten_wind_params(template, data, values):
+    if isinstance(template, dict):
+        for k in template:
+            flatten_wind_params(template[k], data[k], values)
+    elif isinstance(template, list):
+        for x, y in zip(template, data):
+            flatten_wind_params(x, y, values)
+    else:
+        values.append(data)
+    return values
+
+def enum_value(names, name):
+    if name in names:
+        return names.index(name)
+    return UNASSIGNED
+
+def encode_string_table(strings):
+    chunks = []
+    lengths = []
+    for string in strings:
+        raw = pad4(string.encode("utf-8") + b"\0")
+        chunks.append(raw)
+        lengths.append(len(raw))
+    header = np.zeros((len(strings), 2), "<u4")
+    header[:,1] = lengths
+    return np.uint32(len(strings)).tobytes() + header.tobytes() + b"".join(chunks)
+
+def encode_vertex_decl(record, decl):
+    attributes = record["AsAttributes"]
+    attributes["format"] = UNASSIGNED
+    attributes["properties"] = UNASSIGNED
+    attributes["components"] = UNASSIGNED
+    for i, attr in enumerate(decl["AsAttributes"]):
+        if isinstance(attr, dict):
+            attributes[i]["format"] = enum_value(VERTEX_FORMATS, attr["format"])
+            attributes[i]["properties"] = [enum_value(VERTEX_PROPERTIES, x) for x in attr["properties"]]
+            attributes[i]["components"] = [enum_value(VERTEX_COMPONENTS, x) for x in attr["components"]]
+            attributes[i]["offsets"] = attr["offsets"]
+    properties = record["AsProperties"]
+    properties["format"] = UNASSIGNED
+    properties["attributes"] = UNASSIGNED
+    properties["components"] = UNASSIGNED
+    for i, prop in enumerate(decl["AsProperties"]):
+        if isinstance(prop, dict):
+            properties[i]["format"] = enum_value(VERTEX_FORMATS, prop["format"])
+            properties[i]["attributes"] = [int(x[8:]) if x != "UNASSIGNED" else UNASSIGNED for x in prop["attributes"]]
+            properties[i]["components"] = [enum_value(VERTEX_COMPONENTS, x) for x in prop["components"]]
+            properties[i]["offsets"] = prop["offsets"]
+    record["size"] = decl["size"]
+
+def encode_render_state(state, string_index):
+    record = np.zeros(1, RENDER_STATE_DTYPE)[0]
+    for name in RENDER_STATE_DTYPE.names:
+        if name in ["AsAttributes", "AsProperties", "size"]:
+            continue
+        value = state[name]
+        if name == "ApTextures":
+            record[name] = [string_index(x) for x in value]
+        elif name in ["PDescription", "PUserData"]:
+            record[name] = string_index(value)
+        elif name in RENDER_STATE_ENUMS:
+            record[name] = enum_value(RENDER_STATE_ENUMS[name], value)
+        elif name.startswith("V"):
+            record[name] = vec_values(value)[:3]
+        else:
+            record[name] = value
+    encode_vertex_decl(record, state["SVertexDecl"])
+    return record.tobytes()
+
+def encode_vertex_data(vert_data, decl):
+    count = int(vert_data["count"])
+    vertex_size = int(decl["size"])
+    raw = np.zeros((count, vertex_size), np.uint8)
+    for i, prop in enumerate(decl["AsProperties"]):
+        if not isinstance(prop, dict) or VERTEX_DATA_KEYS[i] not in vert_data:
+            continue
+        dtype = np.dtype(VERTEX_FORMAT_DTYPES[VERTEX_FORMATS.index(prop["format"])])
+        data = np.asarray(vert_data[VERTEX_DATA_KEYS[i]], np.float64).reshape(count, -1)
+        if dtype.kind == "u":
+            data = np.clip(np.round(data), 0, 255)
+        offsets = [o for a, o in zip(prop["attributes"], prop["offsets"]) if a != "UNASSIGNED"]
+        for j, o in enumerate(offsets):
+            raw[:, o:o + dtype.itemsize] = data[:,j].astype(dtype).view(np.uint8).reshape(count, dtype.itemsize)
+    return raw.tobytes()
+
+def write_srt_binary(filepath, srt):
+    # The string table is rebuilt in order of first use, as the converter does
+    strings = []
+    string_ids = {}
+    def string_index(string):
+        if string not in string_ids:
+            string_ids[string] = len(strings)
+            strings.append(string)
+        return string_ids[string]
+    geometry = srt["Geometry"]
+    chunks = []
+
+    # User Strings
+    userStrings = (list(srt["PUserStrings"]) + [""] * 5)[:5]
+    user_strings_chunk = np.array([string_index(x) for x in userStrings], "<u4").tobytes()
+
+    # Collision Objects, their user strings are left empty
+    collisionObjects = srt.get("CollisionObjects", [])
+    collisions = np.zeros(len(collisionObjects), COLLISION_OBJECT_DTYPE)
+    for collision, collisionObject in zip(collisions, collisionObjects):
+        collision["m_pUserString"] = string_index("")
+        collision["m_vCenter1"] = vec_values(collisionObject["m_vCenter1"])
+        collision["m_vCenter2"] = vec_values(collisionObject["m_vCenter2"])
+        collision["m_fRadius"] = collisionObject["m_fRadius"]
+    collision_chunk = np.uint32(len(collisions)).tobytes() + collisions.tobytes()
+
+    # Render States
+    passes = [name for name in ["Main", "Depth", "Shadow"] if geometry.get("P3dRenderState" + name)]
+    main_states = geometry["P3dRenderStateMain"]
+    render_states = [np.array([len(main_states), "Depth" in passes, "Shadow" in passes, string_index(geometry["StrShaderPath"])], "<u4").tobytes()]
+    for name in passes:
+        render_states.extend([encode_render_state(x, string_index) for x in geometry["P3dRenderState" + name]])
+    for name in passes:
+        render_states.append(encode_render_state(geometry.get("ABillboardRenderState" + name) or geometry["ABillboardRenderStateMain"], string_index))
+
+    # Geometry Info and Data
+    lods = geometry["PLods"]
+    lod_headers = np.zeros(len(lods), LOD_HEADER_DTYPE)
+    geometry_info = []
+    geometry_data = []
+    for lod_header, lod in zip(lod_headers, lods):
+        bones = lod.get("Bones", [])
+        lod_header["numDrawCalls"] = len(lod["PDrawCalls"])
+        lod_header["numBones"] = len(bones)
+        draw_calls = np.zeros(len(lod["PDrawCalls"]), DRAW_CALL_DTYPE)
+        for draw_call, mesh_call in zip(draw_calls, lod["PDrawCalls"]):
+            decl = main_states[mesh_call["RenderStateIdx"]]["SVertexDecl"]
+            indices = np.asarray(mesh_call["IndexData"]).astype("<u4" if mesh_call["is32BitIndex"] else "<u2")
+            draw_call["RenderStateIdx"] = mesh_call["RenderStateIdx"]
+            draw_call["numVertices"] = mesh_call["VertexData"]["count"]
+            draw_call["numIndices"] = indices.size
+            draw_call["is32BitIndex"] = mesh_call["is32BitIndex"]
+            geometry_data.append(pad4(encode_vertex_data(mesh_call["VertexData"], decl) + indices.tobytes()))
+        geometry_info.append(draw_calls.tobytes())
+        bone_records = np.zeros(len(bones), BONE_DTYPE)
+        for bone_record, bone in zip(bone_records, bones):
+            for k in BONE_DTYPE.names:
+                bone_record[k] = vec_values(bone[k]) if k in ["start", "end"] else bone[k]
+        geometry_info.append(bone_records.tobytes())
+
+    # Header and Extents
+    chunks.append(SRT_HEADER + bytes(10))
+    chunks.append(np.array([*vec_values(srt["Extents"]["m_cMin"]), *vec_values(srt["Extents"]["m_cMax"])], "<f4").tobytes())
+
+    # Lod Profile
+    lodProfile = np.zeros(1, LOD_PROFILE_DTYPE)
+    for k in LOD_PROFILE_DTYPE.names:
+        lodProfile[k] = srt["LodProfile"][k]
+    chunks.append(lodProfile.tobytes())
+
+    # Wind
+    wind = srt["Wind"]
+    chunks.append(np.array(flatten_wind_params(get_wind_template()["Params"], wind["Params"], []), "<f4").tobytes())
+    chunks.append(np.array(wind["m_abOptions"], "u1").tobytes())
+    chunks.append(np.array([*wind["m_afBranchWindAnchor"], wind["m_fMaxBranchLevel1Length"]], "<f4").tobytes())
+
+    # Vertical Billboards
+    billboards = srt["VerticalBillboards"]
+    nbb = int(billboards["NNumBillboards"])
+    billboard_chunk = np.array([billboards["FWidth"], billboards["FTopPos"], billboards["FBottomPos"]], "<f4").tobytes()
+    billboard_chunk += np.uint32(nbb).tobytes()
+    billboard_chunk += np.array([vec_values(x) for x in billboards["PTexCoords"]], "<f4").reshape(-1).tobytes()
+    billboard_chunk = pad4(billboard_chunk + np.array(billboards["PRotated"], "u1").tobytes())
+    billboard_chunk += np.array([billboards["NNumCutoutVertices"], billboards["NNumCutoutIndices"]], "<u4").tobytes()
+    billboard_chunk += np.array([vec_values(x) for x in billboards["PCutoutVertices"]], "<f4").reshape(-1).tobytes()
+    billboard_chunk = pad4(billboard_chunk + np.array(billboards["PCutoutIndices"], "<u2").tobytes())
+
+    # Horizontal Billboard
+    horizontal = np.zeros(1, HORIZONTAL_BILLBOARD_DTYPE)
+    horizontal["AfTexCoords"] = [0, 1]
+    if "HorizontalBillboard" in srt:
+        horizontal["BPresent"] = srt["HorizontalBillboard"]["BPresent"]
+        horizontal["AvPositions"] = [vec_values(x) for x in srt["HorizontalBillboard"]["AvPositions"]]
+        horizontal["AfTexCoords"] = [vec_values(x) for x in srt["HorizontalBillboard"]["AfTexCoords"]]
+    billboard_chunk += horizontal.tobytes()
+
+    # String Table, now that every referenced string is registered
+    chunks.append(encode_string_table(strings))
+    chunks.extend([collision_chunk, billboard_chunk, user_strings_chunk])
+    chunks.extend(render_states)
+    chunks.append(np.uint32(len(lods)).tobytes() + lod_headers.tobytes())
+    chunks.extend(geometry_info)
+    chunks.extend(geometry_data)
+
+    # Replace the output atomically
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, 'wb') as file:
+        file.write(b"".join(chunks))
+    os.replace(tmp_filepath, filepath)
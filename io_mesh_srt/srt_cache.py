@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# srt_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from io_mesh_srt.srt_binary import pack_srt_arrays
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "io_mesh_srt_cache")
+CACHE_SIZE = 1024 # Megabytes
+CACHE_VERSION = 2
+META_FILE = "meta.json"
+TEMP_SUFFIX = ".tmp"
+TEMP_MAX_AGE = 3600 # Seconds
+# Whether each cache folder holds entries, kept up to date by the stores and clears of this instance
+CACHE_PRESENT = {}
+
+def get_cache_key(filepath):
+    # One entry per source file
+    return hashlib.sha1(os.path.normcase(os.path.abspath(filepath)).encode('utf-8')).hexdigest()
+
+def get_file_hash(filepath):
+    digest = hashlib.blake2b(digest_size = 20)
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def split_arrays(value, arrays):
+    # Replace the arrays by references to their .npy file
+    if isinstance(value, np.ndarray):
+        arrays.append(value)
+        return {"__array__": str(len(arrays) - 1) + ".npy"}
+    if isinstance(value, dict):
+        return {k: split_arrays(v, arrays) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [split_arrays(v, arrays) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def join_arrays(value, entry):
+    # Memory map the referenced .npy files back in place
+    if isinstance(value, dict):
+        if "__array__" in value:
+            return np.load(os.path.join(entry, value["__array__"]), mmap_mode = 'r')
+        return {k: join_arrays(v, entry) for k, v in value.items()}
+    if isinstance(value, list):
+        return [join_arrays(v, entry) for v in value]
+    return value
+
+def get_cache_entries(cache_dir = CACHE_DIR):
+    # Cache entries with their size, least recently used first
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if not os.path.isdir(entry) or name.endswith(TEMP_SUFFIX):
+            continue
+        size = sum(f.stat().st_size for f in os.scandir(entry) if f.is_file())
+        entries.append((os.stat(entry).st_mtime, size, entry))
+    entries.sort()
+    return entries
+
+def clear_temp_entries(cache_dir = CACHE_DIR, max_age = TEMP_MAX_AGE):
+    # Remove the entries left half written by interrupted stores, recent ones can still be written by another instance
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if name.endswith(TEMP_SUFFIX) and os.path.isdir(entry) and time.time() - os.stat(entry).st_mtime >= max_age:
+            shutil.rmtree(entry, ignore_errors = True)
+
+def evict_srt_cache(max_size = CACHE_SIZE, cache_dir = CACHE_DIR, keep = None):
+    # Remove the least recently used entries until the cache fits in max_size megabytes
+    clear_temp_entries(cache_dir)
+    entries = get_cache_entries(cache_dir)
+    total = sum(entry[1] for entry in entries)
+    max_bytes = max_size * 1024 * 1024
+    for _, size, entry in sorted(entries, key = lambda x: x[2] == keep):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors = True)
+        total -= size
+
+def clear_srt_cache(cache_dir = CACHE_DIR):
+    # Remove every entry, return how many there were and their total size in bytes
+    entries = get_cache_entries(cache_dir)
+    for _, _, entry in entries:
+        shutil.rmtree(entry, ignore_errors = True)
+    clear_temp_entries(cache_dir, 0)
+    CACHE_PRESENT[cache_dir] = False
+    return len(entries), sum(entry[1] for entry in entries)
+
+def has_srt_cache(cache_dir = CACHE_DIR):
+    # Only the first call looks at the disk, so that UI redraws can use it
+    if cache_dir not in CACHE_PRESENT:
+        CACHE_PRESENT[cache_dir] = len(get_cache_entries(cache_dir)) > 0
+    return CACHE_PRESENT[cache_dir]
+
+def load_srt_cache(filepath, cache_dir = CACHE_DIR):
+    # Decoded SRT of filepath if its entry is still valid, None otherwise
+    entry = os.path.join(cache_dir, get_cache_key(filepath))
+    try:
+        with open(os.path.join(entry, META_FILE), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        stat = os.stat(filepath)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION or meta["path"] != os.path.abspath(filepath) or meta["size"] != stat.st_size:
+        shutil.rmtree(entry, ignore_errors = True)
+        return None
+    
+    # A new modification time alone doesn't invalidate the entry, the content has to differ
+    if meta["mtime"] != stat.st_mtime_ns:
+        if meta["hash"] != get_file_hash(filepath):
+            shutil.rmtree(entry, ignore_errors = True)
+            return None
+        meta["mtime"] = stat.st_mtime_ns
+        with open(os.path.join(entry, META_FILE), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+    
+    try:
+        srt = join_arrays(meta["srt"], entry)
+    except (OSError, ValueError):
+        shutil.rmtree(entry, ignore_errors = True)
+        return None
+    os.utime(entry)
+    return srt
+
+def store_srt_cache(filepath, srt, max_size = CACHE_SIZE, cache_dir = CACHE_DIR):
+    # Write the arrays as .npy files and the rest as a JSON sidecar, then evict the least recently used entries
+    # Return whether the entry was stored, a failure only skips the cache
+    stat = os.stat(filepath)
+    key = get_cache_key(filepath)
+    entry = os.path.join(cache_dir, key)
+    temp_entry = entry + TEMP_SUFFIX
+    try:
+        shutil.rmtree(temp_entry, ignore_errors = True)
+        os.makedirs(temp_entry)
+        
+        arrays = []
+        meta = {
+            "version": CACHE_VERSION,
+            "path": os.path.abspath(filepath),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": get_file_hash(filepath),
+            "srt": split_arrays(pack_srt_arrays(srt), arrays)
+        }
+        for i, array in enumerate(arrays):
+            np.save(os.path.join(temp_entry, str(i) + ".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temp_entry, META_FILE), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        
+        # On Windows, the files of an entry still memory mapped, by lazy LODs for instance, can't be removed
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        os.replace(temp_entry, entry)
+    except OSError:
+        shutil.rmtree(temp_entry, ignore_errors = True)
+        return False
+    evict_srt_cache(max_size, cache_dir, keep = entry)
+    CACHE_PRESENT[cache_dir] = True
+    return True
@@ -4,17 +4,19 @@
 import bpy
 import os
 import re
+import time
 import numpy as np
-from glob import glob
 from math import radians
 from mathutils import Vector
 from copy import deepcopy
-from shutil import rmtree
 from bpy_extras.object_utils import object_data_add
-from io_mesh_srt.utils import GetCollection, JoinThem, selectOnly, ImportTemplates, GetLoopDataPerVertex
+from io_mesh_srt.utils import GetCollection, JoinThem, selectOnly, ImportTemplates
+from io_mesh_srt.billboard_atlas import composite_billboard_atlas, pack_billboard_rects, sample_billboard_alpha, get_billboard_cutout, ALPHA_THRESHOLD
+
+CUTOUT_RESOLUTION = 128 # Cells across the width of the billboards
 
 def generate_srt_billboards(context, number_billboards, bb_width, bb_bottom, bb_top, uvs = None):
-    ImportTemplates()
+    templates = ImportTemplates(["SRT_Material_Billboard_Template"], ["Billboard_Cutout_Template"])
     if number_billboards:
         horiz_coll = GetCollection("Horizontal Billboard")
         bb_coll = GetCollection("Vertical Billboards", True)
@@ -31,11 +33,11 @@ def generate_srt_billboards(context, number_billboards, bb_width, bb_bottom, bb_
         
         # Material Creation
         if 'horiz_mat' not in locals():
-            new_mat = bpy.data.materials["SRT_Material_Billboard_Template"].copy()
+            new_mat = templates["SRT_Material_Billboard_Template"].copy()
             new_mat.name = "SRT_Material_Billboard"
             
         # Geometry Nodes Creation
-        node_group = bpy.data.node_groups["Billboard_Cutout_Template"].copy()
+        node_group = templates["Billboard_Cutout_Template"].copy()
         node_group.name = "Billboard_Cutout"
         
         for i in range(number_billboards):
@@ -69,7 +71,7 @@ def generate_srt_billboards(context, number_billboards, bb_width, bb_bottom, bb_
             geom_nodes.node_group = node_group
     
 def generate_srt_horizontal_billboard(context, height = 0.5, size = 1, verts = None, uvs = None):
-    ImportTemplates()
+    templates = ImportTemplates(["SRT_Material_Billboard_Template"], [])
     vert_coll = horiz_coll = GetCollection("Vertical Billboards")
     bb_coll = GetCollection("Horizontal Billboard", True)
         
@@ -81,7 +83,7 @@ def generate_srt_horizontal_billboard(context, height = 0.5, size = 1, verts = N
             
     # Material Creation
     if 'vert_mat' not in locals():
-        new_mat = bpy.data.materials["SRT_Material_Billboard_Template"].copy()
+        new_mat = templates["SRT_Material_Billboard_Template"].copy()
         new_mat.name = "SRT_Material_Billboard"
         
     if not verts:
@@ -109,7 +111,75 @@ def generate_srt_horizontal_billboard(context, height = 0.5, size = 1, verts = N
     else:
         bb.materials.append(new_mat)
         
-def generate_srt_billboard_texture(context, resolution, margin, dilation, shadows_method = '0', file_format = 'PNG', dds_dxgi = None, apply_texture = True, use_custom_path = False, custom_path = None):
+def generate_srt_billboard_cutout(context, max_vertices = 16):
+    # Replace the cutout by one fitting the union of the billboard alphas, return its vertex count and the part of the billboard it covers
+    main_coll = GetCollection(make_active = False)
+    bb_coll = GetCollection("Vertical Billboards")
+    if not main_coll or not bb_coll:
+        return None
+    bb_objects = re.findall(r"Mesh_billboard\d+\.?\d*", str([x.name for x in bb_coll.objects]))
+    if not bb_objects:
+        return None
+    mat = bb_coll.objects[bb_objects[0]].data.materials[0]
+    image = mat.node_tree.nodes["Diffuse Texture"].image
+    if not image or not image.size[0]:
+        return None
+    
+    # Union of the alphas in the billboard space
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype = np.float32)
+    image.pixels.foreach_get(pixels)
+    alpha = pixels.reshape(height, width, 4)[...,3]
+    bb_width = main_coll["FWidth"]
+    bb_top = main_coll["FTopPos"]
+    bb_bottom = main_coll["FBottomPos"]
+    shape = (max(round(CUTOUT_RESOLUTION * (bb_top - bb_bottom) / bb_width), 1), CUTOUT_RESOLUTION)
+    coverage = np.zeros(shape, dtype = np.float32)
+    uv_array = np.zeros(12)
+    for name in bb_objects:
+        bb_coll.objects[name].data.attributes["DiffuseUV"].data.foreach_get("vector", uv_array)
+        corners = uv_array.reshape(-1,2)[[0,1,4]]
+        samples = int(np.clip(np.ceil(np.hypot(*(corners[1] - corners[0]) * [width, height]) / shape[1]), 1, 8))
+        np.maximum(coverage, sample_billboard_alpha(alpha, corners, shape, samples), out = coverage)
+    vertices, faces, area = get_billboard_cutout(coverage >= ALPHA_THRESHOLD, max_vertices)
+    
+    # Replace the cutout mesh
+    for obj in [x for x in bb_coll.objects if re.match(r"Mesh_cutout\.?\d*$", x.name)]:
+        bpy.data.objects.remove(obj)
+    verts_cutout = [[-bb_width*0.5 + bb_width * x, 0, bb_bottom + (bb_top-bb_bottom) * y] for x, y in vertices.tolist()]
+    bb = bpy.data.meshes.new(name="Mesh_cutout")
+    bb.from_pydata(verts_cutout, [], faces.tolist())
+    obj = object_data_add(context, bb)
+    obj.name = "Mesh_cutout"
+    bb.shade_smooth()
+    bb.materials.append(mat)
+    return len(vertices), area
+        
+def render_srt_billboard_view(scene, render_times, resolution):
+    # Render at the resolution of the view and return the linear RGBA pixels composited to the viewer node, bottom row first
+    scene.render.resolution_x, scene.render.resolution_y = resolution
+    start = time.perf_counter()
+    bpy.ops.render.render(scene = scene.name)
+    render_times.append(time.perf_counter() - start)
+    viewer = bpy.data.images['Viewer Node']
+    width, height = viewer.size
+    pixels = np.empty(width * height * 4, dtype = np.float32)
+    viewer.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
+
+def save_srt_billboard_image(pixels, filepath, file_format):
+    # Write RGBA pixels, bottom row first, as an 8 bit image file
+    height, width = pixels.shape[:2]
+    image = bpy.data.images.new("temp_billboard_bl", width, height, alpha = True)
+    image.pixels.foreach_set(np.ascontiguousarray(pixels, dtype = np.float32).ravel())
+    image.filepath_raw = filepath
+    image.file_format = file_format
+    image.save()
+    bpy.data.images.remove(image)
+
+def generate_srt_billboard_texture(context, resolution, margin, dilation, shadows_method = '0', file_format = 'PNG', dds_dxgi = None, apply_texture = True, use_custom_path = False, custom_path = None, pad_whole_texture = False):
+    # Return the time of each render
+    render_times = []
     main_coll = GetCollection()
     if main_coll:
         bb_coll = None
@@ -156,7 +226,7 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 last_lod_col.objects.unlink(temp_mesh)
                 
                 # Import Normal MatCap
-                ImportTemplates()
+                templates = ImportTemplates(["NORMAL_MATCAP_DIRECT_X_TWOSIDED_TEMPLATE"], ["Volume_Mesh_Template"])
                 
                 # Get File Name and Directory
                 if bb_objects:
@@ -191,6 +261,7 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 temp_scene.display_settings.display_device = 'sRGB'
                 temp_scene.view_settings.view_transform = 'Standard'
                 temp_scene.render.film_transparent = True
+                temp_scene.render.resolution_percentage = 100
                 ntree = bpy.data.node_groups.new("SRT Billboard Comp", "CompositorNodeTree")
                 temp_scene.compositing_node_group = ntree
                 nodes = ntree.nodes
@@ -202,47 +273,14 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 render_node.layer = view_layer.name
                 diff_adjust = nodes.new('CompositorNodeHueSat')
                 diff_adjust.inputs["Value"].default_value = 1.1 # Adjust Here
-                set_alpha = nodes.new('CompositorNodeSetAlpha')
-                set_alpha.inputs["Type"].default_value = 'Replace Alpha'
-                separate_color = nodes.new('CompositorNodeSeparateColor')
-                dilate_red = nodes.new('CompositorNodeDilateErode')
-                dilate_red.inputs["Type"].default_value = 'Distance'
-                dilate_red.inputs["Size"].default_value = dilation
-                dilate_green = nodes.new('CompositorNodeDilateErode')
-                dilate_green.inputs["Type"].default_value = 'Distance'
-                dilate_green.inputs["Size"].default_value = dilation
-                dilate_blue = nodes.new('CompositorNodeDilateErode')
-                dilate_blue.inputs["Type"].default_value = 'Distance'
-                dilate_blue.inputs["Size"].default_value = dilation
-                combine_color = nodes.new('CompositorNodeCombineColor')
-                alpha_over = nodes.new('CompositorNodeAlphaOver')
-                file_output = nodes.new('CompositorNodeOutputFile')
-                file_output.format.media_type ='IMAGE'
-                file_output.file_name = ""
-                file_output.file_output_items.new('RGBA', 'Image1')
-                file_output.file_output_items.new('RGBA', 'Image2')
-                temp_path = os.path.join(path, "speedtree_texture_bl_temp")
-                try: 
-                    os.makedirs(temp_path)
-                except:
-                    rmtree(temp_path)
-                    os.makedirs(temp_path)
-                file_output.directory = temp_path
+                set_alpha_view = nodes.new('CompositorNodeSetAlpha')
+                set_alpha_view.inputs["Type"].default_value = 'Replace Alpha'
+                viewer = nodes.new('CompositorNodeViewer')
                 
                 links.new(render_node.outputs['Diffuse Color'], diff_adjust.inputs['Image'])
-                links.new(diff_adjust.outputs['Image'], set_alpha.inputs['Image'])
-                links.new(render_node.outputs['Alpha'], set_alpha.inputs['Alpha'])
-                links.new(diff_adjust.outputs['Image'], separate_color.inputs['Image'])
-                links.new(separate_color.outputs['Red'], dilate_red.inputs['Mask'])
-                links.new(separate_color.outputs['Green'], dilate_green.inputs['Mask'])
-                links.new(separate_color.outputs['Blue'], dilate_blue.inputs['Mask'])
-                links.new(dilate_red.outputs['Mask'], combine_color.inputs['Red'])
-                links.new(dilate_green.outputs['Mask'], combine_color.inputs['Green'])
-                links.new(dilate_blue.outputs['Mask'], combine_color.inputs['Blue'])
-                links.new(combine_color.outputs['Image'], alpha_over.inputs["Background"])
-                links.new(set_alpha.outputs['Image'], alpha_over.inputs["Foreground"])
-                links.new(alpha_over.outputs['Image'], file_output.inputs[0])
-                links.new(render_node.outputs['Alpha'], file_output.inputs[1])
+                links.new(diff_adjust.outputs['Image'], set_alpha_view.inputs['Image'])
+                links.new(render_node.outputs['Alpha'], set_alpha_view.inputs['Alpha'])
+                links.new(set_alpha_view.outputs['Image'], viewer.inputs['Image'])
                 
                 # UV Unwrap
                 if bb_objects:
@@ -250,16 +288,11 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 if horiz_objects:
                     objects.append(horiz_objects[0])
                 number_billboards = len(objects)
-                bpy.context.view_layer.objects.active = None
-                bpy.ops.object.select_all(action='DESELECT')
-                for obj in objects:
-                    bpy.context.view_layer.objects.active = obj
-                    obj.select_set(state=True)
-                bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-                bpy.ops.mesh.select_all(action="SELECT")
-                bpy.ops.uv.unwrap(margin = margin / resolution)
-                bpy.ops.mesh.select_all(action="DESELECT")
-                bpy.ops.object.mode_set(mode='OBJECT')
+                
+                # Pack the views at a uniform texel density, the horizontal billboard is never rotated
+                dimensions = [[(obj.data.vertices[1].co - obj.data.vertices[0].co).length, (obj.data.vertices[3].co - obj.data.vertices[0].co).length] for obj in objects]
+                rotatable = [not (i == number_billboards - 1 and horiz_objects) for i in range(number_billboards)]
+                rects = pack_billboard_rects(dimensions, resolution, margin, rotatable = rotatable)
                 
                 # Add Sun
                 bpy.ops.object.light_add(type='SUN')
@@ -268,8 +301,13 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 
                 # First Renders - Diffuse + Alpha
                 cameras = []
+                view_resolutions = []
                 stored_uvs = []
                 rotations = []
+                diffuse_views = []
+                ambient_views = []
+                normal_views = []
+                shadow_views = []
                 for i,_ in enumerate(old_mats):
                     old_mats[i] = old_mats[i].copy()
                     old_mats[i].use_transparent_shadow = False
@@ -281,16 +319,12 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                     rotations.append(0)
                     
                     # Get UVs
-                    uvs = np.array(GetLoopDataPerVertex(mesh, "UV", "DiffuseUV"))
-                    uvs[:,1] = 1 - uvs[:,1]
-                    uvs_x = uvs[:,0]
-                    uvs_y = uvs[:,1]
-                    uv_x_max = np.max(uvs_x)
-                    uv_x_min = np.min(uvs_x)
-                    uv_y_max = np.max(uvs_y)
-                    uv_y_min = np.min(uvs_y)
-                    uv_x_diff = uv_x_max - uv_x_min
-                    uv_y_diff = uv_y_max - uv_y_min
+                    rect_x, rect_y, rect_width, rect_height, rotated = rects[i]
+                    uv_x_min = rect_x / resolution
+                    uv_x_max = (rect_x + rect_width) / resolution
+                    uv_y_min = rect_y / resolution
+                    uv_y_max = (rect_y + rect_height) / resolution
+                    uvs = np.zeros((4,2))
                     stored_uvs.append([uv_x_max, uv_x_min, uv_y_max, uv_y_min])
                     
                     # Horizontal Billboard    
@@ -298,8 +332,14 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                         loc = Vector((0,0,1))
                         billboard_dimensions = [verts[2].co[0] - verts[0].co[0], verts[2].co[1] - verts[0].co[1]]
                         origin_z = np.mean([verts[0].co[2], verts[2].co[2]])
-                        temp_scene.render.resolution_x = round(uv_x_diff * resolution)
-                        temp_scene.render.resolution_y = round(uv_y_diff * resolution)
+                        uvs[0] = [uv_x_min, uv_y_min]
+                        uvs[1] = [uv_x_max, uv_y_min]
+                        uvs[2] = [uv_x_max, uv_y_max]
+                        uvs[3] = [uv_x_min, uv_y_max]
+                        uv_array = uvs[[0,1,2,2,3,0]].flatten()
+                        mesh.attributes["DiffuseUV"].data.foreach_set("vector", uv_array)
+                        resolution_x = rect_width
+                        resolution_y = rect_height
                     
                     # Vertical Billboards
                     else:
@@ -316,7 +356,7 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                         loc_z = (bb_top + bb_bottom)*0.5
                     
                         # Deal with UV Rotation and Resolution
-                        if np.argmax([uv_x_diff, uv_y_diff]) != np.argmax(billboard_dimensions):
+                        if rotated:
                             rotations[-1] = radians(90)
                             uvs[0] = [uv_x_max, uv_y_max]
                             uvs[1] = [uv_x_max, uv_y_min]
@@ -324,10 +364,8 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                             uvs[3] = [uv_x_min, uv_y_max]
                             uv_array = uvs[[1,0,3,3,2,1]].flatten()
                             mesh.attributes["DiffuseUV"].data.foreach_set("vector", uv_array)
-                            resolution_x = round(uv_y_diff * resolution)
-                            resolution_y = round(uv_x_diff * resolution)
-                            temp_scene.render.resolution_x = resolution_x
-                            temp_scene.render.resolution_y = resolution_y
+                            resolution_x = rect_height
+                            resolution_y = rect_width
                         else:
                             uvs[0] = [uv_x_min, uv_y_min]
                             uvs[1] = [uv_x_max, uv_y_min]
@@ -335,10 +373,11 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                             uvs[3] = [uv_x_min, uv_y_max]
                             uv_array = uvs[[0,1,2,2,3,0]].flatten()
                             mesh.attributes["DiffuseUV"].data.foreach_set("vector", uv_array)
-                            resolution_x = round(uv_x_diff * resolution)
-                            resolution_y = round(uv_y_diff * resolution)
-                            temp_scene.render.resolution_x = resolution_x
-                            temp_scene.render.resolution_y = resolution_y
+                            resolution_x = rect_width
+                            resolution_y = rect_height
+                    
+                    # Set again before each render of every pass
+                    view_resolutions.append((resolution_x, resolution_y))
                     
                     # Place Cameras
                     dim_max = np.max(billboard_dimensions)
@@ -356,12 +395,9 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                     temp_scene.camera = cam
                     
                     # Render
-                    file_output.file_output_items[0].name = "temp_diffuse_" + str(i)
-                    file_output.file_output_items[1].name = "temp_alpha_" + str(i)
-                    bpy.ops.render.render(scene = temp_scene.name)
+                    diffuse_views.append(render_srt_billboard_view(temp_scene, render_times, view_resolutions[i]))
                     
                 # Second Renders - Ambient
-                file_output.file_output_items.remove(file_output.file_output_items[1])
                 for mat in old_mats:
                     mat_tree = mat.node_tree
                     mat_nodes = mat_tree.nodes
@@ -371,15 +407,14 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 diff_adjust.inputs["Value"].default_value = 1 # Adjust Here
                 
                 #Render
-                for i, cam in enumerate(cameras):
+                for cam, view_resolution in zip(cameras, view_resolutions):
                     temp_scene.camera = cam
-                    file_output.file_output_items[0].name = "temp_ambient_" + str(i)
-                    bpy.ops.render.render(scene = temp_scene.name)
+                    ambient_views.append(render_srt_billboard_view(temp_scene, render_times, view_resolution))
                     
                 # Third Renders - Normals
                 for j, mat in enumerate(old_mats):
                     # Deal with Matcap Material
-                    matcap = bpy.data.materials["NORMAL_MATCAP_DIRECT_X_TWOSIDED_TEMPLATE"].copy()
+                    matcap = templates["NORMAL_MATCAP_DIRECT_X_TWOSIDED_TEMPLATE"].copy()
                     matcap.name = "NORMAL_MATCAP_DIRECT_X_TWOSIDED"
                     matcap_ntree = matcap.node_tree
                     matcap_links = matcap_ntree.links
@@ -403,13 +438,12 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                         if mat["EDetailLayer"] == 'OFF':
                             matcap_nodes['Control Normal Detail Layer'].inputs[1].default_value = 1
                     old_mats[j] = matcap
-                
+                    
                 #Render
                 #temp_scene.view_settings.view_transform = 'Standard'
-                for i, cam in enumerate(cameras):
+                for cam, view_resolution in zip(cameras, view_resolutions):
                     temp_scene.camera = cam
-                    file_output.file_output_items[0].name = "temp_normal_" + str(i)
-                    bpy.ops.render.render(scene = temp_scene.name)
+                    normal_views.append(render_srt_billboard_view(temp_scene, render_times, view_resolution))
                     
                 # Fourth Renders - Shadows
                 for j, mat in enumerate(old_mats_backup):
@@ -418,7 +452,7 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                     
                 # Shadow Method
                 sun.data.angle = radians(30) # Adjust Here
-                volume_geo_nodes = bpy.data.node_groups['Volume_Mesh_Template'].copy()
+                volume_geo_nodes = templates['Volume_Mesh_Template'].copy()
                 volume_geo_nodes.name = "Volume_Mesh"
                 temp_mesh.modifiers['Leaf_Card'].node_group = volume_geo_nodes
                 temp_mesh.modifiers['Leaf_Card']['Socket_0'] = True
@@ -427,130 +461,34 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                 #Add shadow smoothing
                 dilate_shadows = nodes.new('CompositorNodeDilateErode')
                 dilate_shadows.inputs["Type"].default_value = 'Feather'
-                min_res = min(resolution_x, resolution_y)
-                dilate_shadows.inputs["Size"].default_value = -round(min_res * 0.04) # Adjust Here
                 dilate_shadows.inputs["Falloff"].default_value = 'Sphere'
                 contrast_shadows = nodes.new('CompositorNodeBrightContrast')
                 contrast_shadows.inputs['Contrast'].default_value = -10 # Adjust Here
                 blur_shadows = nodes.new('CompositorNodeBlur')
                 blur_shadows.inputs["Type"].default_value = 'Gaussian'
-                blur_size = min_res * 0.15 # Adjust Here
-                blur_shadows.inputs["Size"].default_value[0] = blur_size
-                blur_shadows.inputs["Size"].default_value[1] = blur_size
                 links.new(render_node.outputs['Shadow'], dilate_shadows.inputs['Mask'])
                 links.new(dilate_shadows.outputs['Mask'], contrast_shadows.inputs['Image'])
                 links.new(contrast_shadows.outputs['Image'], blur_shadows.inputs['Image'])
-                links.new(blur_shadows.outputs['Image'], file_output.inputs[0])
+                links.new(blur_shadows.outputs['Image'], viewer.inputs['Image'])
                 
                 #Render
-                for i, cam in enumerate(cameras):
+                for cam, view_resolution in zip(cameras, view_resolutions):
                     temp_scene.camera = cam
-                    file_output.file_output_items[0].name = "temp_shadows_" + str(i)
-                    bpy.ops.render.render(scene = temp_scene.name)
                     
-                # Assemble the Textures
-                temp_bg = bpy.data.images.new("Untitled", resolution, resolution)
-                bg = nodes.new('CompositorNodeImage')
-                bg.image = temp_bg
-                for i in range(len(cameras)):
-                    rgb = nodes.new('CompositorNodeImage')
-                    rgb.image = bpy.data.images.load(glob(temp_path + "\\temp_diffuse_" + str(i) + "*.png")[0], check_existing = True)
-                    shadows = nodes.new('CompositorNodeImage')
-                    shadows.image = bpy.data.images.load(glob(temp_path + "\\temp_shadows_" + str(i) + "*.png")[0], check_existing = True)
-                    mix_shadows = nodes.new('ShaderNodeMix')
-                    mix_shadows.data_type = 'RGBA'
-                    mix_shadows.blend_type = 'MULTIPLY'
-                    mix_shadows.inputs['Factor'].default_value = 0.85 # Adjust Here
-                    transform_rgb = nodes.new('CompositorNodeTransform')
-                    transform_rgb.inputs['X'].default_value = (((stored_uvs[i][0] + stored_uvs[i][1]) * 0.5) - 0.5) * resolution
-                    transform_rgb.inputs['Y'].default_value = (((stored_uvs[i][2] + stored_uvs[i][3]) * 0.5) - 0.5) * resolution
-                    transform_rgb.inputs['Angle'].default_value = rotations[i]
-                    alpha_over_rgb = nodes.new('CompositorNodeAlphaOver')
-                    alpha = nodes.new('CompositorNodeImage')
-                    alpha.image = bpy.data.images.load(glob(temp_path + "\\temp_alpha_" + str(i) + "*.png")[0], check_existing = True)
-                    transform_alpha = nodes.new('CompositorNodeTransform')
-                    transform_alpha.inputs['X'].default_value = (((stored_uvs[i][0] + stored_uvs[i][1]) * 0.5) - 0.5) * resolution
-                    transform_alpha.inputs['Y'].default_value = (((stored_uvs[i][2] + stored_uvs[i][3]) * 0.5) - 0.5) * resolution
-                    transform_alpha.inputs['Angle'].default_value = rotations[i]
-                    alpha_over_alpha = nodes.new('CompositorNodeAlphaOver')
-                    normal = nodes.new('CompositorNodeImage')
-                    normal.image = bpy.data.images.load(glob(temp_path + "\\temp_normal_" + str(i) + "*.png")[0], check_existing = True)
-                    transform_normal = nodes.new('CompositorNodeTransform')
-                    transform_normal.inputs['X'].default_value = (((stored_uvs[i][0] + stored_uvs[i][1]) * 0.5) - 0.5) * resolution
-                    transform_normal.inputs['Y'].default_value = (((stored_uvs[i][2] + stored_uvs[i][3]) * 0.5) - 0.5) * resolution
-                    transform_normal.inputs['Angle'].default_value = rotations[i]
-                    alpha_over_normal = nodes.new('CompositorNodeAlphaOver')
-                    ambient = nodes.new('CompositorNodeImage')
-                    ambient.image = bpy.data.images.load(glob(temp_path + "\\temp_ambient_" + str(i) + "*.png")[0], check_existing = True)
-                    transform_ambient = nodes.new('CompositorNodeTransform')
-                    transform_ambient.inputs['X'].default_value = (((stored_uvs[i][0] + stored_uvs[i][1]) * 0.5) - 0.5) * resolution
-                    transform_ambient.inputs['Y'].default_value = (((stored_uvs[i][2] + stored_uvs[i][3]) * 0.5) - 0.5) * resolution
-                    transform_ambient.inputs['Angle'].default_value = rotations[i]
-                    alpha_over_ambient = nodes.new('CompositorNodeAlphaOver')
+                    # Smoothing relative to the size of the view
+                    min_res = min(view_resolution)
+                    dilate_shadows.inputs["Size"].default_value = -round(min_res * 0.04) # Adjust Here
+                    blur_size = min_res * 0.15 # Adjust Here
+                    blur_shadows.inputs["Size"].default_value[0] = blur_size
+                    blur_shadows.inputs["Size"].default_value[1] = blur_size
+                    shadow_views.append(render_srt_billboard_view(temp_scene, render_times, view_resolution))
                     
-                    links.new(rgb.outputs['Image'], mix_shadows.inputs[6])
-                    links.new(shadows.outputs['Image'], mix_shadows.inputs[7])
-                    links.new(mix_shadows.outputs['Result'], transform_rgb.inputs['Image'])
-                    links.new(alpha.outputs['Image'], transform_alpha.inputs['Image'])
-                    links.new(normal.outputs['Image'], transform_normal.inputs['Image'])
-                    links.new(ambient.outputs['Image'], transform_ambient.inputs['Image'])
-                    links.new(transform_rgb.outputs['Image'], alpha_over_rgb.inputs["Foreground"])
-                    links.new(transform_alpha.outputs['Image'], alpha_over_alpha.inputs["Foreground"])
-                    links.new(transform_normal.outputs['Image'], alpha_over_normal.inputs["Foreground"])
-                    links.new(transform_ambient.outputs['Image'], alpha_over_ambient.inputs["Foreground"])
-                    if not i:
-                        links.new(bg.outputs['Image'], alpha_over_rgb.inputs["Background"])
-                        links.new(bg.outputs['Image'], alpha_over_alpha.inputs["Background"])
-                        links.new(bg.outputs['Image'], alpha_over_normal.inputs["Background"])
-                        links.new(bg.outputs['Image'], alpha_over_ambient.inputs["Background"])
-                    else:
-                        links.new(alpha_over_previous_rgb.outputs['Image'], alpha_over_rgb.inputs["Background"])
-                        links.new(alpha_over_previous_alpha.outputs['Image'], alpha_over_alpha.inputs["Background"])
-                        links.new(alpha_over_previous_normal.outputs['Image'], alpha_over_normal.inputs["Background"])
-                        links.new(alpha_over_previous_ambient.outputs['Image'], alpha_over_ambient.inputs["Background"])
-                    alpha_over_previous_rgb = alpha_over_rgb
-                    alpha_over_previous_alpha = alpha_over_alpha
-                    alpha_over_previous_normal = alpha_over_normal
-                    alpha_over_previous_ambient = alpha_over_ambient
-                
-                ramp_alpha = nodes.new('ShaderNodeValToRGB')
-                ramp_alpha.color_ramp.elements[0].position = 0.149999 # Adjust Here
-                ramp_alpha.color_ramp.elements[1].position = 0.15 # Adjust Here
-                set_alpha_diffuse = nodes.new('CompositorNodeSetAlpha')
-                set_alpha_diffuse.inputs["Type"].default_value = 'Replace Alpha'
-                set_alpha_normal = nodes.new('CompositorNodeSetAlpha')
-                #set_alpha_normal.inputs["Type"].default_value = 'Replace Alpha'
-                file_output.directory = path
-                file_output.format.file_format = file_format
-                file_output.file_output_items[0].name = "temp_billboard_bl"
-                file_output.file_output_items.new('RGBA', 'temp_billboard_bl_n')
-                
-                links.new(alpha_over_rgb.outputs['Image'], set_alpha_diffuse.inputs[0])
-                links.new(alpha_over_alpha.outputs['Image'], ramp_alpha.inputs['Fac'])
-                links.new(ramp_alpha.outputs['Color'], set_alpha_diffuse.inputs[1])
-                links.new(alpha_over_normal.outputs['Image'], set_alpha_normal.inputs[0])
-                links.new(alpha_over_ambient.outputs['Image'], set_alpha_normal.inputs[1])
-                links.new(set_alpha_diffuse.outputs['Image'], file_output.inputs[0])
-                links.new(set_alpha_normal.outputs['Image'], file_output.inputs[1])
-                
-                # Render
-                bpy.ops.render.render(scene = temp_scene.name)
-                
-                # Rename the files
-                old_path_diff = glob(path+"\\temp_billboard_bl*"+ext)[0]
-                old_path_normal = glob(path+"\\temp_billboard_bl_n*"+ext)[0]
+                # Assemble the Textures
+                diffuse, normal = composite_billboard_atlas(resolution, stored_uvs, rotations, diffuse_views, normal_views, shadow_views, ambient_views, None if pad_whole_texture else dilation)
                 new_path_diff = path + filename
                 new_path_normal = path + filename_normal
-                try:
-                    os.rename(old_path_diff, new_path_diff)
-                except FileExistsError:
-                    os.remove(new_path_diff)
-                    os.rename(old_path_diff, new_path_diff)
-                try:
-                    os.rename(old_path_normal, new_path_normal)
-                except FileExistsError:
-                    os.remove(new_path_normal)
-                    os.rename(old_path_normal, new_path_normal)
+                save_srt_billboard_image(diffuse, new_path_diff, file_format)
+                save_srt_billboard_image(normal, new_path_normal, file_format)
                     
                 # Convert to DDS if requested
                 if is_dds:
@@ -604,11 +542,9 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                         billboard_mat["normalTexture"] = new_path_normal
                 
                 # Clean up
-                rmtree(temp_path)
                 bpy.data.objects.remove(sun)
                 bpy.data.scenes.remove(temp_scene)
                 bpy.data.collections.remove(temp_coll)
-                bpy.data.images.remove(temp_bg)
                 for cam in cameras:
                     bpy.data.objects.remove(cam)
       
@@ -621,4 +557,4 @@ def generate_srt_billboard_texture(context, resolution, margin, dilation, shadow
                         
                 GetCollection()
                                   
-    return   
\ No newline at end of file
+    return render_times
\ No newline at end of file
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# tools/material_tools.py
+
+from io_mesh_srt.utils import importSRTTexture, getTextureAttributeName
+
+MATERIAL_IGNORED_PARAMS = ["BFadeToBillboard", "BVertBillboard", "BHorzBillboard", "ERenderPass", "SVertexDecl", "PDescription", "PUserData"]
+COLLECTION_SETTINGS = ["ELightingModel", "ELodMethod", "EShaderGenerationMode", "BUsedAsGrass"]
+
+TEXTURE_SETTINGS = {
+    "diffuseTexture": (["Diffuse Texture", "Branch Seam Diffuse Texture"], 'sRGB'),
+    "normalTexture": (["Normal Texture", "Branch Seam Normal Texture"], 'Non-Color'),
+    "detailTexture": (["Detail Texture", "Branch Seam Detail Texture"], 'sRGB'),
+    "detailNormalTexture": (["Detail Normal Texture", "Branch Seam Detail Normal Texture"], 'Non-Color'),
+    "specularTexture": (["Specular Texture", "Branch Seam Specular Texture"], 'Non-Color')
+}
+
+COLOR_SETTINGS = {
+    "VAmbientColor": "Ambient Color",
+    "VDiffuseColor": "Diffuse Color",
+    "VSpecularColor": "Specular Color",
+    "VTransmissionColor": "Transmission Color"
+}
+
+VALUE_SETTINGS = {
+    "FAmbientContrastFactor": "Ambient Contrast Factor",
+    "FDiffuseScalar": "Diffuse Scalar",
+    "FShininess": "Shininess",
+    "FTransmissionShadowBrightness": "Transmission Shadow Brightness",
+    "FBranchSeamWeight": "Branch Seam Weight",
+    "FAlphaScalar": "Alpha Scalar"
+}
+
+def get_srt_material_settings(srtMat, texture_dir):
+    # Material settings of a render state, without the collection wide ones
+    settings = {}
+    for k, tex in enumerate(srtMat["ApTextures"]):
+        if tex:
+            settings[getTextureAttributeName(k)] = texture_dir + "\\" + tex
+    for k, value in srtMat.items():
+        if k in ["ApTextures", *MATERIAL_IGNORED_PARAMS, *COLLECTION_SETTINGS]:
+            continue
+        if k in COLOR_SETTINGS:
+            value = (*list(value.values()), 1)
+        elif k == "FShininess":
+            value /= 128
+        settings[k] = value
+    return settings
+
+def set_srt_material(mat, settings):
+    # Write SRT settings to the material custom properties and shader nodes in one pass, textures first
+    nodes = mat.node_tree.nodes
+    keys = sorted(settings, key = lambda k: k not in TEXTURE_SETTINGS)
+    for key in keys:
+        value = settings[key]
+        mat[key] = value
+        
+        if key in TEXTURE_SETTINGS:
+            node_names, colorspace = TEXTURE_SETTINGS[key]
+            image = importSRTTexture(value)
+            for node_name in node_names:
+                nodes[node_name].image = image
+                if image:
+                    nodes[node_name].image.colorspace_settings.name = colorspace
+            if key == "specularTexture":
+                nodes["Control Specular Texture"].inputs["Factor"].default_value = 0 if value else 1
+                nodes["Control Transmission Texture"].inputs["Factor"].default_value = 0 if value else 1
+        
+        elif key in COLOR_SETTINGS:
+            nodes[COLOR_SETTINGS[key]].outputs["Color"].default_value = value
+        
+        elif key in VALUE_SETTINGS:
+            nodes[VALUE_SETTINGS[key]].outputs["Value"].default_value = value
+        
+        else:
+            match key:
+                case "EAmbientContrast":
+                    nodes['Control Ambient Contrast'].inputs[1].default_value = value == "OFF"
+                case "BAmbientOcclusion":
+                    nodes['Control Ambient Occlusion'].inputs[1].default_value = not value
+                case "BDiffuseAlphaMaskIsOpaque":
+                    nodes['Control Diffuse Mask Opaque'].inputs[1].default_value = value
+                case "EDetailLayer":
+                    nodes['Control Diffuse Detail Layer'].inputs[1].default_value = value == "OFF"
+                    nodes['Control Normal Detail Layer'].inputs[1].default_value = value == "OFF"
+                case "ESpecular":
+                    nodes['Control Specular'].inputs[0].default_value = value == "OFF"
+                    nodes['Control Shininess'].inputs[1].default_value = value == "OFF"
+                    if value != "OFF":
+                        nodes["Control Specular Texture"].inputs["Factor"].default_value = 0 if mat["specularTexture"] else 1
+                case "ETransmission":
+                    nodes['Control Transmission Seam Blending'].inputs[1].default_value = value == "OFF"
+                    nodes['Control Transmission Mask'].inputs[0].default_value = value == "OFF"
+                    nodes['Control Transmission Pre Final'].inputs[1].default_value = value == "OFF"
+                    if value != "OFF":
+                        nodes["Control Transmission Texture"].inputs["Factor"].default_value = 0 if mat["specularTexture"] else 1
+                case "FTransmissionViewDependency":
+                    nodes["Transmission View Dependency"].inputs[0].default_value = 1 - value
+                case "EBranchSeamSmoothing":
+                    nodes['Control Branch Seam Smoothing'].inputs[1].default_value = value == "OFF"
+                case "EFaceCulling":
+                    mat.use_backface_culling = value == "BACK"
+                case "BCastsShadows":
+                    nodes['Control Cast Shadows'].inputs[1].default_value = value
+                case "BCaps":
+                    nodes["UV Map.002"].uv_map = "DiffuseUV" if value else "DetailUV"
+                    nodes["UV Map.003"].uv_map = "SeamDiffuseUV" if value else "SeamDetailUV"
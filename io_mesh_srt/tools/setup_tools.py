@@ -7,15 +7,13 @@ import re
 import random, colorsys
 import os
 import json
-from io_mesh_srt.utils import get_parent_collection, ImportTemplates, checkWeightPaint
+from io_mesh_srt.utils import get_parent_collection, ImportTemplates, checkWeightPaint, migrateWeightLayers, setWeightLayer
 
-def srt_mesh_setup(context, obj, geom_type = '0', vertex_data = None):
+def srt_mesh_setup(context, obj, geom_type = '0', vertex_data = None, material = None):
     geom_type = float(geom_type)
     mesh = obj.data
     verts = mesh.vertices
     nverts = len(verts)
-    # Import Material and Geometry Nodes Templates
-    ImportTemplates()
     # Deal with Collections
     parent_coll = bpy.context.view_layer.active_layer_collection
     sub_colls = []
@@ -74,93 +72,47 @@ def srt_mesh_setup(context, obj, geom_type = '0', vertex_data = None):
         srt_coll["FHeight"] = 0
         srt_coll["FSize"] = 0
             
-    # Deal with Vertex Groups
+    # Deal with Vertex Layers
+    migrateWeightLayers(obj)
     #Geometry Type
-    if 'GeomType' not in obj.vertex_groups:
-        obj.vertex_groups.new(name="GeomType")
-    v_group = obj.vertex_groups["GeomType"]
     if vertex_data and "geometry_type_hint" in vertex_data:
-        geom_types = vertex_data["geometry_type_hint"]
-        geom_types = (geom_types + 1) * 0.2
-        for k in range(nverts):
-            v_group.add([k], geom_types[k], 'REPLACE')
+        setWeightLayer(mesh, "GeomType", (vertex_data["geometry_type_hint"] + 1) * 0.2)
     else:
-        for k in range(nverts):
-            v_group.add([k], geom_type, 'REPLACE')
+        setWeightLayer(mesh, "GeomType", geom_type)
             
-    #Wind        
+    #Wind
     if vertex_data and "wind_branch" in vertex_data:
         branches_wind = vertex_data["wind_branch"]
-
-    if 'WindWeight1' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindWeight1')
-        if vertex_data and "wind_branch" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], branches_wind[k][0], 'REPLACE')
-            
-    if 'WindNormal1' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindNormal1')
-        if vertex_data and "wind_branch" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], branches_wind[k][1]*0.0625, 'REPLACE')
-            
-    if 'WindWeight2' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindWeight2')
-        if vertex_data and "wind_branch" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], branches_wind[k][2], 'REPLACE')
-            
-    if 'WindNormal2' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindNormal2')
-        if vertex_data and "wind_branch" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], branches_wind[k][3]*0.0625, 'REPLACE')
+        if 'WindWeight1' not in mesh.attributes:
+            setWeightLayer(mesh, "WindWeight1", branches_wind[:,0])
+        if 'WindNormal1' not in mesh.attributes:
+            setWeightLayer(mesh, "WindNormal1", branches_wind[:,1]*0.0625)
+        if 'WindWeight2' not in mesh.attributes:
+            setWeightLayer(mesh, "WindWeight2", branches_wind[:,2])
+        if 'WindNormal2' not in mesh.attributes:
+            setWeightLayer(mesh, "WindNormal2", branches_wind[:,3]*0.0625)
     
     #Wind Extra            
     if vertex_data and "wind_extra" in vertex_data:
         wind_extras = vertex_data["wind_extra"]
-            
-    if 'WindExtra1' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindExtra1')
-        if vertex_data and "wind_extra" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], wind_extras[k][0]*0.0625, 'REPLACE')
-            
-    if 'WindExtra2' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindExtra2')
-        if vertex_data and "wind_extra" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], wind_extras[k][1], 'REPLACE')
-            
-    if 'WindExtra3' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindExtra3')
-        if vertex_data and "wind_extra" in vertex_data:
-            for k in range(nverts):
-                v_group.add([k], wind_extras[k][2]*0.5, 'REPLACE')
+        if 'WindExtra1' not in mesh.attributes:
+            setWeightLayer(mesh, "WindExtra1", wind_extras[:,0]*0.0625)
+        if 'WindExtra2' not in mesh.attributes:
+            setWeightLayer(mesh, "WindExtra2", wind_extras[:,1])
+        if 'WindExtra3' not in mesh.attributes:
+            setWeightLayer(mesh, "WindExtra3", wind_extras[:,2]*0.5)
     
     #Wind Flag
-    if 'WindFlag' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='WindFlag')
-        if vertex_data and "wind_flags" in vertex_data:
-            wind_flags = vertex_data["wind_flags"]
-            for k in range(nverts):
-                v_group.add([k], wind_flags[k], 'REPLACE')
+    if vertex_data and "wind_flags" in vertex_data and 'WindFlag' not in mesh.attributes:
+        setWeightLayer(mesh, "WindFlag", vertex_data["wind_flags"])
             
     #Ambient Occlusion
-    if 'AmbientOcclusion' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='AmbientOcclusion')
-        if vertex_data and "ambient_occlusion" in vertex_data:
-            ambients = 1 - vertex_data["ambient_occlusion"]
-            for k in range(nverts):
-                v_group.add([k], ambients[k], 'REPLACE')
+    if vertex_data and "ambient_occlusion" in vertex_data and 'AmbientOcclusion' not in mesh.attributes:
+        setWeightLayer(mesh, "AmbientOcclusion", 1 - vertex_data["ambient_occlusion"])
                 
     #Seam Blending
-    if 'SeamBlending' not in obj.vertex_groups:
-        v_group = obj.vertex_groups.new(name='SeamBlending')
-        if vertex_data and "branch_seam_diffuse" in vertex_data:
-            branches_seam_diff = 1 - vertex_data["branch_seam_diffuse"][:,2]
-            for k in range(nverts):
-                v_group.add([k], branches_seam_diff[k], 'REPLACE')
+    if vertex_data and "branch_seam_diffuse" in vertex_data and 'SeamBlending' not in mesh.attributes:
+        setWeightLayer(mesh, "SeamBlending", 1 - vertex_data["branch_seam_diffuse"][:,2])
             
     #Add values if missing for new unpainted vertices
     checkWeightPaint(obj)
@@ -241,25 +193,45 @@ def srt_mesh_setup(context, obj, geom_type = '0', vertex_data = None):
     if obj.modifiers and "Leaf_Card" not in obj.modifiers[0].node_group.name:
         while obj.modifiers:
             obj.modifiers.remove(obj.modifiers[0])
-    node_group = bpy.data.node_groups["Leaf_Card_Template"].copy()
-    node_group.name = "Leaf_Card"
     mod = obj.modifiers.new(type='NODES', name = "Leaf_Card")
-    mod.node_group = node_group
+    mod.node_group = srt_node_group_setup()
     
     # Deal with the Material
     if mesh.materials and "SRT_Material" not in mesh.materials[0].name:
         while mesh.materials:
             mesh.materials.pop(index = 0)
-    mat = bpy.data.materials["SRT_Material_Template"].copy()
+    if not material:
+        material = srt_material_setup()
+        if geom_type == 0.2:
+            material["BBranchesPresent"] = 1
+        elif geom_type == 0.4:
+            material["BFrondsPresent"] = 1
+        elif geom_type == 0.6:
+            material["BLeavesPresent"] = 1
+        elif geom_type == 0.8:
+            material["BFacingLeavesPresent"] = 1
+        elif geom_type == 1.0:
+            material["BRigidMeshesPresent"] = 1
+    mesh.materials.append(material)
+    
+def srt_node_group_setup():
+    # One Leaf_Card node group shared by every SRT object, as long as its LOD preview link matches
+    wm = bpy.context.window_manager.speedtree
+    for node_group in bpy.data.node_groups:
+        if node_group.get("SpeedTreeShared") and bool(node_group.nodes["Vector Math"].inputs[1].links) == wm.previewLod:
+            return node_group
+    node_group = ImportTemplates([], ["Leaf_Card_Template"])["Leaf_Card_Template"].copy()
+    node_group.name = "Leaf_Card"
+    node_group["SpeedTreeShared"] = True
+    if wm.previewLod:
+        node_group.links.new(node_group.nodes['Leaf Card LOD Scalar'].outputs['Attribute'], node_group.nodes["Vector Math"].inputs[1])
+    return node_group
+    
+def srt_material_setup(srtMat = None):
+    # New SRT material, with the geometry flags of a render state if given
+    mat = ImportTemplates(["SRT_Material_Template"], [])["SRT_Material_Template"].copy()
     mat.name = "SRT_Material"
-    if geom_type == 0.2:
-        mat["BBranchesPresent"] = 1
-    elif geom_type == 0.4:
-        mat["BFrondsPresent"] = 1
-    elif geom_type == 0.6:
-        mat["BLeavesPresent"] = 1
-    elif geom_type == 0.8:
-        mat["BFacingLeavesPresent"] = 1
-    elif geom_type == 1.0:
-        mat["BRigidMeshesPresent"] = 1
-    mesh.materials.append(mat) 
\ No newline at end of file
+    if srtMat:
+        for k in ["BBranchesPresent", "BFrondsPresent", "BLeavesPresent", "BFacingLeavesPresent", "BRigidMeshesPresent"]:
+            mat[k] = int(srtMat[k])
+    return mat 
\ No newline at end of file
@@ -8,7 +8,7 @@ from math import radians
 from bpy.types import Operator
 from bpy.props import BoolProperty, FloatProperty, IntProperty, EnumProperty, StringProperty
 from io_mesh_srt.utils import GetCollection, selectOnly
-from io_mesh_srt.tools.billboard_tools import generate_srt_billboards, generate_srt_horizontal_billboard, generate_srt_billboard_texture
+from io_mesh_srt.tools.billboard_tools import generate_srt_billboards, generate_srt_horizontal_billboard, generate_srt_billboard_texture, generate_srt_billboard_cutout
     
 class SRTBillboardTextureGeneration(Operator):
     """Generate a Billboard Texture"""
@@ -25,7 +25,31 @@ class SRTBillboardTextureGeneration(Operator):
         dds_dxgi = None
         if wm.EBillboardTextureFormat == 'DDS':
             dds_dxgi = wm.EDxgiFormat
-        generate_srt_billboard_texture(context, wm.IBillboardTextureResolution, wm.IBillboardTextureMargin, wm.IBillboardTextureDilation, wm.EShadowsMethod, wm.EBillboardTextureFormat, dds_dxgi, wm.BApplyBillboardTexture, wm.BUseCustomOutputBillboardTexture, wm.SOutputBillboardTexture)
+        render_times = generate_srt_billboard_texture(context, wm.IBillboardTextureResolution, wm.IBillboardTextureMargin, wm.IBillboardTextureDilation, wm.EShadowsMethod, wm.EBillboardTextureFormat, dds_dxgi, wm.BApplyBillboardTexture, wm.BUseCustomOutputBillboardTexture, wm.SOutputBillboardTexture, wm.BPadWholeBillboardTexture)
+        if render_times:
+            self.report({'INFO'}, "{} render(s) in {:.2f} s".format(len(render_times), sum(render_times)))
+        return {'FINISHED'}
+    
+class SRTBillboardCutoutGeneration(Operator):
+    """Generate a Billboard Cutout fitting the Billboard Texture Alpha of every View"""
+    bl_idname = "speed_tree.srt_billboard_cutout_generation"
+    bl_label = "Generate a Billboard Cutout"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        wm = context.window_manager.speedtree
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        cutout = generate_srt_billboard_cutout(context, wm.IBillboardCutoutVertices)
+        if not cutout:
+            self.report({'WARNING'}, "No vertical billboard with a diffuse texture to fit a cutout to")
+            return {'CANCELLED'}
+        # Point the billboards to the new cutout
+        if wm.BCutout:
+            updateBCutout(wm, context)
+        else:
+            wm.BCutout = True
+        self.report({'INFO'}, "Cutout of {} vertices covering {:.1f}% of the billboard".format(cutout[0], cutout[1] * 100))
         return {'FINISHED'}
     
 class SpeedTreeBillboardsPanel(bpy.types.Panel):
@@ -77,6 +101,10 @@ class SpeedTreeBillboardsPanel(bpy.types.Panel):
                 box_row.prop(wm, "BCutout", text = 'Use Cutout')
                 if wm.BCutout != main_coll["BCutout"]:
                     wm.BCutout = main_coll["BCutout"]
+                box_row = box.row()
+                box_row.enabled = wm.NNumBillboards > 0
+                box_row.prop(wm, "IBillboardCutoutVertices", text = "Cutout Vertices")
+                box_row.operator(SRTBillboardCutoutGeneration.bl_idname, text = "Fit Cutout", icon = "MOD_MASK")
                      
                 row = layout.row()
                 box = row.box()
@@ -109,6 +137,9 @@ class SpeedTreeBillboardsPanel(bpy.types.Panel):
                 box_row = box.row()
                 box_row.prop(wm, "IBillboardTextureMargin", text = "Margin")
                 box_row = box.row()
+                box_row.prop(wm, "BPadWholeBillboardTexture", text = "Pad Whole Texture")
+                box_row = box.row()
+                box_row.enabled = not wm.BPadWholeBillboardTexture
                 box_row.prop(wm, "IBillboardTextureDilation", text = "Dilation")
                 box_row = box.row()
                 box_row.prop(wm, "EShadowsMethod", text="Shadows")
@@ -317,6 +348,13 @@ PROPS_Billboard_Panel = [
         update = updateBCutout,
         default = False
     )),
+("IBillboardCutoutVertices", IntProperty(
+        name = "Billboard Cutout Vertices",
+        description = "Set the maximum number of vertices of the fitted billboard cutout. Fewer vertices give a looser cutout",
+        default = 16,
+        min = 4,
+        max = 64
+    )),
 ("BHorizontalBillboard", BoolProperty(
         name = "Enable/disable Horizontal Billboard",
         update = updateBHorizontalBillboard,
@@ -351,11 +389,16 @@ PROPS_Billboard_Panel = [
     )),
 ("IBillboardTextureDilation", IntProperty(
         name = "Texture Dilation",
-        description = "Set the number of steps (in pixels) each billboard texture should be dilated by",
+        description = "Set the distance (in pixels) the colors of the billboard textures are padded by around the rendered texels",
         default = 4,
         min = 0,
         subtype="PIXEL"
     )),
+("BPadWholeBillboardTexture", BoolProperty(
+        name = "Pad Whole Billboard Texture",
+        description = "Pad the colors of the billboard textures over the whole texture with the nearest rendered texel, so that the lowest mipmaps don't bleed black",
+        default = False
+    )),
 ("EShadowsMethod", EnumProperty(
         name = "Shadows Generation Method",
         description = "Set the method for generating shadows baked in the billboard diffuse texture",
@@ -405,4 +448,4 @@ PROPS_Billboard_Panel = [
     ))
 ]
 
-CLASSES_Billboard_Panel = [SRTBillboardTextureGeneration, SpeedTreeBillboardsPanel]
\ No newline at end of file
+CLASSES_Billboard_Panel = [SRTBillboardTextureGeneration, SRTBillboardCutoutGeneration, SpeedTreeBillboardsPanel]
\ No newline at end of file
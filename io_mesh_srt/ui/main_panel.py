@@ -5,7 +5,9 @@ import bpy
 from bpy.props import EnumProperty
 from bpy.types import Operator
 from io_mesh_srt.tools.setup_tools import srt_mesh_setup
-from io_mesh_srt.utils import GetCollection
+from io_mesh_srt.utils import GetCollection, migrateWeightLayers, WEIGHT_LAYERS
+from io_mesh_srt.srt_cache import clear_srt_cache, has_srt_cache
+from io_mesh_srt.import_srt_json import materialize_srt_lods
     
 class SRTMeshSetup(Operator):
     """Set Up a SRT Asset"""
@@ -34,6 +36,58 @@ class SRTMeshSetup(Operator):
         srt_mesh_setup(context, bpy.context.active_object, self.geom_type)
         return {'FINISHED'}
 
+class SRTMigrateVertexGroups(Operator):
+    """Convert the SpeedTree vertex groups of older files to vertex attributes"""
+    bl_idname = "speed_tree.srt_migrate_vertex_groups"
+    bl_label = "Migrate SRT Vertex Groups"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        n_objects = 0
+        for obj in bpy.data.objects:
+            if "SpeedTreeTag" in obj and obj["SpeedTreeTag"] == 1:
+                if migrateWeightLayers(obj):
+                    n_objects += 1
+        self.report({'INFO'}, "Migrated the vertex groups of " + str(n_objects) + " object(s)")
+        return {'FINISHED'}
+
+class SRTMaterializeLods(Operator):
+    """Build the LODs left as placeholders on import"""
+    bl_idname = "speed_tree.srt_materialize_lods"
+    bl_label = "Materialize SRT LODs"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        main_coll = GetCollection(make_active=False)
+        if not main_coll:
+            self.report({'ERROR'}, "No SRT asset is active")
+            return {'CANCELLED'}
+        try:
+            n_lods = materialize_srt_lods(context, main_coll)
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Materialized " + str(n_lods) + " LOD(s)")
+        return {'FINISHED'}
+
+class SRTClearCache(Operator):
+    """Remove every file from the SRT import cache"""
+    bl_idname = "speed_tree.srt_clear_cache"
+    bl_label = "Clear SRT Import Cache"
+
+    @classmethod
+    def poll(cls, context):
+        return has_srt_cache()
+
+    def execute(self, context):
+        n_entries, size = clear_srt_cache()
+        self.report({'INFO'}, "Removed " + str(n_entries) + " cached file(s), " + str(round(size / 1024 / 1024, 1)) + " MB")
+        return {'FINISHED'}
+
 class SpeedTreeMainPanel(bpy.types.Panel):
     bl_space_type = 'VIEW_3D'
     bl_region_type = 'UI'
@@ -45,10 +99,17 @@ class SpeedTreeMainPanel(bpy.types.Panel):
         wm = context.window_manager.speedtree
         layout = self.layout
         layout.operator(SRTMeshSetup.bl_idname, text = "Set Up a SRT Asset", icon = "WORLD")
+        obj = context.active_object
+        if obj and any(layer in obj.vertex_groups for layer in WEIGHT_LAYERS):
+            layout.operator(SRTMigrateVertexGroups.bl_idname, text = "Migrate Vertex Groups", icon = "GROUP_VERTEX")
+        if has_srt_cache():
+            layout.operator(SRTClearCache.bl_idname, text = "Clear Import Cache", icon = "TRASH")
         layout.separator()
         
         main_coll = GetCollection(make_active=False)
         if main_coll:
+            if any("SpeedTreeLodSource" in col for col in main_coll.children):
+                layout.operator(SRTMaterializeLods.bl_idname, text = "Materialize LODs", icon = "MESH_DATA")
             row = layout.row(align = True)
             row.alignment = "CENTER"
             row.scale_x = 1.44
@@ -76,4 +137,4 @@ PROPS_Main_Panel = [
     ))
 ]
 
-CLASSES_Main_Panel = [SRTMeshSetup, SpeedTreeMainPanel]
\ No newline at end of file
+CLASSES_Main_Panel = [SRTMeshSetup, SRTMigrateVertexGroups, SRTMaterializeLods, SRTClearCache, SpeedTreeMainPanel]
\ No newline at end of file
@@ -4,7 +4,8 @@
 import bpy
 import numpy as np
 from bpy.props import BoolProperty, EnumProperty, FloatProperty, FloatVectorProperty, StringProperty
-from io_mesh_srt.utils import GetCollection, importSRTTexture
+from io_mesh_srt.utils import GetCollection
+from io_mesh_srt.tools.material_tools import set_srt_material
     
 class SPEEDTREE_UL_materials(bpy.types.UIList):
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname):
@@ -375,255 +376,122 @@ class SpeedTreeOthersPanel(bpy.types.Panel):
         return
 
 def updateDiffuseTexture(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["diffuseTexture"] = self.diffuseTexture
-    image = importSRTTexture(self.diffuseTexture)                   
-    nodes = mat.node_tree.nodes
-    nodes["Diffuse Texture"].image = image
-    nodes["Branch Seam Diffuse Texture"].image = image
-    if image:
-        nodes["Diffuse Texture"].image.colorspace_settings.name='sRGB'
-        nodes["Branch Seam Diffuse Texture"].image.colorspace_settings.name='sRGB'
-                
+    set_srt_material(bpy.context.active_object.active_material, {"diffuseTexture": self.diffuseTexture})
+            
 def updateNormalTexture(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["normalTexture"] = self.normalTexture
-    image = importSRTTexture(self.normalTexture)    
-    nodes = mat.node_tree.nodes
-    nodes["Normal Texture"].image = image
-    nodes["Branch Seam Normal Texture"].image = image
-    if image:
-        nodes["Normal Texture"].image.colorspace_settings.name='Non-Color'
-        nodes["Branch Seam Normal Texture"].image.colorspace_settings.name='Non-Color'
-                
+    set_srt_material(bpy.context.active_object.active_material, {"normalTexture": self.normalTexture})
+            
 def updateDetailTexture(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["detailTexture"] = self.detailTexture
-    image = importSRTTexture(self.detailTexture)
-    nodes = mat.node_tree.nodes
-    nodes["Detail Texture"].image = image
-    nodes["Branch Seam Detail Texture"].image = image
-    if image:
-        nodes["Detail Texture"].image.colorspace_settings.name='sRGB'
-        nodes["Branch Seam Detail Texture"].image.colorspace_settings.name='sRGB'
-                
+    set_srt_material(bpy.context.active_object.active_material, {"detailTexture": self.detailTexture})
+            
 def updateDetailNormalTexture(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["detailNormalTexture"] = self.detailNormalTexture
-    image = importSRTTexture(self.detailNormalTexture)
-    nodes = mat.node_tree.nodes
-    nodes["Detail Normal Texture"].image = image
-    nodes["Branch Seam Detail Normal Texture"].image = image
-    if image:
-        nodes["Detail Normal Texture"].image.colorspace_settings.name='Non-Color'
-        nodes["Branch Seam Detail Normal Texture"].image.colorspace_settings.name='Non-Color'
-                
+    set_srt_material(bpy.context.active_object.active_material, {"detailNormalTexture": self.detailNormalTexture})
+            
 def updateSpecularTexture(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["specularTexture"] = self.specularTexture
-    image = importSRTTexture(self.specularTexture)
-    nodes = mat.node_tree.nodes 
-    nodes["Specular Texture"].image = image
-    nodes["Branch Seam Specular Texture"].image = image
-    if image:
-        nodes["Specular Texture"].image.colorspace_settings.name='Non-Color'
-        nodes["Branch Seam Specular Texture"].image.colorspace_settings.name='Non-Color'
-    if self.specularTexture:
-        nodes["Control Specular Texture"].inputs["Factor"].default_value = 0
-        nodes["Control Transmission Texture"].inputs["Factor"].default_value = 0
-    else:
-        nodes["Control Specular Texture"].inputs["Factor"].default_value = 1
-        nodes["Control Transmission Texture"].inputs["Factor"].default_value = 1
+    set_srt_material(bpy.context.active_object.active_material, {"specularTexture": self.specularTexture})
             
 def updateVAmbientColor(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["VAmbientColor"] = self.VAmbientColor
-    mat.node_tree.nodes["Ambient Color"].outputs["Color"].default_value = self.VAmbientColor
+    set_srt_material(bpy.context.active_object.active_material, {"VAmbientColor": self.VAmbientColor})
             
 def updateEAmbientContrast(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["EAmbientContrast"] = self.EAmbientContrast
-    nodes = mat.node_tree.nodes
-    if self.EAmbientContrast == "OFF":
-        nodes['Control Ambient Contrast'].inputs[1].default_value = 1
-    else:
-        nodes['Control Ambient Contrast'].inputs[1].default_value = 0
-                
+    set_srt_material(bpy.context.active_object.active_material, {"EAmbientContrast": self.EAmbientContrast})
+            
 def updateFAmbientContrastFactor(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FAmbientContrastFactor"] = self.FAmbientContrastFactor
-    mat.node_tree.nodes["Ambient Contrast Factor"].outputs["Value"].default_value = self.FAmbientContrastFactor
+    set_srt_material(bpy.context.active_object.active_material, {"FAmbientContrastFactor": self.FAmbientContrastFactor})
             
 def updateBAmbientOcclusion(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["BAmbientOcclusion"] = self.BAmbientOcclusion
-    mat.node_tree.nodes['Control Ambient Occlusion'].inputs[1].default_value = not self.BAmbientOcclusion
-                
+    set_srt_material(bpy.context.active_object.active_material, {"BAmbientOcclusion": self.BAmbientOcclusion})
+            
 def updateVDiffuseColor(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["VDiffuseColor"] = self.VDiffuseColor
-    mat.node_tree.nodes["Diffuse Color"].outputs["Color"].default_value = self.VDiffuseColor
+    set_srt_material(bpy.context.active_object.active_material, {"VDiffuseColor": self.VDiffuseColor})
             
 def updateFDiffuseScalar(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FDiffuseScalar"] = self.FDiffuseScalar
-    mat.node_tree.nodes["Diffuse Scalar"].outputs["Value"].default_value = self.FDiffuseScalar
+    set_srt_material(bpy.context.active_object.active_material, {"FDiffuseScalar": self.FDiffuseScalar})
             
 def updateBDiffuseAlphaMaskIsOpaque(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["BDiffuseAlphaMaskIsOpaque"] = self.BDiffuseAlphaMaskIsOpaque
-    mat.node_tree.nodes['Control Diffuse Mask Opaque'].inputs[1].default_value = self.BDiffuseAlphaMaskIsOpaque
-                
+    set_srt_material(bpy.context.active_object.active_material, {"BDiffuseAlphaMaskIsOpaque": self.BDiffuseAlphaMaskIsOpaque})
+            
 def updateEDetailLayer(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["EDetailLayer"] = self.EDetailLayer
-    nodes = mat.node_tree.nodes
-    if self.EDetailLayer == "OFF":
-        nodes['Control Diffuse Detail Layer'].inputs[1].default_value = 1
-        nodes['Control Normal Detail Layer'].inputs[1].default_value = 1
-    else:
-        nodes['Control Diffuse Detail Layer'].inputs[1].default_value = 0
-        nodes['Control Normal Detail Layer'].inputs[1].default_value = 0
-                
+    set_srt_material(bpy.context.active_object.active_material, {"EDetailLayer": self.EDetailLayer})
+            
 def updateESpecular(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["ESpecular"] = self.ESpecular
-    nodes = mat.node_tree.nodes
-    if self.ESpecular == "OFF":
-        nodes['Control Specular'].inputs[0].default_value = 1
-        nodes['Control Shininess'].inputs[1].default_value = 1
-    else:
-        nodes['Control Specular'].inputs[0].default_value = 0
-        nodes['Control Shininess'].inputs[1].default_value = 0
-        if mat["specularTexture"]:
-            nodes["Control Specular Texture"].inputs["Factor"].default_value = 0
-        else:
-            nodes["Control Specular Texture"].inputs["Factor"].default_value = 1
-                
+    set_srt_material(bpy.context.active_object.active_material, {"ESpecular": self.ESpecular})
+            
 def updateFShininess(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FShininess"] = self.FShininess
-    mat.node_tree.nodes["Shininess"].outputs["Value"].default_value = self.FShininess
+    set_srt_material(bpy.context.active_object.active_material, {"FShininess": self.FShininess})
             
 def updateVSpecularColor(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["VSpecularColor"] = self.VSpecularColor
-    mat.node_tree.nodes["Specular Color"].outputs["Color"].default_value = self.VSpecularColor
+    set_srt_material(bpy.context.active_object.active_material, {"VSpecularColor": self.VSpecularColor})
             
 def updateETransmission(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["ETransmission"] = self.ETransmission
-    nodes = mat.node_tree.nodes
-    if self.ETransmission == "OFF":
-        nodes['Control Transmission Seam Blending'].inputs[1].default_value = 1
-        nodes['Control Transmission Mask'].inputs[0].default_value = 1
-        nodes['Control Transmission Pre Final'].inputs[1].default_value = 1
-    else:
-        nodes['Control Transmission Seam Blending'].inputs[1].default_value = 0
-        nodes['Control Transmission Mask'].inputs[0].default_value = 0
-        nodes['Control Transmission Pre Final'].inputs[1].default_value = 0
-        if mat["specularTexture"]:
-            nodes["Control Transmission Texture"].inputs["Factor"].default_value = 0
-        else:
-            nodes["Control Transmission Texture"].inputs["Factor"].default_value = 1
-                
+    set_srt_material(bpy.context.active_object.active_material, {"ETransmission": self.ETransmission})
+            
 def updateVTransmissionColor(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["VTransmissionColor"] = self.VTransmissionColor
-    mat.node_tree.nodes["Transmission Color"].outputs["Color"].default_value = self.VTransmissionColor
+    set_srt_material(bpy.context.active_object.active_material, {"VTransmissionColor": self.VTransmissionColor})
             
 def updateFTransmissionShadowBrightness(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FTransmissionShadowBrightness"] = self.FTransmissionShadowBrightness
-    mat.node_tree.nodes['Transmission Shadow Brightness'].outputs["Value"].default_value = self.FTransmissionShadowBrightness
+    set_srt_material(bpy.context.active_object.active_material, {"FTransmissionShadowBrightness": self.FTransmissionShadowBrightness})
             
 def updateFTransmissionViewDependency(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FTransmissionViewDependency"] = self.FTransmissionViewDependency
-    mat.node_tree.nodes["Transmission View Dependency"].inputs[0].default_value = 1 - self.FTransmissionViewDependency
+    set_srt_material(bpy.context.active_object.active_material, {"FTransmissionViewDependency": self.FTransmissionViewDependency})
             
 def updateEBranchSeamSmoothing(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["EBranchSeamSmoothing"] = self.EBranchSeamSmoothing
-    nodes = mat.node_tree.nodes
-    if self.EBranchSeamSmoothing == "OFF":
-        nodes['Control Branch Seam Smoothing'].inputs[1].default_value = 1
-    else:
-        nodes['Control Branch Seam Smoothing'].inputs[1].default_value = 0
-                
+    set_srt_material(bpy.context.active_object.active_material, {"EBranchSeamSmoothing": self.EBranchSeamSmoothing})
+            
 def updateFBranchSeamWeight(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FBranchSeamWeight"] = self.FBranchSeamWeight
-    mat.node_tree.nodes["Branch Seam Weight"].outputs["Value"].default_value = self.FBranchSeamWeight
+    set_srt_material(bpy.context.active_object.active_material, {"FBranchSeamWeight": self.FBranchSeamWeight})
             
 def updateEFaceCulling(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["EFaceCulling"] = self.EFaceCulling
-    if self.EFaceCulling == "BACK":
-        mat.use_backface_culling = True
-    else:
-        mat.use_backface_culling = False
-                
+    set_srt_material(bpy.context.active_object.active_material, {"EFaceCulling": self.EFaceCulling})
+            
 def updateBBlending(self, context):
-    bpy.context.active_object.active_material["BBlending"] = self.BBlending
+    set_srt_material(bpy.context.active_object.active_material, {"BBlending": self.BBlending})
             
 def updateEAmbientImageLighting(self, context):
-    bpy.context.active_object.active_material["EAmbientImageLighting"] = self.EAmbientImageLighting
+    set_srt_material(bpy.context.active_object.active_material, {"EAmbientImageLighting": self.EAmbientImageLighting})
             
 def updateEHueVariation(self, context):
-    bpy.context.active_object.active_material["EHueVariation"] = self.EHueVariation
+    set_srt_material(bpy.context.active_object.active_material, {"EHueVariation": self.EHueVariation})
             
 def updateEFogCurve(self, context):
-    bpy.context.active_object.active_material["EFogCurve"] = self.EFogCurve
+    set_srt_material(bpy.context.active_object.active_material, {"EFogCurve": self.EFogCurve})
             
 def updateEFogColorStyle(self, context):
-    bpy.context.active_object.active_material["EFogColorStyle"] = self.EFogColorStyle
+    set_srt_material(bpy.context.active_object.active_material, {"EFogColorStyle": self.EFogColorStyle})
             
 def updateBCastsShadows(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["BCastsShadows"] = self.BCastsShadows
-    mat.node_tree.nodes['Control Cast Shadows'].inputs[1].default_value = self.BCastsShadows
-                
+    set_srt_material(bpy.context.active_object.active_material, {"BCastsShadows": self.BCastsShadows})
+            
 def updateBReceivesShadows(self, context):
-    bpy.context.active_object.active_material["BReceivesShadows"] = self.BReceivesShadows
+    set_srt_material(bpy.context.active_object.active_material, {"BReceivesShadows": self.BReceivesShadows})
             
 def updateBShadowSmoothing(self, context):
-    bpy.context.active_object.active_material["BShadowSmoothing"] = self.BShadowSmoothing
-    
+    set_srt_material(bpy.context.active_object.active_material, {"BShadowSmoothing": self.BShadowSmoothing})
+            
 def updateFAlphaScalar(self, context):
-    mat = bpy.context.active_object.active_material
-    mat["FAlphaScalar"] = self.FAlphaScalar
-    mat.node_tree.nodes["Alpha Scalar"].outputs["Value"].default_value = self.FAlphaScalar
+    set_srt_material(bpy.context.active_object.active_material, {"FAlphaScalar": self.FAlphaScalar})
             
 def updateEWindLod(self, context):
-    bpy.context.active_object.active_material["EWindLod"] = self.EWindLod
+    set_srt_material(bpy.context.active_object.active_material, {"EWindLod": self.EWindLod})
             
 def updateBBranchesPresent(self, context):
-    bpy.context.active_object.active_material["BBranchesPresent"] = self.BBranchesPresent
-        
+    set_srt_material(bpy.context.active_object.active_material, {"BBranchesPresent": self.BBranchesPresent})
+            
 def updateBFrondsPresent(self, context):
-    bpy.context.active_object.active_material["BFrondsPresent"] = self.BFrondsPresent
+    set_srt_material(bpy.context.active_object.active_material, {"BFrondsPresent": self.BFrondsPresent})
             
 def updateBLeavesPresent(self, context):
-    bpy.context.active_object.active_material["BLeavesPresent"] = self.BLeavesPresent
+    set_srt_material(bpy.context.active_object.active_material, {"BLeavesPresent": self.BLeavesPresent})
             
 def updateBFacingLeavesPresent(self, context):
-    bpy.context.active_object.active_material["BFacingLeavesPresent"] = self.BFacingLeavesPresent
+    set_srt_material(bpy.context.active_object.active_material, {"BFacingLeavesPresent": self.BFacingLeavesPresent})
             
 def updateBRigidMeshesPresent(self, context):
-    bpy.context.active_object.active_material["BRigidMeshesPresent"] = self.BRigidMeshesPresent
-    
+    set_srt_material(bpy.context.active_object.active_material, {"BRigidMeshesPresent": self.BRigidMeshesPresent})
+            
 def updateBCaps(self, context):
-    mat = bpy.context.active_object.active_material
-    nodes = mat.node_tree.nodes
-    mat["BCaps"] = self.BCaps
-    if self.BCaps:
-        nodes["UV Map.002"].uv_map = "DiffuseUV"
-        nodes["UV Map.003"].uv_map = "SeamDiffuseUV"
-    else:
-        nodes["UV Map.002"].uv_map = "DetailUV"
-        nodes["UV Map.003"].uv_map = "SeamDetailUV"   
-     
+    set_srt_material(bpy.context.active_object.active_material, {"BCaps": self.BCaps})
+            
 PROPS_Material_Panel = [
 ("diffuseTexture", StringProperty(
         subtype='FILE_PATH',
@@ -2,9 +2,11 @@
 # utils.py
 
 import bpy
+import hashlib
 import numpy as np
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 from math import isnan, isinf
 from copy import deepcopy
 
@@ -22,12 +24,12 @@ def JoinThem(objects):
     with bpy.context.temp_override(**override):
         bpy.ops.outliner.orphans_purge()
 
-def GetLoopDataPerVertex(mesh, type, layername = None):
+def GetLoopDataPerVertex(mesh, type, layername = None, divergence_tolerance = None):
     corner_verts = mesh.attributes[".corner_vert"].data
     corner_verts_array = np.zeros(len(corner_verts), dtype = int)
     corner_verts.foreach_get("value", corner_verts_array)
     loops = mesh.loops
-    data = [[] for i in range(len(mesh.vertices))]
+    n_verts = len(mesh.vertices)
     
     match type:
         case "NORMAL": 
@@ -45,13 +47,37 @@ def GetLoopDataPerVertex(mesh, type, layername = None):
             mesh.attributes[layername].data.foreach_get("vector", data_array)
             data_array[1::2] = 1 - data_array[1::2]
             data_array = data_array.reshape(-1,2)
-        
-    for loop, vert in enumerate(corner_verts_array):
-        data[vert].append(data_array[loop])
-    for i in range(len(data)):
-        data[i] = np.mean(data[i], axis=0).tolist()
     
-    return(data)
+    return AverageLoopData(corner_verts_array, data_array, n_verts, divergence_tolerance)
+
+def AverageLoopData(corner_verts_array, data_array, n_verts, divergence_tolerance = None):
+    # Average the loop values of each vertex in one pass
+    counts = np.bincount(corner_verts_array, minlength = n_verts)
+    data = np.column_stack([np.bincount(corner_verts_array, weights = x, minlength = n_verts) for x in data_array.T])
+    data /= np.maximum(counts, 1)[:,None]
+    
+    if divergence_tolerance is None:
+        return(data)
+    
+    # Report vertices whose loops do not share the same value
+    deviations = np.zeros(n_verts)
+    np.maximum.at(deviations, corner_verts_array, np.abs(data_array - data[corner_verts_array]).max(axis = 1))
+    divergent = np.flatnonzero(deviations > divergence_tolerance)
+    return(data, divergent)
+
+def GetTriangleTangents(positions, uvs, tri_loops, corner_verts_array, normals):
+    # Per triangle tangents, for meshes Blender cannot compute MikkTSpace tangents on
+    tri_verts = corner_verts_array[tri_loops]
+    edge1 = positions[tri_verts[:,1]] - positions[tri_verts[:,0]]
+    edge2 = positions[tri_verts[:,2]] - positions[tri_verts[:,0]]
+    duv1 = uvs[tri_loops[:,1]] - uvs[tri_loops[:,0]]
+    duv2 = uvs[tri_loops[:,2]] - uvs[tri_loops[:,0]]
+    det = duv1[:,0] * duv2[:,1] - duv2[:,0] * duv1[:,1]
+    det[det == 0] = 1
+    tangents = np.zeros((len(normals), 3))
+    tangents[tri_loops] = ((edge1 * duv2[:,1,None] - edge2 * duv1[:,1,None]) / det[:,None])[:,None,:]
+    tangents -= normals * np.sum(normals * tangents, axis = 1)[:,None]
+    return tangents / np.maximum(np.linalg.norm(tangents, axis = 1), 1e-12)[:,None]
 
 def selectOnly(obj):
     bpy.context.view_layer.objects.active = None
@@ -59,49 +85,6 @@ def selectOnly(obj):
     bpy.context.view_layer.objects.active = obj
     obj.select_set(state=True)
     
-def SplitMesh(mesh):
-    corner_verts = mesh.attributes[".corner_vert"].data
-    corner_verts_array = np.zeros(len(corner_verts), dtype = int)
-    corner_verts.foreach_get("value", corner_verts_array)
-    loops = mesh.loops
-    n_vertices = len(mesh.vertices)
-    n_loops = len(loops)
-    select_array = np.zeros(n_vertices, dtype=bool)
-    
-    # Normals
-    data_array = np.zeros(n_loops * 3)
-    loops.foreach_get("normal", data_array)
-    data_array = data_array.reshape(-1,3).tolist()
-    normals = [[] for i in range(n_vertices)]
-    for loop, vert in enumerate(corner_verts_array):
-        if select_array[vert]:
-            continue
-        normals[vert].append(data_array[loop])
-        if normals[vert][-1] != normals[vert][0]:
-            select_array[vert] = True
-    
-    # UVs
-    for uv in mesh.uv_layers:
-        data_array = np.zeros(n_loops * 2)
-        mesh.attributes[uv.name].data.foreach_get("vector", data_array)
-        data_array = data_array.reshape(-1,2).tolist()
-        UVs = [[] for i in range(n_vertices)]
-        for loop, vert in enumerate(corner_verts_array):
-            if select_array[vert]:
-                continue
-            UVs[vert].append(data_array[loop])
-            if UVs[vert][-1] != UVs[vert][0]:
-                select_array[vert] = True
-    
-    # Select Vertices and Split
-    if ".select_vert" not in mesh.attributes:
-        mesh.attributes.new(".select_vert", "BOOLEAN", "POINT")
-    mesh.attributes[".select_vert"].data.foreach_set("value", select_array)
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.edge_split(type='EDGE')
-    bpy.ops.mesh.select_all(action="DESELECT")
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
 def TriangulateActiveMesh():
     bpy.ops.object.mode_set(mode='EDIT', toggle=False)
     bpy.ops.mesh.select_all(action="SELECT")
@@ -163,11 +146,42 @@ def GetCollection(target = "Main", create_if_missing = False, make_active = True
     
     return target_coll
 
-def ImportTemplates():
-    #if 'srt_shading_and_geometry_nodes_templates.blend' not in bpy.data.libraries:
-    with bpy.data.libraries.load(os.path.dirname(__file__) + "/templates/srt_shading_and_geometry_nodes_templates.blend", link = False) as (data_from, data_to):
-        data_to.materials = data_from.materials
-        data_to.node_groups = data_from.node_groups
+TEMPLATES_PATH = os.path.dirname(__file__) + "/templates/srt_shading_and_geometry_nodes_templates.blend"
+TEMPLATE_TAG = "SpeedTreeTemplate"
+TEMPLATE_MATERIALS = ["SRT_Material_Template", "SRT_Material_Billboard_Template", "NORMAL_MATCAP_DIRECT_X_TWOSIDED_TEMPLATE"]
+TEMPLATE_NODE_GROUPS = ["Leaf_Card_Template", "Billboard_Cutout_Template", "Volume_Mesh_Template"]
+TEMPLATE_LIBRARY_LOADS = 0
+
+def FindTemplate(datablocks, name):
+    # Appended templates are tagged, their copies are renamed
+    for datablock in datablocks:
+        if datablock.get(TEMPLATE_TAG) == name and re.sub(r'\.[0-9]*$', '', datablock.name) == name:
+            return datablock
+    return None
+
+def ImportTemplates(materials = TEMPLATE_MATERIALS, node_groups = TEMPLATE_NODE_GROUPS):
+    # Append the requested templates missing from the file, at most one library load per call
+    global TEMPLATE_LIBRARY_LOADS
+    templates = {}
+    missing = {"materials": [], "node_groups": []}
+    for kind, names in [("materials", materials), ("node_groups", node_groups)]:
+        for name in names:
+            templates[name] = FindTemplate(getattr(bpy.data, kind), name)
+            if templates[name] is None:
+                missing[kind].append(name)
+    
+    if missing["materials"] or missing["node_groups"]:
+        TEMPLATE_LIBRARY_LOADS += 1
+        with bpy.data.libraries.load(TEMPLATES_PATH, link = False) as (data_from, data_to):
+            data_to.materials = [name for name in missing["materials"] if name in data_from.materials]
+            data_to.node_groups = [name for name in missing["node_groups"] if name in data_from.node_groups]
+        for kind in ["materials", "node_groups"]:
+            for datablock in getattr(data_to, kind):
+                if datablock:
+                    name = re.sub(r'\.[0-9]*$', '', datablock.name)
+                    datablock[TEMPLATE_TAG] = name
+                    templates[name] = datablock
+    return templates
         
 def getAttributesComponents(attributes):
     components = []
@@ -220,32 +234,237 @@ def setAttribute(srtAttributes, attrib_id, attrib_name, format, properties, comp
                 attrib[i] = id[0]
         srtAttributes[attrib_id] = {'format': format, 'attributes': [attributes[x] for x in attrib], 'components': [attributes_components[x] for x in attrib], 'offsets': [offsets[x] for x in attrib]}
         
-def getSphere(obj, compute_radius = True):
-    selectOnly(obj)
-    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_VOLUME', center='MEDIAN')
-    Pos = deepcopy(obj.matrix_world.translation)
+def getCenterOfVolume(verts, corner_verts, loop_totals):
+    # Same as the ORIGIN_CENTER_OF_VOLUME origin, from the median of the face corners for precision
+    init_cent = verts[corner_verts].mean(axis = 0)
+    n_tris = np.maximum(loop_totals - 2, 0)
+    pivots = np.repeat(np.cumsum(loop_totals) - loop_totals, n_tris)
+    steps = pivots + 1 + np.arange(n_tris.sum()) - np.repeat(np.cumsum(n_tris) - n_tris, n_tris)
+    v_pivot = verts[corner_verts[pivots]] - init_cent
+    v_step1 = verts[corner_verts[steps]] - init_cent
+    v_step2 = verts[corner_verts[steps + 1]] - init_cent
+    
+    # Centroids of the tetrahedra weighted by their signed volume, the median for open or flat meshes
+    volumes = np.einsum('ij,ij->i', np.cross(v_pivot, v_step1), v_step2)
+    total_volume = volumes.sum()
+    if total_volume == 0:
+        return init_cent
+    cent = (volumes[:,None] * (v_pivot + v_step1 + v_step2)).sum(axis = 0) * 0.25 / total_volume
+    if not np.isfinite(cent).all():
+        return init_cent
+    return init_cent + cent
+
+def getSphere(obj, compute_radius = True, material_name = None):
+    # Work on world space copies of the vertices, the object itself is left untouched
+    mesh = obj.data
+    n_verts = len(mesh.vertices)
+    verts = np.zeros(n_verts * 3)
+    mesh.attributes["position"].data.foreach_get("vector", verts)
+    matrix = np.array(obj.matrix_world)
+    verts = verts.reshape(-1,3) @ matrix[:3,:3].T + matrix[:3,3]
+    corner_verts = np.zeros(len(mesh.loops), dtype = int)
+    mesh.attributes[".corner_vert"].data.foreach_get("value", corner_verts)
+    loop_totals = np.zeros(len(mesh.polygons), dtype = int)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    if material_name is not None:
+        material_indices = np.zeros(len(mesh.polygons), dtype = int)
+        mesh.polygons.foreach_get("material_index", material_indices)
+        material_index = mesh.materials.find(material_name)
+        corner_verts = corner_verts[np.repeat(material_indices == material_index, loop_totals)]
+        loop_totals = loop_totals[material_indices == material_index]
+    Pos = getCenterOfVolume(verts, corner_verts, loop_totals)
     Radius = None
     if compute_radius:
-        Radius = np.linalg.norm(obj.data.vertices[0].co)
-    bpy.ops.object.origin_set(type='ORIGIN_CURSOR', center='MEDIAN')
+        Radius = np.linalg.norm(verts[corner_verts.min()] - Pos)
     return Pos, Radius
 
-def checkWeightPaint(obj, geom_type = 0, wind_flag = 0):
-    weight_layers = ["GeomType", "WindWeight1", "WindWeight2", "WindNormal1", "WindNormal2", "WindExtra1", "WindExtra2", "WindExtra3", "WindFlag", "AmbientOcclusion", "SeamBlending"]
-    existing_layers = []
+UV_LAYERS = ["DiffuseUV", "DetailUV", "SeamDiffuseUV", "SeamDetailUV"]
+WEIGHT_LAYERS = ["GeomType", "WindWeight1", "WindWeight2", "WindNormal1", "WindNormal2", "WindExtra1", "WindExtra2", "WindExtra3", "WindFlag", "AmbientOcclusion", "SeamBlending"]
+
+def getVertexGroupWeights(obj, layers):
+    indices = {obj.vertex_groups[layer].index: i for i, layer in enumerate(layers)}
+    values = np.zeros((len(layers), len(obj.data.vertices)), dtype = np.float32)
     for k, vert in enumerate(obj.data.vertices):
-        if vert.groups:
-            existing_layers = [obj.vertex_groups[g.group].name for g in vert.groups]
-        for layer in weight_layers:
-            if layer not in existing_layers:
-                match layer:
-                    case "GeomType":
-                        obj.vertex_groups[layer].add([k], ((1 + geom_type)*0.2), 'REPLACE')
-                    case "WindFlag":
-                        obj.vertex_groups[layer].add([k], wind_flag, 'REPLACE')
-                    case "WindWeight1"|"WindWeight2"|"WindNormal1"|"WindNormal2"|"WindExtra1"|"WindExtra2"|"WindExtra3"|"AmbientOcclusion"|"SeamBlending":
-                        obj.vertex_groups[layer].add([k], 0, 'REPLACE')
+        for g in vert.groups:
+            if g.group in indices:
+                values[indices[g.group], k] = g.weight
+    return values
+
+def getWeightLayer(mesh, name):
+    values = np.zeros(len(mesh.vertices), dtype = np.float32)
+    mesh.attributes[name].data.foreach_get("value", values)
+    return values
+
+def setWeightLayer(mesh, name, values):
+    if name not in mesh.attributes:
+        mesh.attributes.new(name, 'FLOAT', 'POINT')
+    values = np.broadcast_to(np.asarray(values, dtype = np.float32), len(mesh.vertices))
+    mesh.attributes[name].data.foreach_set("value", np.ascontiguousarray(values))
+
+def migrateWeightLayers(obj):
+    # Convert the legacy vertex groups to point attributes
+    layers = [layer for layer in WEIGHT_LAYERS if layer in obj.vertex_groups]
+    if layers:
+        values = getVertexGroupWeights(obj, layers)
+        for layer in layers:
+            obj.vertex_groups.remove(obj.vertex_groups[layer])
+        for layer, layer_values in zip(layers, values):
+            setWeightLayer(obj.data, layer, layer_values)
+    return len(layers)
+
+def readWeightLayers(obj):
+    # Read the layers without converting the legacy vertex groups
+    mesh = obj.data
+    layers = {}
+    legacy_layers = [layer for layer in WEIGHT_LAYERS if layer not in mesh.attributes and layer in obj.vertex_groups]
+    if legacy_layers:
+        layers.update(zip(legacy_layers, getVertexGroupWeights(obj, legacy_layers)))
+    for layer in WEIGHT_LAYERS:
+        if layer in mesh.attributes:
+            layers[layer] = getWeightLayer(mesh, layer)
+        elif layer not in layers:
+            layers[layer] = np.zeros(len(mesh.vertices), dtype = np.float32)
+    return layers
+
+def GetMeshArrays(obj, matrix = None, preview_lod = False):
+    # Read everything the exporter needs from the object without modifying it
+    mesh = obj.data
+    n_verts = len(mesh.vertices)
+    n_loops = len(mesh.loops)
+    mesh.calc_loop_triangles()
+    n_tris = len(mesh.loop_triangles)
+    arrays = {"materials": list(mesh.materials)}
+    
+    # Triangles
+    tri_loops = np.zeros(n_tris * 3, dtype = int)
+    mesh.loop_triangles.foreach_get("loops", tri_loops)
+    arrays["tri_loops"] = tri_loops.reshape(-1,3)
+    arrays["tri_materials"] = np.zeros(n_tris, dtype = int)
+    mesh.loop_triangles.foreach_get("material_index", arrays["tri_materials"])
+    arrays["corner_verts"] = np.zeros(n_loops, dtype = int)
+    mesh.attributes[".corner_vert"].data.foreach_get("value", arrays["corner_verts"])
+    
+    # Point Data, the LOD preview swaps the position with the LOD position
+    point_attributes = [("pos", "vertexPosition" if preview_lod else "position"), ("lod_pos", "position" if preview_lod else "vertexLodPosition"), ("leaf_card_corner", "leafCardCorner"), ("leaf_anchor_point", "leafAnchorPoint")]
+    for key, name in point_attributes:
+        arrays[key] = np.zeros(n_verts * 3)
+        if name in mesh.attributes:
+            mesh.attributes[name].data.foreach_get("vector", arrays[key])
+        elif key == "lod_pos":
+            mesh.attributes["position"].data.foreach_get("vector", arrays[key])
+        arrays[key] = arrays[key].reshape(-1,3)
+    arrays["leaf_card_lod_scalar"] = np.zeros(n_verts)
+    if "leafCardLodScalar" in mesh.attributes:
+        mesh.attributes["leafCardLodScalar"].data.foreach_get("value", arrays["leaf_card_lod_scalar"])
+    arrays.update(readWeightLayers(obj))
+    
+    # Loop Data
+    arrays["normals"] = np.zeros(n_loops * 3)
+    mesh.loops.foreach_get("normal", arrays["normals"])
+    arrays["normals"] = arrays["normals"].reshape(-1,3)
+    for layername in UV_LAYERS:
+        arrays[layername] = np.zeros(n_loops * 2)
+        if layername in mesh.attributes:
+            mesh.attributes[layername].data.foreach_get("vector", arrays[layername])
+        arrays[layername] = arrays[layername].reshape(-1,2)
+    try:
+        mesh.calc_tangents(uvmap = "DiffuseUV")
+        arrays["tangents"] = np.zeros(n_loops * 3)
+        mesh.loops.foreach_get("tangent", arrays["tangents"])
+        arrays["tangents"] = arrays["tangents"].reshape(-1,3)
+        mesh.free_tangents()
+    except RuntimeError:
+        arrays["tangents"] = GetTriangleTangents(arrays["pos"], arrays["DiffuseUV"], arrays["tri_loops"], arrays["corner_verts"], arrays["normals"])
+    for layername in UV_LAYERS:
+        arrays[layername][:,1] = 1 - arrays[layername][:,1]
+    
+    # Bring the data in the space of the main object
+    if matrix is not None:
+        matrix = np.array(matrix)
+        rotation = matrix[:3,:3]
+        normal_matrix = np.linalg.inv(rotation).T
+        for key in ["pos", "lod_pos", "leaf_anchor_point"]:
+            arrays[key] = arrays[key] @ rotation.T + matrix[:3,3]
+        arrays["leaf_card_corner"] = arrays["leaf_card_corner"] @ rotation.T
+        for key, transform in [("normals", normal_matrix), ("tangents", rotation)]:
+            arrays[key] = arrays[key] @ transform.T
+            arrays[key] /= np.maximum(np.linalg.norm(arrays[key], axis = 1), 1e-12)[:,None]
+    return arrays
+
+def JoinMeshArrays(objects, preview_lod = False):
+    # In memory equivalent of joining the objects into the first one
+    main_matrix = objects[0].matrix_world.inverted()
+    materials = []
+    joined = {}
+    n_verts = 0
+    n_loops = 0
+    for i, obj in enumerate(objects):
+        arrays = GetMeshArrays(obj, None if not i else main_matrix @ obj.matrix_world, preview_lod)
+        material_ids = []
+        for mat in arrays.pop("materials"):
+            if mat not in materials:
+                materials.append(mat)
+            material_ids.append(materials.index(mat))
+        if material_ids:
+            arrays["tri_materials"] = np.array(material_ids)[np.minimum(arrays["tri_materials"], len(material_ids) - 1)]
+        else:
+            arrays["tri_materials"][:] = -1
+        arrays["tri_loops"] = arrays["tri_loops"] + n_loops
+        arrays["corner_verts"] = arrays["corner_verts"] + n_verts
+        n_verts += len(arrays["pos"])
+        n_loops += len(arrays["corner_verts"])
+        for key in arrays:
+            joined.setdefault(key, []).append(arrays[key])
+    joined = {key: np.concatenate(joined[key]) for key in joined}
+    joined["materials"] = materials
+    return joined
+
+def PackLoopKeys(corner_verts_array, normals, uvs):
+    # One fixed width key per face corner, quantized the way the srt stores it
+    n_loops = len(corner_verts_array)
+    keys = np.zeros((n_loops, 8 + 4 * len(uvs)), dtype = np.uint8)
+    keys[:,:4] = corner_verts_array.astype(">u4").view(np.uint8).reshape(-1,4)
+    keys[:,4:7] = np.round((normals / 2 + 0.5) * 255)
+    for i, uv in enumerate(uvs):
+        keys[:,8+4*i:12+4*i] = uv.astype("<f2").view(np.uint8).reshape(-1,4)
+    return keys.view(np.dtype((np.void, keys.shape[1]))).ravel()
+
+def SplitLoopData(corner_verts_array, normals, uvs):
+    # Split vertices wherever their corners disagree on normal or UV
+    keys = PackLoopKeys(corner_verts_array, normals, uvs)
+    _, first, faces = np.unique(keys, return_index = True, return_inverse = True)
+    return corner_verts_array[first], faces.ravel()
+
+def getMaterialMeshArrays(arrays, material_index):
+    # Keep the triangles of one material and split its vertices along seams and hard normals
+    tri_loops = arrays["tri_loops"][arrays["tri_materials"] == material_index]
+    loops = tri_loops.ravel()
+    verts, faces = SplitLoopData(arrays["corner_verts"][loops], arrays["normals"][loops], [arrays[key][loops] for key in UV_LAYERS])
+    n_verts = len(verts)
+    mesh_arrays = {"faces": faces, "count": n_verts}
+    for key in ["pos", "lod_pos", "leaf_card_corner", "leaf_anchor_point", "leaf_card_lod_scalar", *WEIGHT_LAYERS]:
+        mesh_arrays[key] = arrays[key][verts]
+    for key in ["normals", "tangents", *UV_LAYERS]:
+        mesh_arrays[key] = AverageLoopData(faces, arrays[key][loops], n_verts)
+    return mesh_arrays
+
+def checkWeightPaint(obj, geom_type = 0, wind_flag = 0):
+    migrateWeightLayers(obj)
+    mesh = obj.data
+    for layer in WEIGHT_LAYERS:
+        if layer not in mesh.attributes:
+            match layer:
+                case "GeomType":
+                    setWeightLayer(mesh, layer, (1 + geom_type)*0.2)
+                case "WindFlag":
+                    setWeightLayer(mesh, layer, wind_flag)
+                case _:
+                    setWeightLayer(mesh, layer, 0)
+    # New vertices get a null geometry type, which is not a valid one
+    geom_types = getWeightLayer(mesh, "GeomType")
+    if not geom_types.all():
+        geom_types[geom_types == 0] = (1 + geom_type)*0.2
+        setWeightLayer(mesh, "GeomType", geom_types)
                         
 def getMaterial(main_coll, mat, srtRender):
     # Collection Settings
@@ -314,17 +533,60 @@ def getTextureAttributeName(k):
         case _:
             return ""
 
-def importSRTTexture(path):
+# Images loaded by this addon, by texture path and by content, so that a texture is only loaded once
+TEXTURE_IMAGES = {}
+TEXTURE_HASHES = {}
+
+def getTextureStamp(path):
+    stat = os.stat(path)
+    return str(stat.st_size) + ":" + str(stat.st_mtime_ns)
+
+def getTextureHash(path):
+    digest = hashlib.blake2b(digest_size = 20)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def getCachedTexture(path):
+    # Image already loaded from this unchanged file, if it still exists
+    cached = TEXTURE_IMAGES.get(os.path.normcase(os.path.abspath(path)))
+    if cached and cached[0] == getTextureStamp(path):
+        return bpy.data.images.get(cached[2])
+    return None
+
+def importSRTTexture(path, content_hash = None):
     image = None
     if os.path.exists(path):
-        texName = os.path.basename(path)
-        if texName.endswith(".dds") and 'blender_dds_addon' in bpy.context.preferences.addons:
-            image = bpy.data.images.get(texName)
-            if not image or image.filepath != path:
+        image = getCachedTexture(path)
+        if image:
+            return image
+        
+        # Same content loaded from another path
+        if not content_hash:
+            content_hash = getTextureHash(path)
+        if content_hash in TEXTURE_HASHES:
+            image = bpy.data.images.get(TEXTURE_HASHES[content_hash])
+            
+        if not image:
+            texName = os.path.basename(path)
+            if texName.endswith(".dds") and 'blender_dds_addon' in bpy.context.preferences.addons:
                 from blender_dds_addon.ui.import_dds import load_dds
                 image = load_dds(path)
                 image.name += ".dds"
                 image.filepath = path
-        else:
-            image = bpy.data.images.load(path, check_existing = True)
-    return image
\ No newline at end of file
+            else:
+                image = bpy.data.images.load(path, check_existing = True)
+        TEXTURE_IMAGES[os.path.normcase(os.path.abspath(path))] = (getTextureStamp(path), content_hash, image.name)
+        TEXTURE_HASHES[content_hash] = image.name
+    return image
+
+def preloadSRTTextures(paths):
+    # Hash the textures not loaded yet in parallel, then load each distinct content once
+    paths = [path for path in dict.fromkeys(paths) if path and os.path.exists(path) and not getCachedTexture(path)]
+    if not paths:
+        return
+    with ThreadPoolExecutor(min(len(paths), os.cpu_count() or 1)) as pool:
+        content_hashes = list(pool.map(getTextureHash, paths))
+    for path, content_hash in zip(paths, content_hashes):
+        importSRTTexture(path, content_hash)
\ No newline at end of file
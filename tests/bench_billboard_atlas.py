@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# tests/bench_billboard_atlas.py
+# Run with: python tests/bench_billboard_atlas.py
+# With bpy installed, the DilateErode nodes that padded each render before are timed on the same atlas
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "io_mesh_srt"))
+from billboard_atlas import pad_billboard_images
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# A size of 32 already takes minutes at 2K, and the compositor runs out of memory on 8K images
+DILATE_SIZES = {1024: [4, 32], 2048: [4, 32], 4096: [4]}
+
+def best_time(function, repeat = 3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def make_atlas_mask(resolution, seed = 0):
+    # Nine views of a disc of random radius, on a three by three grid
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((resolution, resolution), dtype = bool)
+    cell = resolution // 3
+    rows, cols = np.indices((cell, cell))
+    for k in range(9):
+        radius = cell * (0.2 + 0.25 * rng.random())
+        y = cell * (k // 3)
+        x = cell * (k % 3)
+        mask[y:y + cell,x:x + cell] = (rows - cell / 2) ** 2 + (cols - cell / 2) ** 2 < radius ** 2
+    return mask
+
+def make_dilate_nodes():
+    # The compositor alone, each channel of an image through a DilateErode node of type Distance as the renders were padded
+    bpy.ops.wm.read_factory_settings(use_empty = True)
+    scene = bpy.context.scene
+    node_tree = bpy.data.node_groups.new("Dilate", 'CompositorNodeTree')
+    node_tree.interface.new_socket("Image", in_out = 'OUTPUT', socket_type = 'NodeSocketColor')
+    scene.compositing_node_group = node_tree
+    nodes, links = node_tree.nodes, node_tree.links
+    image_node = nodes.new('CompositorNodeImage')
+    separate_color = nodes.new('CompositorNodeSeparateColor')
+    combine_color = nodes.new('CompositorNodeCombineColor')
+    links.new(image_node.outputs['Image'], separate_color.inputs['Image'])
+    dilates = []
+    for channel in ['Red', 'Green', 'Blue']:
+        dilate = nodes.new('CompositorNodeDilateErode')
+        dilate.inputs["Type"].default_value = 'Distance'
+        links.new(separate_color.outputs[channel], dilate.inputs['Mask'])
+        links.new(dilate.outputs['Mask'], combine_color.inputs[channel])
+        dilates.append(dilate)
+    links.new(combine_color.outputs['Image'], nodes.new('NodeGroupOutput').inputs[0])
+    return scene, image_node, dilates
+
+def dilate_image(scene, image_node, dilates, image, size):
+    height, width = image.shape[:2]
+    if image_node.image is None or tuple(image_node.image.size) != (width, height):
+        if image_node.image:
+            bpy.data.images.remove(image_node.image)
+        image_node.image = bpy.data.images.new("atlas", width, height, alpha = True, float_buffer = True)
+        image_node.image.pixels.foreach_set(image.ravel())
+    scene.render.resolution_x = width
+    scene.render.resolution_y = height
+    for dilate in dilates:
+        dilate.inputs["Size"].default_value = size
+    bpy.ops.render.render(scene = scene.name)
+
+def make_atlas_images(mask, count):
+    return [np.where(mask[...,None], 1, 0).astype(np.float32).repeat(4, axis = 2) for _ in range(count)]
+
+if __name__ == "__main__":
+    print("Padding the diffuse and normal RGBA textures of a billboard atlas, best of 3")
+    for resolution in [1024, 2048, 4096, 8192]:
+        mask = make_atlas_mask(resolution)
+        images = make_atlas_images(mask, 2)
+        repeat = 3 if resolution < 8192 else 1
+        padding_time = best_time(lambda: pad_billboard_images(images, mask, 4), repeat)
+        full_time = best_time(lambda: pad_billboard_images(images, mask), repeat)
+        print("{:>5}px: padding of 4 texels {:7.2f} s, full padding {:7.2f} s".format(resolution, padding_time, full_time))
+    
+    if bpy:
+        print("One image through the DilateErode nodes, best of 2, the old padding ran them on the diffuse and ambient renders")
+        dilate_nodes = make_dilate_nodes()
+        for resolution, sizes in DILATE_SIZES.items():
+            image, = make_atlas_images(make_atlas_mask(resolution), 1)
+            for size in sizes:
+                dilate_time = best_time(lambda: dilate_image(*dilate_nodes, image, size), 2)
+                print("{:>5}px: DilateErode nodes of size {:2} {:7.2f} s".format(resolution, size, dilate_time))
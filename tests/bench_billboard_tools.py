@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# tests/bench_billboard_tools.py
+# Run in Blender with the addon enabled, on a file with an imported tree as active collection:
+# blender -b tree.blend --python tests/bench_billboard_tools.py -- [--resolution 1024]
+
+import sys
+import bpy
+from io_mesh_srt.tools.billboard_tools import generate_srt_billboard_texture
+
+PASS_NAMES = ["diffuse", "ambient", "normals", "shadows"]
+
+def get_pass_times(render_times, n_passes):
+    # Split the render times, in render order, into passes of one render per view
+    n_views = len(render_times) // n_passes
+    return [sum(render_times[i * n_views:(i + 1) * n_views]) for i in range(n_passes)]
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    resolution = int(argv[argv.index("--resolution") + 1]) if "--resolution" in argv else 1024
+    render_times = generate_srt_billboard_texture(bpy.context, resolution, 4, 8, apply_texture = False, use_custom_path = True, custom_path = bpy.app.tempdir)
+    if not render_times:
+        sys.exit("No billboard to render in the active collection")
+    print("{} render(s) at {}px in {:.2f} s".format(len(render_times), resolution, sum(render_times)))
+    for name, pass_time in zip(PASS_NAMES, get_pass_times(render_times, len(PASS_NAMES))):
+        print("  {}: {:.2f} s".format(name, pass_time))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# tests/bench_srt_binary.py
+# Run with: python tests/bench_srt_binary.py
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "io_mesh_srt"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from srt_binary import decode_srt_file, write_srt_binary
+from synthetic_srt import make_srt, to_converter_json
+
+def best_time(function, repeat = 3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def bench_read(n_verts, n_lods = 3):
+    # Native reader against loading the converter JSON of the same model
+    srt = make_srt(n_verts, n_lods)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        srt_path = os.path.join(temp_dir, "tree.srt")
+        json_path = os.path.join(temp_dir, "tree.json")
+        write_srt_binary(srt_path, srt)
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(to_converter_json(srt), file, indent = 2)
+        
+        binary_time = best_time(lambda: decode_srt_file(srt_path))
+        json_time = best_time(lambda: decode_srt_file(json_path))
+        print("{:>9} vertices x {} LODs: .srt {:8.1f} ms ({:6.1f} MB), JSON {:8.1f} ms ({:6.1f} MB), {:5.1f}x".format(
+            n_verts, n_lods, binary_time * 1000, os.path.getsize(srt_path) / 1e6, json_time * 1000, os.path.getsize(json_path) / 1e6, json_time / binary_time))
+        
+        # Metadata only import, header sections without the geometry
+        binary_time = best_time(lambda: decode_srt_file(srt_path, False), 10)
+        json_time = best_time(lambda: decode_srt_file(json_path, False))
+        print("{:>9} {:12} metadata only: .srt {:8.2f} ms, JSON {:8.1f} ms".format("", "", binary_time * 1000, json_time * 1000))
+
+if __name__ == "__main__":
+    print("Decoding, best of 3 or of 10 for metadata only, the JSON path doesn't include running the converter")
+    for n_verts in [1000, 10000, 100000, 300000]:
+        bench_read(n_verts)
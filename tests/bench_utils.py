@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# tests/bench_utils.py
+# Run with Blender's Python, or with the bpy module installed: python tests/bench_utils.py
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "io_mesh_srt"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils import AverageLoopData
+from test_utils import average_loop_data_per_vertex, get_grid_loops
+
+def best_time(function, repeat = 3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+if __name__ == "__main__":
+    print("Averaging 3 component loop data of a quad grid, best of 3")
+    rng = np.random.default_rng(0)
+    for n_loops in [10000, 100000, 1000000]:
+        corner_verts, n_verts = get_grid_loops(int(np.sqrt(n_loops / 4)))
+        data = rng.random((len(corner_verts), 3))
+        bincount_time = best_time(lambda: AverageLoopData(corner_verts, data, n_verts))
+        divergence_time = best_time(lambda: AverageLoopData(corner_verts, data, n_verts, 1e-4))
+        loop_time = best_time(lambda: average_loop_data_per_vertex(corner_verts, data, n_verts), 1)
+        print("{:>8} loops: bincount {:7.1f} ms, with divergence {:7.1f} ms, per vertex lists {:8.1f} ms, {:5.0f}x".format(
+            len(corner_verts), bincount_time * 1000, divergence_time * 1000, loop_time * 1000, loop_time / bincount_time))
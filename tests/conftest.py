@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+# tests/conftest.py
+
+import os
+import sys
+
+# The modules under test don't need bpy, import them outside of the addon package
+TESTS_DIR = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "io_mesh_srt"))
+sys.path.insert(0, TESTS_DIR)
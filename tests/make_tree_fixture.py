@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# tests/make_tree_fixture.py
+# Run with bpy installed and the converter runnable, see run_converter in tests/test_srt_binary.py:
+# python tests/make_tree_fixture.py
+# The synthetic tree goes through the addon import and export, then the converter encodes tests/fixtures/tree.srt from it and decodes tree.srt.json
+
+import json
+import ntpath
+import os
+import sys
+import tempfile
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TESTS_DIR, "fixtures")
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "io_mesh_srt"))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+import bpy
+import io_mesh_srt
+from io_mesh_srt.import_srt_json import read_srt_json
+from io_mesh_srt.export_srt_json import write_srt_json
+from srt_binary import read_srt_binary, write_srt_binary
+from synthetic_srt import make_tree_srt, to_converter_json
+from test_srt_binary import run_converter
+
+if __name__ == "__main__":
+    bpy.ops.wm.read_factory_settings(use_empty = True)
+    io_mesh_srt.register()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.srt")
+        write_srt_binary(source_path, make_tree_srt())
+        read_srt_json(bpy.context, source_path)
+        export_path = os.path.join(temp_dir, "exported.srt")
+        write_srt_json(bpy.context, export_path)
+        srt = to_converter_json(read_srt_binary(export_path))
+
+        # Texture names without the folder they were imported from
+        geometry = srt["Geometry"]
+        states = [state for key in geometry if key.startswith("P3dRenderState") for state in geometry[key]]
+        states += [geometry[key] for key in geometry if key.startswith("ABillboardRenderState")]
+        for state in states:
+            state["ApTextures"] = [ntpath.basename(x) for x in state["ApTextures"]]
+
+        # The converter names its output after the JSON file
+        json_path = os.path.join(temp_dir, "tree")
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(srt, file, indent = 2)
+        run_converter("-e", json_path, "-o", FIXTURES_DIR)
+        run_converter("-d", os.path.join(FIXTURES_DIR, "tree.srt"), "-o", FIXTURES_DIR)
+    io_mesh_srt.unregister()
+    print("Wrote", os.path.join(FIXTURES_DIR, "tree.srt"), "and tree.srt.json")
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# tests/synthetic_srt.py
+
+import copy
+import glob
+import json
+import os
+import numpy as np
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "io_mesh_srt", "templates")
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SHADER_PATH = "../../../../../bin/shaders/speedtree"
+
+def load_template(name):
+    with open(os.path.join(TEMPLATES_DIR, name), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def get_fixtures(ext = ".srt"):
+    # Fixture files checked in under tests/fixtures
+    return sorted(glob.glob(os.path.join(FIXTURES_DIR, "*" + ext)))
+
+def get_vertex_decl():
+    # Half float position and diffuse UVs, byte normals and ambient occlusion, 16 bytes per vertex
+    decl = load_template("renderTemplate.json")["SVertexDecl"]
+    decl["size"] = 16
+    decl["AsAttributes"][0] = {'format': 'HALF_FLOAT', 'properties': ['POSITION'] * 3 + ['DIFFUSE_TEXTURE_COORDINATES'], 'components': ['X', 'Y', 'Z', 'X'], 'offsets': [0, 2, 4, 6]}
+    decl["AsAttributes"][1] = {'format': 'HALF_FLOAT', 'properties': ['DIFFUSE_TEXTURE_COORDINATES'] + ['UNASSIGNED'] * 3, 'components': ['Y'] + ['UNASSIGNED'] * 3, 'offsets': [8, 0, 0, 0]}
+    decl["AsAttributes"][2] = {'format': 'BYTE', 'properties': ['NORMAL'] * 3 + ['AMBIENT_OCCLUSION'], 'components': ['X', 'Y', 'Z', 'X'], 'offsets': [12, 13, 14, 15]}
+    decl["AsProperties"][0] = {'format': 'HALF_FLOAT', 'attributes': ['ATTRIBUE0'] * 3 + ['UNASSIGNED'], 'components': ['X', 'Y', 'Z', 'UNASSIGNED'], 'offsets': [0, 2, 4, 0]}
+    decl["AsProperties"][1] = {'format': 'HALF_FLOAT', 'attributes': ['ATTRIBUE0', 'ATTRIBUE1'] + ['UNASSIGNED'] * 2, 'components': ['W', 'X'] + ['UNASSIGNED'] * 2, 'offsets': [6, 8, 0, 0]}
+    decl["AsProperties"][2] = {'format': 'BYTE', 'attributes': ['ATTRIBUE2'] * 3 + ['UNASSIGNED'], 'components': ['X', 'Y', 'Z', 'UNASSIGNED'], 'offsets': [12, 13, 14, 0]}
+    decl["AsProperties"][18] = {'format': 'BYTE', 'attributes': ['ATTRIBUE2'] + ['UNASSIGNED'] * 3, 'components': ['W'] + ['UNASSIGNED'] * 3, 'offsets': [15, 0, 0, 0]}
+    return decl
+
+def make_srt(n_verts = 5, n_lods = 1, seed = 0):
+    # Small but complete model, every section holds non default values
+    rng = np.random.default_rng(seed)
+    srt = load_template("mainTemplate.json")
+    srt["Extents"] = {"m_cMin": [-1.0, -2.0, 0.0], "m_cMax": [1.0, 2.0, 5.0]}
+    srt["LodProfile"].update(m_bLodIsPresent = True, m_fHighDetail3dDistance = 10.0, m_fLowDetail3dDistance = 50.0, m_fBillboardStartDistance = 80.0, m_fBillboardFinalDistance = 100.0)
+    srt["StringTable"] = ["user", "", SHADER_PATH, "bark.dds"]
+    srt["PUserStrings"] = ["user", "", "", "", ""]
+    srt["Wind"]["Params"]["AfFrequencies"][5] = 7.0
+    srt["Wind"]["m_abOptions"][3] = True
+    srt["Wind"]["m_fMaxBranchLevel1Length"] = 3.0
+    srt["CollisionObjects"] = [{"m_vCenter1": {"x": 1.0, "y": 2.0, "z": 3.0}, "m_vCenter2": {"x": 1.0, "y": 2.0, "z": 4.0}, "m_fRadius": 0.5}]
+    srt["VerticalBillboards"].update(FWidth = 2.0, FTopPos = 5.0, FBottomPos = 0.0, NNumBillboards = 3, PTexCoords = [{"x": 0.5, "y": 0.25, "z": 0.5, "w": 0.75}] * 3, PRotated = [True, False, True])
+    
+    state = load_template("renderTemplate.json")
+    state["ApTextures"][0] = "bark.dds"
+    state["SVertexDecl"] = get_vertex_decl()
+    shadow_state = copy.deepcopy(state)
+    shadow_state["ERenderPass"] = "SHADOW_CAST"
+    geometry = srt["Geometry"]
+    geometry["P3dRenderStateMain"] = [state]
+    geometry["P3dRenderStateShadow"] = [shadow_state]
+    
+    for lod in range(n_lods):
+        n_tris = max(n_verts - 2, 1)
+        vert_data = {
+            "count": n_verts,
+            "pos": rng.random((n_verts, 3)).astype(np.float16).astype(np.float32),
+            "diffuse": rng.random((n_verts, 2)).astype(np.float16).astype(np.float32),
+            "normals": rng.integers(0, 256, (n_verts, 3)).astype(np.uint8),
+            "ambient_occlusion": rng.integers(0, 256, n_verts).astype(np.uint8)
+        }
+        # Three distinct corners per triangle, as Blender can't build degenerate faces
+        indices = (rng.integers(0, max(n_verts - 2, 1), n_tris)[:,None] + np.arange(3)).ravel()
+        geometry["PLods"].append({"PDrawCalls": [{"RenderStateIdx": 0, "VertexData": vert_data, "is32BitIndex": n_verts > 0xffff, "IndexData": indices}]})
+    return srt
+
+def to_converter_json(srt):
+    # Same model the way the converter writes it, arrays as nested lists
+    if isinstance(srt, np.ndarray):
+        return srt.tolist()
+    if isinstance(srt, dict):
+        return {k: to_converter_json(v) for k, v in srt.items()}
+    if isinstance(srt, (list, tuple)):
+        return [to_converter_json(v) for v in srt]
+    if isinstance(srt, np.generic):
+        return srt.item()
+    return srt
+
+def get_branch(start, end, radius, sides, segments):
+    # Tapered open cylinder, built ring by ring, with its triangles in the same order
+    start, end = np.asarray(start, dtype = float), np.asarray(end, dtype = float)
+    axis = end - start
+    axis /= np.linalg.norm(axis)
+    side = np.cross(axis, [0, 0, 1] if abs(axis[2]) < 0.9 else [1, 0, 0])
+    side /= np.linalg.norm(side)
+    up = np.cross(axis, side)
+    t = np.linspace(0, 1, segments + 1)[:,None,None]
+    angles = np.linspace(0, 2 * np.pi, sides, endpoint = False)[None,:,None]
+    normals = np.cos(angles) * side + np.sin(angles) * up
+    pos = start + t * (end - start) + normals * radius * (1 - 0.8 * t)
+    uvs = np.stack(np.broadcast_arrays(angles[...,0] / (2 * np.pi), t[...,0] * 4), axis = -1)
+    ring = np.arange(segments)[:,None] * sides
+    a = ring + np.arange(sides)
+    b = ring + (np.arange(sides) + 1) % sides
+    faces = np.stack([a, b, b + sides, a, b + sides, a + sides], axis = -1).reshape(-1, 3)
+    return pos.reshape(-1, 3), uvs.reshape(-1, 2), np.broadcast_to(normals, pos.shape).reshape(-1, 3), faces
+
+def get_leaf_cards(centers, size, rng):
+    # Randomly oriented quads, one card after the other
+    n = len(centers)
+    normals = rng.normal(size = (n, 3)) + [0, 0, 1.5]
+    normals /= np.linalg.norm(normals, axis = 1)[:,None]
+    side = np.cross(normals, rng.normal(size = (n, 3)))
+    side /= np.linalg.norm(side, axis = 1)[:,None]
+    up = np.cross(normals, side)
+    corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype = float)
+    pos = centers[:,None] + 0.5 * size * (corners[None,:,:1] * side[:,None] + corners[None,:,1:] * up[:,None])
+    uvs = np.tile((corners + 1) * 0.5, (n, 1))
+    faces = (np.arange(n)[:,None,None] * 4 + np.array([[0, 1, 2], [2, 3, 0]])).reshape(-1, 3)
+    return pos.reshape(-1, 3), uvs, np.repeat(normals, 4, axis = 0), faces
+
+def join_parts(parts):
+    # One mesh from several, faces offset into the joined vertices
+    offsets = np.cumsum([0] + [len(part[0]) for part in parts[:-1]])
+    return [np.concatenate([part[k] for part in parts]) for k in range(3)] + [np.concatenate([part[3] + offset for part, offset in zip(parts, offsets)])]
+
+def make_tree_srt(seed = 0, n_lods = 3):
+    # Bark and leaf card draw calls of a small tree, fewer sides and cards at each LOD
+    rng = np.random.default_rng(seed)
+    srt = make_srt(n_lods = 0)
+    srt["StringTable"] = ["user", "", SHADER_PATH, "bark.dds", "leaves.dds"]
+    bark = srt["Geometry"]["P3dRenderStateMain"][0]
+    bark["BBranchesPresent"] = True
+    leaves = copy.deepcopy(bark)
+    leaves["ApTextures"][0] = "leaves.dds"
+    leaves["BBranchesPresent"] = False
+    leaves["BLeavesPresent"] = True
+    shadow_leaves = copy.deepcopy(leaves)
+    shadow_leaves["ERenderPass"] = "SHADOW_CAST"
+    srt["Geometry"]["P3dRenderStateMain"] = [bark, leaves]
+    srt["Geometry"]["P3dRenderStateShadow"].append(shadow_leaves)
+    
+    branches = [((0, 0, 0), (0, 0, 5), 0.3)]
+    for height in np.linspace(1.5, 4.5, 4):
+        angle = rng.uniform(0, 2 * np.pi)
+        length = rng.uniform(1, 2)
+        branches.append(((0, 0, height), (length * np.cos(angle), length * np.sin(angle), height + length * 0.6), 0.1))
+    tips = np.array([branch[1] for branch in branches])
+    centers = tips[rng.integers(0, len(tips), 48)] + rng.normal(scale = 0.6, size = (48, 3))
+    
+    for lod in range(n_lods):
+        draw_calls = []
+        bark_parts = [get_branch(start, end, radius, max(6 >> lod, 3), 8 >> lod) for start, end, radius in branches]
+        cards = get_leaf_cards(centers[:len(centers) >> lod], 0.5 * (1 + lod), rng)
+        for state, (pos, uvs, normals, faces) in enumerate([join_parts(bark_parts), cards]):
+            vert_data = {
+                "count": len(pos),
+                "pos": pos.astype(np.float16).astype(np.float32),
+                "diffuse": uvs.astype(np.float16).astype(np.float32),
+                "normals": np.round((normals + 1) * 127.5).clip(0, 255).astype(np.uint8),
+                "ambient_occlusion": np.full(len(pos), 255, dtype = np.uint8)
+            }
+            draw_calls.append({"RenderStateIdx": state, "VertexData": vert_data, "is32BitIndex": False, "IndexData": faces.ravel()})
+        srt["Geometry"]["PLods"].append({"PDrawCalls": draw_calls})
+    return srt
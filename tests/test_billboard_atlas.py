@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# tests/test_billboard_atlas.py
+
+import numpy as np
+import pytest
+from billboard_atlas import composite_billboard_atlas, pack_billboard_rects, get_nearest_seeds, pad_billboard_images, trace_mask_outlines, get_polygon_area, simplify_polygon, clip_polygon, triangulate_polygon, get_billboard_cutout, linear_to_srgb, SHADOWS_FACTOR
+
+def get_view_layout(rects, resolution):
+    # UV rectangles, rotations and rendered view shapes (rows, columns) the way the baker derives them
+    uv_rects = []
+    rotations = []
+    shapes = []
+    for x, y, w, h, rotated in rects:
+        uv_rects.append([(x + w) / resolution, x / resolution, (y + h) / resolution, y / resolution])
+        rotations.append(np.pi * 0.5 if rotated else 0)
+        shapes.append((w, h) if rotated else (h, w))
+    return uv_rects, rotations, shapes
+
+def make_views(shapes, seed = 0):
+    # Random opaque diffuse, normal and ambient views, half shadowed
+    rng = np.random.default_rng(seed)
+    views = {"diffuse": [], "normal": [], "shadow": [], "ambient": []}
+    for shape in shapes:
+        for key in views:
+            view = rng.random((*shape, 4)).astype(np.float32)
+            view[...,3] = 1
+            views[key].append(view)
+        views["shadow"][-1][:shape[0] // 2,:,:3] = 1
+    return views
+
+def test_composite_mixed_view_sizes():
+    # Vertical views of two shapes, one of them rotated, and a square horizontal view
+    resolution = 128
+    rects = pack_billboard_rects([[1, 2], [1, 2], [0.4, 2.5], [1, 1]], resolution, 2, rotatable = [True, True, True, False])
+    assert any(rect[4] for rect in rects)
+    uv_rects, rotations, shapes = get_view_layout(rects, resolution)
+    assert len(set(shapes)) > 2
+    views = make_views(shapes)
+    diffuse, normal = composite_billboard_atlas(resolution, uv_rects, rotations, views["diffuse"], views["normal"], views["shadow"], views["ambient"], 0)
+    
+    assert diffuse.shape == normal.shape == (resolution, resolution, 4)
+    covered = np.zeros((resolution, resolution), dtype = bool)
+    for i, (x, y, w, h, rotated) in enumerate(rects):
+        turn = (lambda view: np.rot90(view, -1)) if rotated else (lambda view: view)
+        shadows = views["shadow"][i][...,:3]
+        expected = views["diffuse"][i][...,:3] * (1 - SHADOWS_FACTOR + SHADOWS_FACTOR * shadows)
+        np.testing.assert_allclose(diffuse[y:y+h, x:x+w, :3], turn(linear_to_srgb(expected)), atol = 1e-6)
+        np.testing.assert_allclose(normal[y:y+h, x:x+w, :3], turn(linear_to_srgb(views["normal"][i][...,:3])), atol = 1e-6)
+        assert diffuse[y:y+h, x:x+w, 3].all()
+        covered[y:y+h, x:x+w] = True
+    
+    # Nothing outside of the views without padding
+    assert not diffuse[~covered].any()
+    assert not normal[~covered].any()
+
+def test_composite_padding():
+    resolution = 64
+    rects = pack_billboard_rects([[1, 2], [1, 1]], resolution, 8)
+    uv_rects, rotations, shapes = get_view_layout(rects, resolution)
+    views = make_views(shapes)
+    diffuse, _ = composite_billboard_atlas(resolution, uv_rects, rotations, views["diffuse"], views["normal"], views["shadow"], views["ambient"])
+    
+    # Colors fill the whole atlas, the alpha stays on the views
+    assert diffuse[...,:3].max(axis = 2).all()
+    assert diffuse[...,3].sum() == sum(w * h for _, _, w, h, _ in rects)
+
+def test_composite_rejects_passes_of_different_sizes():
+    resolution = 64
+    rects = pack_billboard_rects([[1, 2], [2, 1]], resolution)
+    uv_rects, rotations, shapes = get_view_layout(rects, resolution)
+    assert shapes[0] != shapes[1]
+    views = make_views(shapes)
+    views["shadow"][1] = views["shadow"][0]
+    with pytest.raises(ValueError):
+        composite_billboard_atlas(resolution, uv_rects, rotations, views["diffuse"], views["normal"], views["shadow"], views["ambient"])
+
+@pytest.mark.parametrize("resolution, margin", [(256, 0), (256, 4), (1024, 16)])
+def test_pack_billboard_rects(resolution, margin):
+    dimensions = [[1, 2]] * 8 + [[2, 2]]
+    rotatable = [True] * 8 + [False]
+    rects = pack_billboard_rects(dimensions, resolution, margin, rotatable = rotatable)
+    assert not rects[-1][4]
+    
+    # Inside the texture, margin texels apart and at one texel density, rotated views swap their sides
+    views = np.full((resolution, resolution), -1)
+    scales = []
+    for i, ((x, y, w, h, rotated), (width, height)) in enumerate(zip(rects, dimensions)):
+        assert x >= margin and y >= margin and x + w + margin <= resolution and y + h + margin <= resolution
+        assert np.all(views[y:y+h, x:x+w] == -1)
+        views[y:y+h, x:x+w] = i
+        scales.extend([h / width, w / height] if rotated else [w / width, h / height])
+    for i, (x, y, w, h, _) in enumerate(rects):
+        assert set(np.unique(views[y-margin:y+h+margin, x-margin:x+w+margin])) <= {-1, i}
+    assert max(scales) - min(scales) <= 1
+
+def get_nearest_distances(mask):
+    # Squared distance of every texel to its nearest texel of the mask, by brute force
+    seeds = np.argwhere(mask)
+    rows, cols = np.indices(mask.shape)
+    return ((rows[...,None] - seeds[:,0]) ** 2 + (cols[...,None] - seeds[:,1]) ** 2).min(axis = 2)
+
+def make_seed_mask(shape, density, seed = 0):
+    rng = np.random.default_rng(seed)
+    mask = rng.random(shape) < density
+    mask[shape[0] // 2, shape[1] // 3] = True
+    return mask
+
+SEED_MASKS = [((1, 1), 1), ((1, 9), 0.2), ((9, 1), 0.2), ((7, 3), 0.1), ((20, 31), 0.01), ((40, 57), 0.05), ((96, 130), 0.002), ((128, 96), 0.2)]
+
+@pytest.mark.parametrize("shape, density", SEED_MASKS)
+@pytest.mark.parametrize("max_distance", [None, 3, 7.5])
+def test_get_nearest_seeds(shape, density, max_distance):
+    mask = make_seed_mask(shape, density)
+    seed_y, seed_x, distance = get_nearest_seeds(mask, max_distance)
+    nearest = get_nearest_distances(mask)
+    rows, cols = np.indices(shape)
+    found = seed_y >= 0
+    assert (found == (seed_x >= 0)).all()
+    assert mask[seed_y[found], seed_x[found]].all()
+    assert (distance[found] == (seed_y[found] - rows[found]) ** 2 + (seed_x[found] - cols[found]) ** 2).all()
+    assert (distance[mask] == 0).all()
+    assert (distance[found] == nearest[found]).all()
+    if max_distance is None:
+        assert found.all()
+    else:
+        assert (found == (nearest <= max_distance ** 2)).all()
+
+@pytest.mark.parametrize("max_distance", [None, 4])
+def test_pad_billboard_images(max_distance):
+    # Texels colored by their own coordinates show which texel padded them
+    mask = make_seed_mask((72, 48), 0.01, 1)
+    rows, cols = np.indices(mask.shape)
+    image = np.stack([rows, cols, np.ones(mask.shape)], axis = 2).astype(np.float32)
+    image[~mask] = -1
+    padded, = pad_billboard_images([image], mask, max_distance)
+    nearest = get_nearest_distances(mask)
+    filled = padded[...,2] == 1
+    if max_distance is None:
+        assert filled.all()
+    else:
+        assert (filled == (nearest <= max_distance ** 2)).all()
+        assert (padded[~filled] == -1).all()
+    assert (padded[mask] == image[mask]).all()
+    seed_y = padded[filled][:,0].astype(int)
+    seed_x = padded[filled][:,1].astype(int)
+    assert mask[seed_y, seed_x].all()
+    distance = (seed_y - rows[filled]) ** 2 + (seed_x - cols[filled]) ** 2
+    assert (distance == nearest[filled]).all()
+
+def make_foliage_mask(shape, seed):
+    # A few discs of leaves over a trunk
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    rows, cols = np.indices(shape)
+    mask = np.zeros(shape, dtype = bool)
+    for _ in range(rng.integers(1, 5)):
+        y, x, radius = rng.uniform(height * 0.3, height), rng.uniform(0, width), rng.uniform(4, width / 2)
+        mask |= (rows - y) ** 2 + (cols - x) ** 2 < radius ** 2
+    mask[:height // 2,width // 2 - 3:width // 2 + 3] = True
+    return mask
+
+def get_covered_texels(mask, vertices, triangles):
+    # Texel centers of the mask inside the triangles, in the [0, 1] billboard space
+    height, width = mask.shape
+    ys, xs = np.nonzero(mask)
+    points = np.stack([(xs + 0.5) / width, (ys + 0.5) / height], axis = 1)
+    covered = np.zeros(len(points), dtype = bool)
+    for a, b, c in vertices[triangles]:
+        sides = [(q[0] - p[0]) * (points[:,1] - p[1]) - (q[1] - p[1]) * (points[:,0] - p[0]) for p, q in ((a, b), (b, c), (c, a))]
+        covered |= np.all([side >= -1e-9 for side in sides], axis = 0) | np.all([side <= 1e-9 for side in sides], axis = 0)
+    return covered
+
+def test_trace_mask_outlines():
+    # Two islands, one with a hole, and two texels touching by a corner only
+    mask = np.zeros((12, 12), dtype = bool)
+    mask[1:6,1:6] = True
+    mask[3,3] = False
+    mask[8,8] = mask[9,9] = True
+    outlines = trace_mask_outlines(mask)
+    areas = sorted(get_polygon_area(outline) for outline in outlines)
+    assert areas == [-1, 1, 1, 25]
+    assert sum(areas) == mask.sum()
+
+def test_simplify_polygon():
+    # The outline of a rectangle comes down to its corners, a tolerance of a texel never moves it farther
+    outline = trace_mask_outlines(np.ones((5, 9), dtype = bool))[0]
+    assert len(outline) == 28
+    corners = simplify_polygon(outline, 0.5)
+    assert sorted(map(tuple, corners.tolist())) == [(0, 0), (0, 5), (9, 0), (9, 5)]
+    assert get_polygon_area(corners) == 45
+
+def test_clip_polygon_intersection_on_first_corner():
+    # The first corner lies on the clipping line, entered from outside, it must be kept once
+    polygon = np.array([[0, 0], [4, 0], [4, 4], [-2, 2]], dtype = float)
+    clipped = clip_polygon(polygon, (0, 0), (4, 4))
+    assert len(clipped) == 4
+    np.testing.assert_allclose(sorted(map(tuple, clipped.tolist())), [(0, 0), (0, 8 / 3), (4, 0), (4, 4)])
+
+def test_clip_polygon_drops_aligned_corners():
+    polygon = np.array([[0, 0], [2, 0], [4, 0], [4, 4], [4, 4], [0, 4], [0, 0]], dtype = float)
+    assert sorted(map(tuple, clip_polygon(polygon, (0, 0), (4, 4)).tolist())) == [(0, 0), (0, 4), (4, 0), (4, 4)]
+
+def test_triangulate_polygon():
+    # Concave L shape, then a clockwise square without any ear
+    polygon = np.array([[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2]], dtype = float)
+    triangles = triangulate_polygon(polygon)
+    assert len(triangles) == 4
+    assert sum(abs(get_polygon_area(polygon[list(triangle)])) for triangle in triangles) == get_polygon_area(polygon)
+    assert triangulate_polygon(np.array([[0, 0], [0, 1], [1, 1], [1, 0]], dtype = float)) is None
+
+def assert_cutout_covers_mask(mask, max_vertices):
+    vertices, triangles, area = get_billboard_cutout(mask, max_vertices)
+    assert len(vertices) <= max_vertices
+    assert get_covered_texels(mask, vertices, triangles).all()
+    assert 0 < area <= 1
+    assert ((vertices >= 0) & (vertices <= 1)).all()
+
+@pytest.mark.parametrize("seed", range(32))
+@pytest.mark.parametrize("max_vertices", [6, 16])
+def test_billboard_cutout_covers_foliage(seed, max_vertices):
+    # Every opaque texel inside the cutout, within the vertex budget
+    assert_cutout_covers_mask(make_foliage_mask((128, 64), seed), max_vertices)
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("max_vertices", [4, 16])
+def test_billboard_cutout_covers_scattered_texels(seed, max_vertices):
+    rng = np.random.default_rng(seed)
+    mask = rng.random(tuple(rng.integers(8, 100, 2))) < 0.02
+    mask[0,0] = True
+    assert_cutout_covers_mask(mask, max_vertices)
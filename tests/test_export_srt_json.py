@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# tests/test_export_srt_json.py
+
+import os
+import sys
+import pytest
+
+bpy = pytest.importorskip("bpy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import io_mesh_srt
+from io_mesh_srt.import_srt_json import read_srt_json
+from io_mesh_srt.export_srt_json import write_srt_json
+from srt_binary import read_srt_binary, write_srt_binary
+from synthetic_srt import make_srt
+
+@pytest.fixture
+def empty_scene():
+    # Addon registered on a new empty file
+    bpy.ops.wm.read_factory_settings(use_empty = True)
+    io_mesh_srt.register()
+    yield
+    io_mesh_srt.unregister()
+
+@pytest.mark.parametrize("metadata_only, max_lods", [(True, 0), (False, 1)])
+def test_export_placeholder_lods(empty_scene, tmp_path, metadata_only, max_lods):
+    # Every LOD, or every LOD past the first, is written back from the file it was imported from
+    srt = make_srt(n_verts = 12, n_lods = 3)
+    source_path = str(tmp_path / "tree.srt")
+    write_srt_binary(source_path, srt)
+    read_srt_json(bpy.context, source_path, max_lods = max_lods, metadata_only = metadata_only)
+    export_path = str(tmp_path / "exported.srt")
+    write_srt_json(bpy.context, export_path)
+    exported = read_srt_binary(export_path)
+    source = read_srt_binary(source_path)
+    assert len(exported["Geometry"]["PLods"]) == 3
+    if metadata_only:
+        assert exported["Extents"] == source["Extents"]
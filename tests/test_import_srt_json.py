@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# tests/test_import_srt_json.py
+
+import os
+import sys
+import pytest
+
+bpy = pytest.importorskip("bpy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from io_mesh_srt.import_srt_json import get_srt_folder_files
+
+def test_folder_files_skip_converter_json(tmp_path):
+    # A .srt.json decoded by the converter is only imported when its .srt isn't in the folder
+    for name in ["tree.srt", "tree.srt.json", "bush.srt.json", "rock.json", "notes.txt", "TREE2.SRT", "TREE2.SRT.json"]:
+        (tmp_path / name).write_bytes(b"")
+    names = [os.path.basename(x) for x in get_srt_folder_files(str(tmp_path))]
+    assert names == ["TREE2.SRT", "bush.srt.json", "rock.json", "tree.srt"]
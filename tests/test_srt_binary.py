@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# tests/test_srt_binary.py
+
+import json
+import mmap
+import os
+import shlex
+import shutil
+import subprocess
+import numpy as np
+import pytest
+from srt_binary import read_srt_binary, read_srt_buffer, write_srt_binary, decode_srt_file, pack_srt_arrays, read_vertex_data, SHADER_PATH
+from synthetic_srt import make_srt, get_fixtures
+
+SRT_FIXTURES = get_fixtures(".srt") or [pytest.param(None, marks = pytest.mark.skip(reason = "no .srt fixtures in tests/fixtures"))]
+CONVERTER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "io_mesh_srt", "converter", "srt_json_converter.exe")
+
+def run_converter(*args):
+    # The converter only runs on Windows, or through Wine, unless SRT_CONVERTER holds another command to run it with
+    if os.environ.get("SRT_CONVERTER"):
+        command = [*shlex.split(os.environ["SRT_CONVERTER"]), *args]
+    elif os.name == "nt":
+        command = [CONVERTER_PATH, *args]
+    elif shutil.which("wine"):
+        command = ["wine", CONVERTER_PATH, *args]
+    else:
+        pytest.skip("srt_json_converter.exe can't run here")
+    subprocess.run(command, check = True, capture_output = True)
+
+def get_converter_json(filepath, temp_dir):
+    # Converter output checked in next to the fixture, or decoded now
+    json_path = filepath + ".json"
+    if not os.path.exists(json_path):
+        run_converter("-d", filepath, "-o", str(temp_dir))
+        json_path = os.path.join(str(temp_dir), os.path.basename(filepath) + ".json")
+    with open(json_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def assert_same_srt(result, expected, path = "srt"):
+    # Recursive comparison, arrays and floats up to float32 precision
+    if isinstance(expected, dict):
+        assert set(result) == set(expected), path
+        for k in expected:
+            assert_same_srt(result[k], expected[k], path + "." + k)
+    elif isinstance(expected, (list, tuple, np.ndarray)) and not (isinstance(expected, list) and expected and isinstance(expected[0], (dict, str))):
+        np.testing.assert_allclose(np.asarray(result, dtype = float), np.asarray(expected, dtype = float), rtol = 1e-6, err_msg = path)
+    elif isinstance(expected, list):
+        assert len(result) == len(expected), path
+        for i, (x, y) in enumerate(zip(result, expected)):
+            assert_same_srt(x, y, path + "[" + str(i) + "]")
+    elif isinstance(expected, float):
+        assert result == pytest.approx(expected, rel = 1e-6), path
+    else:
+        assert result == expected, path
+
+def test_read_synthetic(tmp_path):
+    srt = make_srt()
+    filepath = str(tmp_path / "tree.srt")
+    write_srt_binary(filepath, srt)
+    result = read_srt_binary(filepath)
+    
+    assert result["Extents"] == srt["Extents"]
+    assert result["LodProfile"] == srt["LodProfile"]
+    assert result["Wind"]["Params"]["AfFrequencies"][5] == 7.0
+    assert result["Wind"]["m_abOptions"] == srt["Wind"]["m_abOptions"]
+    assert result["Wind"]["m_fMaxBranchLevel1Length"] == 3.0
+    assert result["StringTable"] == srt["StringTable"]
+    assert result["PUserStrings"] == srt["PUserStrings"]
+    assert result["CollisionObjects"] == srt["CollisionObjects"]
+    assert_same_srt(result["VerticalBillboards"], srt["VerticalBillboards"])
+    assert result["Geometry"]["StrShaderPath"] == SHADER_PATH
+    
+    state = result["Geometry"]["P3dRenderStateMain"][0]
+    assert state["ApTextures"][0] == "bark.dds"
+    assert state["SVertexDecl"] == srt["Geometry"]["P3dRenderStateMain"][0]["SVertexDecl"]
+    assert result["Geometry"]["P3dRenderStateShadow"][0]["ERenderPass"] == "SHADOW_CAST"
+    assert "P3dRenderStateDepth" not in result["Geometry"]
+    
+    draw_call = result["Geometry"]["PLods"][0]["PDrawCalls"][0]
+    expected = srt["Geometry"]["PLods"][0]["PDrawCalls"][0]
+    for key, values in expected["VertexData"].items():
+        if key != "count":
+            assert draw_call["VertexData"][key].dtype == values.dtype, key
+            np.testing.assert_array_equal(draw_call["VertexData"][key], values, err_msg = key)
+    np.testing.assert_array_equal(draw_call["IndexData"], expected["IndexData"])
+    assert not draw_call["is32BitIndex"]
+
+def test_read_metadata_only(tmp_path):
+    filepath = str(tmp_path / "tree.srt")
+    write_srt_binary(filepath, make_srt(n_verts = 50, n_lods = 3))
+    full = read_srt_binary(filepath)
+    metadata = read_srt_binary(filepath, False)
+    for key in full:
+        if key != "Geometry":
+            assert metadata[key] == full[key], key
+    for lod, full_lod in zip(metadata["Geometry"]["PLods"], full["Geometry"]["PLods"]):
+        assert lod["PDrawCalls"] == [{"RenderStateIdx": 0, "numVertices": 50, "numIndices": len(full_lod["PDrawCalls"][0]["IndexData"]), "is32BitIndex": False}]
+    
+    # Nothing decoded keeps a view of the map, so that it can be closed
+    with open(filepath, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    read_srt_buffer(buffer, False)
+    buffer.close()
+
+def test_read_rejects_other_files(tmp_path):
+    filepath = tmp_path / "tree.srt"
+    filepath.write_bytes(b"SRT 06.0.0" + bytes(64))
+    with pytest.raises(ValueError):
+        read_srt_binary(str(filepath))
+
+@pytest.mark.parametrize("filepath", SRT_FIXTURES)
+def test_read_fixture(filepath):
+    srt, _ = decode_srt_file(filepath)
+    assert len(srt["Geometry"]["P3dRenderStateMain"]) > 0
+    assert srt["VerticalBillboards"]["NNumBillboards"] == len(srt["VerticalBillboards"]["PTexCoords"])
+    for lod in srt["Geometry"]["PLods"]:
+        for draw_call in lod["PDrawCalls"]:
+            vert_data = draw_call["VertexData"]
+            decl = srt["Geometry"]["P3dRenderStateMain"][draw_call["RenderStateIdx"]]["SVertexDecl"]
+            assert "pos" in vert_data
+            assert all(len(values) == vert_data["count"] for key, values in vert_data.items() if key != "count")
+            assert all(offset < decl["size"] for prop in decl["AsProperties"] if isinstance(prop, dict) for offset in prop["offsets"])
+            assert draw_call["IndexData"].size % 3 == 0
+            assert draw_call["IndexData"].max(initial = 0) < max(vert_data["count"], 1)
+
+def test_write_round_trip(tmp_path):
+    first = str(tmp_path / "first.srt")
+    second = str(tmp_path / "second.srt")
+    write_srt_binary(first, make_srt(n_verts = 100, n_lods = 3))
+    write_srt_binary(second, read_srt_binary(first))
+    with open(first, 'rb') as file_a, open(second, 'rb') as file_b:
+        assert file_a.read() == file_b.read()
+    assert not os.path.exists(second + ".tmp")
+
+def test_write_32bit_indices(tmp_path):
+    srt = make_srt(n_verts = 70000)
+    filepath = str(tmp_path / "tree.srt")
+    write_srt_binary(filepath, srt)
+    draw_call = read_srt_binary(filepath)["Geometry"]["PLods"][0]["PDrawCalls"][0]
+    assert draw_call["is32BitIndex"]
+    np.testing.assert_array_equal(draw_call["IndexData"], srt["Geometry"]["PLods"][0]["PDrawCalls"][0]["IndexData"])
+
+@pytest.mark.parametrize("filepath", SRT_FIXTURES)
+def test_write_fixture_byte_identical(filepath, tmp_path):
+    output = str(tmp_path / os.path.basename(filepath))
+    write_srt_binary(output, read_srt_binary(filepath))
+    with open(filepath, 'rb') as file_a, open(output, 'rb') as file_b:
+        assert file_a.read() == file_b.read()
+
+@pytest.mark.parametrize("filepath", SRT_FIXTURES)
+def test_read_matches_converter(filepath, tmp_path):
+    expected = pack_srt_arrays(get_converter_json(filepath, tmp_path))
+    assert_same_srt(read_srt_binary(filepath), expected)
+
+@pytest.mark.parametrize("filepath", SRT_FIXTURES)
+def test_read_metadata_matches_converter(filepath, tmp_path):
+    # Header sections as the converter decodes them, and the size of every draw call
+    expected = get_converter_json(filepath, tmp_path)
+    result = read_srt_binary(filepath, False)
+    for key in expected:
+        if key != "Geometry":
+            assert_same_srt(result[key], expected[key], key)
+    for key in expected["Geometry"]:
+        if key != "PLods":
+            assert_same_srt(result["Geometry"][key], expected["Geometry"][key], key)
+    for lod, expected_lod in zip(result["Geometry"]["PLods"], expected["Geometry"]["PLods"], strict = True):
+        expected_calls = [{"RenderStateIdx": x["RenderStateIdx"], "numVertices": x["VertexData"]["count"], "numIndices": int(np.size(x["IndexData"])), "is32BitIndex": x["is32BitIndex"]} for x in expected_lod["PDrawCalls"]]
+        assert lod["PDrawCalls"] == expected_calls
+
+@pytest.mark.parametrize("filepath", SRT_FIXTURES)
+def test_write_matches_converter(filepath, tmp_path):
+    # Encode the same JSON with both, the converter names its output after the JSON file
+    srt = get_converter_json(filepath, tmp_path)
+    json_path = str(tmp_path / "converted")
+    with open(json_path, 'w', encoding='utf-8') as file:
+        json.dump(srt, file, indent = 2)
+    (tmp_path / "converter").mkdir()
+    run_converter("-e", json_path, "-o", str(tmp_path / "converter"))
+    output = str(tmp_path / "native.srt")
+    write_srt_binary(output, pack_srt_arrays(srt))
+    with open(str(tmp_path / "converter" / "converted.srt"), 'rb') as file_a, open(output, 'rb') as file_b:
+        assert file_a.read() == file_b.read()
+
+def test_read_vertex_data_nulls():
+    # Converter JSON with null vertices, null components and streams holding only nulls
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", "null_vertex_data.json"), 'r', encoding='utf-8') as file:
+        fixture = json.load(file)
+    decl = fixture["SVertexDecl"]
+    partial = read_vertex_data(fixture["PDrawCalls"][0]["VertexData"], decl)
+    empty = read_vertex_data(fixture["PDrawCalls"][1]["VertexData"], decl)
+    
+    for vert_data in [partial, empty]:
+        count = vert_data["count"]
+        for key, shape, dtype in [("pos", (count, 3), np.float32), ("diffuse", (count,), np.float32), ("normals", (count, 3), np.uint8), ("ambient_occlusion", (count,), np.uint8)]:
+            assert vert_data[key].shape == shape, key
+            assert vert_data[key].dtype == dtype, key
+            assert vert_data[key].flags.c_contiguous, key
+    
+    np.testing.assert_array_equal(partial["pos"], [[0.5, 1, 2], [0, 0, 0], [1.5, 0, 2.5], [3, 4, 5]])
+    np.testing.assert_array_equal(partial["diffuse"], [0.25, 0, 0.75, 1])
+    np.testing.assert_array_equal(partial["normals"], [[255, 0, 127], [0, 128, 64], [0, 0, 0], [1, 2, 3]])
+    np.testing.assert_array_equal(partial["ambient_occlusion"], [0, 255, 128, 0])
+    np.testing.assert_array_equal(empty["pos"], [[0, 0, 0], [1, 2, 3]])
+    assert not empty["normals"].any()
+    
+    # Typed arrays go through unchanged
+    np.testing.assert_array_equal(read_vertex_data(partial, decl)["pos"], partial["pos"])
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# tests/test_srt_cache.py
+
+import os
+import sys
+import pytest
+
+pytest.importorskip("bpy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from io_mesh_srt import srt_cache
+from io_mesh_srt.srt_cache import has_srt_cache, store_srt_cache, load_srt_cache, clear_srt_cache
+from srt_binary import read_srt_binary, write_srt_binary
+from synthetic_srt import make_srt
+
+def test_has_srt_cache(tmp_path, monkeypatch):
+    # Stores and clears keep it up to date, only the first call looks at the disk
+    cache_dir = str(tmp_path / "cache")
+    filepath = str(tmp_path / "tree.srt")
+    write_srt_binary(filepath, make_srt())
+    assert not has_srt_cache(cache_dir)
+    assert store_srt_cache(filepath, read_srt_binary(filepath), cache_dir = cache_dir)
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(srt_cache, "get_cache_entries", lambda *args: pytest.fail("cache folder listed"))
+        assert has_srt_cache(cache_dir)
+    assert load_srt_cache(filepath, cache_dir) is not None
+    assert clear_srt_cache(cache_dir)[0] == 1
+    assert not has_srt_cache(cache_dir)
+    
+    # A new instance finds the entries of a previous one
+    store_srt_cache(filepath, read_srt_binary(filepath), cache_dir = cache_dir)
+    srt_cache.CACHE_PRESENT.clear()
+    assert has_srt_cache(cache_dir)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# tests/test_utils.py
+
+import numpy as np
+import pytest
+
+pytest.importorskip("bpy")
+from utils import AverageLoopData, getCenterOfVolume
+
+def average_loop_data_per_vertex(corner_verts_array, data_array, n_verts):
+    # Per vertex Python lists, the way the exporter averaged loop data before
+    data = [[] for i in range(n_verts)]
+    for loop, vert in enumerate(corner_verts_array):
+        data[vert].append(data_array[loop])
+    return np.array([np.mean(x, axis = 0) if x else np.zeros(data_array.shape[1]) for x in data])
+
+def get_grid_loops(n):
+    # Corner vertices of an n x n quad grid
+    verts = np.arange((n + 1) * (n + 1)).reshape(n + 1, n + 1)
+    return np.stack([verts[:-1,:-1], verts[:-1,1:], verts[1:,1:], verts[1:,:-1]], axis = -1).ravel(), (n + 1) * (n + 1)
+
+@pytest.mark.parametrize("width", [2, 3])
+def test_average_matches_per_vertex_loop(width):
+    rng = np.random.default_rng(0)
+    corner_verts, n_verts = get_grid_loops(20)
+    corner_verts = np.append(corner_verts, n_verts + 3)
+    n_verts += 5
+    data = rng.random((len(corner_verts), width))
+    np.testing.assert_allclose(AverageLoopData(corner_verts, data, n_verts), average_loop_data_per_vertex(corner_verts, data, n_verts))
+
+def test_average_reports_divergent_vertices():
+    corner_verts, n_verts = get_grid_loops(4)
+    data = np.ones((len(corner_verts), 2))
+    seam = np.flatnonzero(corner_verts == 7)
+    data[seam[0]] = [0.5, 1.0]
+    averaged, divergent = AverageLoopData(corner_verts, data, n_verts, 1e-4)
+    assert divergent.tolist() == [7]
+    assert averaged[7,0] == pytest.approx(1 - 0.5 / len(seam))
+    assert AverageLoopData(corner_verts, np.ones((len(corner_verts), 2)), n_verts, 1e-4)[1].size == 0
+
+def test_center_of_volume():
+    # Off center faces move the median of the corners, not the center of volume
+    cube = np.array([[x, y, z] for x in (0, 2) for y in (0, 2) for z in (0, 2)], dtype = float) + [1, 2, 3]
+    faces = np.array([[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]])
+    np.testing.assert_allclose(getCenterOfVolume(cube, faces.ravel(), np.full(6, 4)), [2, 3, 4])
+    tetra = np.array([[0, 0, 0], [3, 0, 0], [0, 3, 0], [0, 0, 3]], dtype = float)
+    np.testing.assert_allclose(getCenterOfVolume(tetra, np.array([0, 2, 1, 0, 1, 3, 0, 3, 2, 1, 2, 3]), np.full(4, 3)), [0.75, 0.75, 0.75])
+    
+    # Flat meshes fall back on the median of the corners
+    np.testing.assert_allclose(getCenterOfVolume(cube[:4], np.array([0, 1, 3, 2]), np.array([4])), cube[:4].mean(axis = 0))